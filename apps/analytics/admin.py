@@ -1,3 +1,59 @@
 from django.contrib import admin
+from .models import BasketTotal, DailySketch, DishPair, HourlySales, SalesForecast, StaffDailySales
 
-# Register your models here.
+
+@admin.register(HourlySales)
+class HourlySalesAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'hour', 'orders', 'units', 'revenue', 'is_stale')
+    list_filter = ('restaurant', 'is_stale', 'weekday')
+    date_hierarchy = 'hour'
+    readonly_fields = ('restaurant', 'hour', 'weekday', 'hour_of_day', 'orders', 'units', 'revenue',
+                       'is_stale', 'revision')
+
+
+@admin.register(DailySketch)
+class DailySketchAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'day', 'orders', 'is_stale')
+    list_filter = ('restaurant', 'is_stale')
+    date_hierarchy = 'day'
+    fields = ('restaurant', 'day', 'orders', 'is_stale', 'revision')
+    readonly_fields = fields
+
+
+@admin.register(DishPair)
+class DishPairAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'dish', 'companion', 'orders')
+    list_filter = ('restaurant',)
+    search_fields = ('dish__name', 'companion__name')
+    readonly_fields = ('restaurant', 'dish', 'companion', 'orders')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('restaurant', 'dish', 'companion')
+
+
+@admin.register(BasketTotal)
+class BasketTotalAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'orders')
+    readonly_fields = ('restaurant', 'orders')
+
+
+@admin.register(SalesForecast)
+class SalesForecastAdmin(admin.ModelAdmin):
+    list_display = ('day', 'restaurant', 'menu_item', 'units', 'revenue')
+    list_filter = ('restaurant', 'day')
+    search_fields = ('menu_item__name',)
+    readonly_fields = ('restaurant', 'menu_item', 'day', 'units', 'revenue', 'created_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('restaurant', 'menu_item')
+
+
+@admin.register(StaffDailySales)
+class StaffDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('day', 'shift', 'user', 'restaurant', 'orders', 'units', 'revenue', 'is_stale')
+    list_filter = ('restaurant', 'shift', 'is_stale')
+    date_hierarchy = 'day'
+    readonly_fields = ('restaurant', 'user', 'day', 'shift', 'orders', 'units', 'revenue', 'is_stale', 'revision')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('restaurant', 'user')
@@ -0,0 +1,197 @@
+# apps/analytics/baskets.py
+"""
+Анализ корзин: какие блюда заказывают вместе.
+
+Для каждого ресторана в DishPair хранится число завершенных заказов с
+парой блюд (в обе стороны и с диагональю dish = companion - числом
+заказов с блюдом), в BasketTotal - число учтенных заказов. Завершение
+заказа добавляет его набор блюд: одна вставка недостающих пар и один
+UPDATE orders + 1 по всем парам набора, без самосоединения OrderItem.
+Учтенный набор запоминается в BasketOrder: отмена, удаление или правка
+завершенного заказа вычитают ровно его, повторный учет невозможен.
+
+Поддержка пары - доля заказов с обоими блюдами, уверенность - доля
+заказов с блюдом, где есть и спутник, lift - во сколько раз пара
+встречается чаще, чем при независимых заказах. Спутники блюда читаются
+одним диапазоном индекса, не зависящим от объема истории.
+
+Полный пересчет - команда rebuild_dish_pairs: история читается
+порциями по CHUNK_SIZE заказов, счетчики копятся в памяти (их размер
+ограничен числом пар блюд, а не заказов).
+"""
+from collections import Counter
+from itertools import product
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from apps.menu.models import MenuItem
+from apps.orders.models import Order, OrderItem
+from .models import BasketOrder, BasketTotal, DishPair
+
+CHUNK_SIZE = 2000
+
+# Пары, встретившиеся реже, не показываются в отчетах (lift по
+# нескольким заказам случаен)
+MIN_PAIR_ORDERS = 3
+
+
+def _apply(restaurant_id, dishes, delta):
+    BasketTotal.objects.bulk_create([BasketTotal(restaurant_id=restaurant_id)], ignore_conflicts=True)
+    BasketTotal.objects.filter(restaurant_id=restaurant_id).update(orders=F('orders') + delta)
+    if dishes:
+        DishPair.objects.bulk_create([
+            DishPair(restaurant_id=restaurant_id, dish_id=dish, companion_id=companion)
+            for dish, companion in product(dishes, repeat=2)
+        ], ignore_conflicts=True)
+        DishPair.objects.filter(
+            restaurant_id=restaurant_id, dish_id__in=dishes, companion_id__in=dishes
+        ).update(orders=F('orders') + delta)
+
+
+def record_order(order_id):
+    """
+    Привести учет заказа в парах к его текущему состоянию: завершенный
+    заказ добавляется, отмененный, удаленный или вернувшийся в работу -
+    вычитается, у завершенного с измененным набором блюд старый набор
+    заменяется новым. Возвращает True, если счетчики изменились.
+    """
+    with transaction.atomic():
+        order = Order.objects.filter(pk=order_id).values('restaurant_id', 'status').first()
+        dishes = None
+        if order and order['status'] == Order.Status.COMPLETED:
+            dishes = sorted(set(OrderItem.objects.filter(order_id=order_id).values_list('menu_item_id', flat=True)))
+
+        counted = BasketOrder.objects.select_for_update().filter(order_id=order_id).first()
+        if counted and counted.dishes == dishes and counted.restaurant_id == order['restaurant_id']:
+            return False
+        if counted:
+            _apply(counted.restaurant_id, counted.dishes, -1)
+            counted.delete()
+        if dishes is not None:
+            BasketOrder.objects.create(order_id=order_id, restaurant_id=order['restaurant_id'], dishes=dishes)
+            _apply(order['restaurant_id'], dishes, 1)
+    return True
+
+
+def rebuild(chunk_size=CHUNK_SIZE):
+    """Пересчитать пары по всем завершенным заказам; возвращает (заказов, пар)"""
+    pairs = Counter()
+    totals = Counter()
+    orders = Order.objects.filter(status=Order.Status.COMPLETED)
+
+    with transaction.atomic():
+        DishPair.objects.all().delete()
+        BasketTotal.objects.all().delete()
+        BasketOrder.objects.all().delete()
+
+        last_id = 0
+        while True:
+            chunk = list(orders.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'restaurant_id')[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            baskets = {order_id: set() for order_id, _ in chunk}
+            for order_id, dish_id in OrderItem.objects.filter(order_id__in=list(baskets)).values_list(
+                'order_id', 'menu_item_id'
+            ):
+                baskets[order_id].add(dish_id)
+            for order_id, restaurant_id in chunk:
+                totals[restaurant_id] += 1
+                pairs.update((restaurant_id, dish, companion)
+                             for dish, companion in product(baskets[order_id], repeat=2))
+            BasketOrder.objects.bulk_create([
+                BasketOrder(order_id=order_id, restaurant_id=restaurant_id, dishes=sorted(baskets[order_id]))
+                for order_id, restaurant_id in chunk
+            ])
+
+        BasketTotal.objects.bulk_create([
+            BasketTotal(restaurant_id=restaurant_id, orders=count) for restaurant_id, count in totals.items()
+        ])
+        DishPair.objects.bulk_create([
+            DishPair(restaurant_id=restaurant_id, dish_id=dish, companion_id=companion, orders=count)
+            for (restaurant_id, dish, companion), count in pairs.items()
+        ], batch_size=1000)
+    return sum(totals.values()), len(pairs)
+
+
+def _pairs(restaurant_id):
+    pairs = DishPair.objects.all()
+    if restaurant_id:
+        pairs = pairs.filter(restaurant_id=restaurant_id)
+    return pairs
+
+
+def _total(restaurant_id):
+    totals = BasketTotal.objects.all()
+    if restaurant_id:
+        totals = totals.filter(restaurant_id=restaurant_id)
+    return totals.aggregate(orders=Sum('orders'))['orders'] or 0
+
+
+def _measures(pair_orders, dish_orders, companion_orders, total):
+    return {
+        'orders': pair_orders,
+        'support': round(pair_orders / total, 4) if total else 0,
+        'confidence': round(pair_orders / dish_orders, 4) if dish_orders else 0,
+        'lift': round(pair_orders * total / (dish_orders * companion_orders), 2)
+        if dish_orders and companion_orders else 0,
+    }
+
+
+def companions(dish_id, restaurant_id=None, limit=5):
+    """
+    Блюда, чаще всего заказываемые вместе с dish_id (в ресторане или по
+    всей сети): список словарей id, name, orders, support, confidence,
+    lift по убыванию числа совместных заказов.
+    """
+    pairs = _pairs(restaurant_id).filter(dish_id=dish_id)
+    if restaurant_id:
+        top = list(pairs.exclude(companion_id=dish_id).order_by('-orders').values_list(
+            'companion_id', 'orders'
+        )[:limit])
+    else:
+        top = list(pairs.exclude(companion_id=dish_id).values('companion_id').annotate(
+            together=Sum('orders')
+        ).order_by('-together').values_list('companion_id', 'together')[:limit])
+    if not top:
+        return []
+
+    ids = [companion_id for companion_id, _ in top]
+    single = dict(_pairs(restaurant_id).filter(dish_id__in=[dish_id, *ids], companion_id=F('dish_id')).values(
+        'dish_id'
+    ).annotate(count=Sum('orders')).values_list('dish_id', 'count'))
+    names = dict(MenuItem.objects.filter(id__in=ids).values_list('id', 'name'))
+    total = _total(restaurant_id)
+    return [
+        {'id': companion_id, 'name': names.get(companion_id, ''),
+         **_measures(together, single.get(dish_id, 0), single.get(companion_id, 0), total)}
+        for companion_id, together in top
+    ]
+
+
+def top_pairs(restaurant_id=None, limit=10, min_orders=MIN_PAIR_ORDERS):
+    """Пары блюд с наибольшим lift (не реже min_orders совместных заказов) для отчета по меню"""
+    pairs = _pairs(restaurant_id).filter(dish_id__lt=F('companion_id')).values('dish_id', 'companion_id').annotate(
+        together=Sum('orders')
+    ).filter(together__gte=min_orders)
+    single = dict(_pairs(restaurant_id).filter(companion_id=F('dish_id')).values('dish_id').annotate(
+        count=Sum('orders')
+    ).values_list('dish_id', 'count'))
+    total = _total(restaurant_id)
+
+    rows = [
+        {'dish_id': pair['dish_id'], 'companion_id': pair['companion_id'],
+         **_measures(pair['together'], single.get(pair['dish_id'], 0), single.get(pair['companion_id'], 0), total)}
+        for pair in pairs
+    ]
+    rows.sort(key=lambda row: (-row['lift'], -row['orders']))
+    rows = rows[:limit]
+
+    names = dict(MenuItem.objects.filter(
+        id__in={row['dish_id'] for row in rows} | {row['companion_id'] for row in rows}
+    ).values_list('id', 'name'))
+    for row in rows:
+        row['dish'] = names.get(row['dish_id'], '')
+        row['companion'] = names.get(row['companion_id'], '')
+    return rows
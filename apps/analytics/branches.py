@@ -0,0 +1,137 @@
+# apps/analytics/branches.py
+"""
+Показатели филиалов.
+
+Каждое семейство показателей считается своим запросом с группировкой по
+филиалу (заказы и позиции - компилятором отчетов apps.analytics.reports),
+и результаты соединяются по id филиала:
+    - orders: число заказов (всего, завершенных, отмененных), выручка,
+      средний чек;
+    - items: продано порций и сумма скидок по акциям;
+    - staff: число сотрудников;
+    - stock: позиций на складе и сколько из них заканчивается.
+
+Если соединить заказы и сотрудников в одном запросе, каждая строка заказа
+повторяется столько раз, сколько в филиале сотрудников: выручка и число
+заказов завышаются, а объем работы растет как заказы × сотрудники. Здесь
+каждый запрос читает только свою таблицу, один раз.
+"""
+from django.db.models import Count, Q
+
+from apps.inventory.models import StockItem
+from apps.orders.models import Order
+from apps.restaurants.models import Restaurant
+from apps.staff.models import Employee
+from .reports import Report, run
+
+FAMILIES = ('orders', 'items', 'staff', 'stock')
+
+# Значения показателей филиала без данных
+DEFAULTS = {
+    'orders_count': 0,
+    'completed_count': 0,
+    'cancelled_count': 0,
+    'revenue': 0,
+    'avg_order_value': None,
+    'items_sold': 0,
+    'discount_total': 0,
+    'employees_count': 0,
+    'stock_positions': 0,
+    'low_stock_count': 0,
+}
+
+# Показатели компилятора отчетов -> атрибуты филиала
+ORDER_METRICS = {
+    'orders': 'orders_count',
+    'orders@completed': 'completed_count',
+    'orders@cancelled': 'cancelled_count',
+    'revenue': 'revenue',
+    'aov': 'avg_order_value',
+}
+ITEM_METRICS = {
+    'units': 'items_sold',
+    'discount': 'discount_total',
+}
+
+
+def branch_reports(families, start_date=None, end_date=None, restaurant_ids=None):
+    """Отчеты по филиалам для семейств orders и items (см. apps.analytics.reports)"""
+    metrics = []
+    if 'orders' in families:
+        metrics += ORDER_METRICS
+    if 'items' in families:
+        metrics += ITEM_METRICS
+    if not metrics:
+        return []
+    return [Report(
+        metrics, ['restaurant'],
+        filters={'start_date': start_date, 'end_date': end_date, 'restaurant_ids': restaurant_ids},
+        slices={
+            'completed': {'statuses': [Order.Status.COMPLETED]},
+            'cancelled': {'statuses': [Order.Status.CANCELLED]},
+        },
+        name='Филиалы',
+    )]
+
+
+def _grouped(queryset, field, **aggregates):
+    # order_by() убирает сортировку модели из GROUP BY
+    return {
+        row.pop(field): row
+        for row in queryset.values(field).annotate(**aggregates).order_by()
+    }
+
+
+def staff_metrics(restaurant_ids=None):
+    employees = Employee.objects.filter(restaurant__isnull=False)
+    if restaurant_ids is not None:
+        employees = employees.filter(restaurant_id__in=restaurant_ids)
+    return _grouped(employees, 'restaurant_id', employees_count=Count('id'))
+
+
+def stock_metrics(restaurant_ids=None):
+    stock = StockItem.objects.all()
+    if restaurant_ids is not None:
+        stock = stock.filter(restaurant_id__in=restaurant_ids)
+    return _grouped(
+        stock, 'restaurant_id',
+        stock_positions=Count('id'),
+        low_stock_count=Count('id', filter=Q(is_low=True)),
+    )
+
+
+def branch_metrics(start_date=None, end_date=None, restaurant_ids=None, families=FAMILIES):
+    """
+    Филиалы с показателями, отсортированные по убыванию выручки.
+
+    start_date, end_date - период заказов (даты, включительно); сотрудники
+    и склад - на текущий момент. families - какие семейства считать (по
+    запросу на каждое). Показатели записываются атрибутами объектов
+    Restaurant; средний чек avg_order_value - None, если заказов нет.
+    """
+    restaurants = Restaurant.objects.all()
+    if restaurant_ids is not None:
+        restaurant_ids = list(restaurant_ids)
+        restaurants = restaurants.filter(id__in=restaurant_ids)
+
+    # Ключ строки отчета («orders_completed») -> атрибут филиала
+    names = {metric.replace('@', '_'): name for metric, name in {**ORDER_METRICS, **ITEM_METRICS}.items()}
+    results = [
+        {row['restaurant']: {names[key]: value for key, value in row.items() if key in names} for row in rows}
+        for rows in run(*branch_reports(families, start_date, end_date, restaurant_ids))
+    ]
+    if 'staff' in families:
+        results.append(staff_metrics(restaurant_ids))
+    if 'stock' in families:
+        results.append(stock_metrics(restaurant_ids))
+
+    branches = list(restaurants)
+    for branch in branches:
+        for name, value in DEFAULTS.items():
+            setattr(branch, name, value)
+        for metrics in results:
+            for name, value in metrics.get(branch.id, {}).items():
+                setattr(branch, name, value if value is not None else DEFAULTS[name])
+
+    branches.sort(key=lambda branch: (-branch.revenue, branch.name))
+    return branches
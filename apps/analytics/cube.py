@@ -0,0 +1,311 @@
+# apps/analytics/cube.py
+"""
+Куб продаж для интерактивных срезов без обращения к базе.
+
+Продажи (без отмененных заказов) материализуются в плотные массивы
+NumPy:
+    - dish_units, dish_revenue - форма (день, филиал, блюдо);
+    - hour_units, hour_revenue, hour_orders - форма (день, филиал, час суток).
+Выручка хранится в копейках (int64) - суммы точные. День - первая ось,
+поэтому новые дни дописываются в конец массивов, а срез по периоду -
+непрерывный участок файла.
+
+Массивы лежат в CUBE_DIR/<версия>/*.npy и открываются через mmap только
+для чтения: все процессы сервера читают одни и те же страницы из кеша ОС,
+а не держат по копии в памяти. Описание куба (оси, число дней, версия) -
+meta.json, он заменяется атомарно (os.replace).
+
+Куб строится командой manage.py build_analytics_cube (ночной запуск):
+дописываются завершенные дни до вчерашнего, последние REFRESH_DAYS дней
+пересчитываются (поздние изменения статусов). Каждая сборка пишет новую
+версию (неизменные дни копируются из текущей), опубликованная версия
+никогда не меняется на месте. Массивы растут блоками по DAY_BLOCK дней;
+появление нового филиала или блюда, как и --rebuild, дает полную
+пересборку.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import date, datetime, time as day_time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Min, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from apps.menu.models import MenuItem
+from apps.orders.models import Order, OrderItem
+from apps.restaurants.models import Restaurant
+
+CUBE_DIR = settings.BASE_DIR / 'var' / 'analytics_cube'
+META = 'meta.json'
+
+DAY_BLOCK = 64
+REFRESH_DAYS = 2
+# Как часто процесс перечитывает meta.json
+REFRESH_SECONDS = 30
+
+ARRAYS = {
+    'dish_units': np.int32,
+    'dish_revenue': np.int64,
+    'hour_units': np.int32,
+    'hour_revenue': np.int64,
+    'hour_orders': np.int32,
+}
+METRICS = ('units', 'revenue', 'orders')
+GROUPS = ('total', 'day', 'weekday', 'restaurant', 'dish', 'hour')
+
+LINE_CENTS = ExpressionWrapper(
+    (F('price_at_moment') * F('quantity') - F('discount')) * 100,
+    output_field=DecimalField(max_digits=14, decimal_places=2)
+)
+
+
+class CubeError(ValueError):
+    """Срез нельзя получить из куба"""
+
+
+class Cube:
+    """Открытый только для чтения куб: оси и массивы в mmap"""
+
+    def __init__(self, meta, directory):
+        self.meta = meta
+        self.start = date.fromisoformat(meta['start'])
+        self.days = meta['days']
+        self.restaurants = np.array(meta['restaurants'], dtype=np.int64)
+        self.dishes = np.array(meta['dishes'], dtype=np.int64)
+        self.arrays = {
+            name: np.load(directory / f'{name}.npy', mmap_mode='r')
+            for name in ARRAYS
+        }
+
+    @property
+    def end(self):
+        """Последний день в кубе"""
+        return self.start + timedelta(days=self.days - 1)
+
+    def _positions(self, axis, ids):
+        if ids is None:
+            return slice(None)
+        ids = np.unique(np.asarray(list(ids), dtype=np.int64))
+        positions = np.searchsorted(axis, ids)
+        found = positions < len(axis)
+        found[found] = axis[positions[found]] == ids[found]
+        return positions[found]
+
+    def query(self, metric='revenue', group_by='day', start=None, end=None,
+              restaurant_ids=None, dish_ids=None, hours=None):
+        """
+        Срез куба: сумма metric (units, revenue, orders) по group_by
+        (total, day, weekday, restaurant, dish, hour) за дни start..end
+        включительно, с фильтрами по филиалам, блюдам и часам (range или
+        список часов). Возвращает (ключи, значения): даты, номера дней
+        недели (0 - понедельник), id филиалов и блюд, часы; для total -
+        ([None], [сумма]). Выручка - в рублях (float).
+        """
+        if metric not in METRICS:
+            raise CubeError(f'Неизвестный показатель: {metric}')
+        if group_by not in GROUPS:
+            raise CubeError(f'Неизвестная группировка: {group_by}')
+        by_hour = group_by == 'hour' or hours is not None or metric == 'orders'
+        if by_hour and (group_by == 'dish' or dish_ids is not None):
+            raise CubeError('Разрез по часам и число заказов не считаются по блюдам')
+
+        first = max((start - self.start).days, 0) if start else 0
+        last = min((end - self.start).days + 1, self.days) if end else self.days
+        last = max(last, first)
+
+        array = self.arrays[f'{"hour" if by_hour else "dish"}_{metric}'][first:last]
+        array = array[:, self._positions(self.restaurants, restaurant_ids)]
+        if by_hour:
+            if hours is not None:
+                array = array[:, :, sorted(set(hours) & set(range(24)))]
+        else:
+            array = array[:, :, self._positions(self.dishes, dish_ids)]
+
+        if group_by == 'total':
+            keys, values = [None], np.array([array.sum(dtype=np.int64)])
+        elif group_by in ('day', 'weekday'):
+            values = array.sum(axis=(1, 2), dtype=np.int64)
+            if group_by == 'day':
+                keys = [self.start + timedelta(days=first + i) for i in range(len(values))]
+            else:
+                weekdays = (self.start.weekday() + first + np.arange(len(values))) % 7
+                values = np.bincount(weekdays, weights=values, minlength=7).astype(np.int64)
+                keys = list(range(7))
+        elif group_by == 'restaurant':
+            values = array.sum(axis=(0, 2), dtype=np.int64)
+            keys = self.restaurants[self._positions(self.restaurants, restaurant_ids)].tolist()
+        elif group_by == 'dish':
+            values = array.sum(axis=(0, 1), dtype=np.int64)
+            keys = self.dishes[self._positions(self.dishes, dish_ids)].tolist()
+        else:
+            values = array.sum(axis=(0, 1), dtype=np.int64)
+            keys = sorted(set(hours) & set(range(24))) if hours is not None else list(range(24))
+
+        if metric == 'revenue':
+            return keys, (values / 100).tolist()
+        return keys, values.tolist()
+
+
+def _read_meta():
+    try:
+        with open(CUBE_DIR / META) as meta_file:
+            return json.load(meta_file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_meta(meta):
+    temporary = CUBE_DIR / f'{META}.{uuid.uuid4().hex}'
+    with open(temporary, 'w') as meta_file:
+        json.dump(meta, meta_file)
+    os.replace(temporary, CUBE_DIR / META)
+
+
+# (meta, куб, время проверки)
+_cube = None
+
+
+def get_cube():
+    """Куб процесса или None, если он еще не построен; meta.json перечитывается раз в REFRESH_SECONDS"""
+    global _cube
+    now = time.monotonic()
+    if _cube and now - _cube[2] < REFRESH_SECONDS:
+        return _cube[1]
+
+    meta = _read_meta()
+    if meta is None:
+        cube = None
+    elif _cube and _cube[0] == meta:
+        cube = _cube[1]
+    else:
+        cube = Cube(meta, CUBE_DIR / meta['version'])
+    _cube = (meta, cube, now)
+    return cube
+
+
+def reset():
+    global _cube
+    _cube = None
+
+
+def _fill(arrays, start, first, last, restaurants, dishes):
+    """Записать продажи дней first..last-1 (индексы от start) в массивы"""
+    for array in arrays.values():
+        array[first:last] = 0
+    if last <= first:
+        return
+
+    restaurant_index = {restaurant_id: i for i, restaurant_id in enumerate(restaurants)}
+    dish_index = {dish_id: i for i, dish_id in enumerate(dishes)}
+    items = OrderItem.objects.filter(
+        order__created_at__gte=_day_start(start + timedelta(days=first)),
+        order__created_at__lt=_day_start(start + timedelta(days=last)),
+    ).exclude(order__status=Order.Status.CANCELLED)
+
+    rows = items.annotate(day=TruncDate('order__created_at')).values_list(
+        'day', 'order__restaurant_id', 'menu_item_id'
+    ).annotate(units=Sum('quantity'), cents=Sum(LINE_CENTS)).order_by()
+    data = np.array([
+        ((day - start).days, restaurant_index[restaurant_id], dish_index[dish_id], units, int(cents or 0))
+        for day, restaurant_id, dish_id, units, cents in rows
+    ], dtype=np.int64).reshape(-1, 5)
+    np.add.at(arrays['dish_units'], (data[:, 0], data[:, 1], data[:, 2]), data[:, 3])
+    np.add.at(arrays['dish_revenue'], (data[:, 0], data[:, 1], data[:, 2]), data[:, 4])
+
+    rows = items.annotate(day=TruncDate('order__created_at'), hour=ExtractHour('order__created_at')).values_list(
+        'day', 'order__restaurant_id', 'hour'
+    ).annotate(units=Sum('quantity'), cents=Sum(LINE_CENTS), orders=Count('order', distinct=True)).order_by()
+    data = np.array([
+        ((day - start).days, restaurant_index[restaurant_id], hour, units, int(cents or 0), orders)
+        for day, restaurant_id, hour, units, cents, orders in rows
+    ], dtype=np.int64).reshape(-1, 6)
+    index = (data[:, 0], data[:, 1], data[:, 2])
+    np.add.at(arrays['hour_units'], index, data[:, 3])
+    np.add.at(arrays['hour_revenue'], index, data[:, 4])
+    np.add.at(arrays['hour_orders'], index, data[:, 5])
+
+    for array in arrays.values():
+        array.flush()
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, day_time.min))
+
+
+def _capacity(days):
+    return max(DAY_BLOCK, -(-days // DAY_BLOCK) * DAY_BLOCK)
+
+
+def _create(version, capacity, restaurants, dishes, previous=None, copy_days=0):
+    """Новая версия массивов; из previous копируются первые copy_days дней"""
+    directory = CUBE_DIR / version
+    directory.mkdir(parents=True)
+    arrays = {}
+    for name, dtype in ARRAYS.items():
+        width = len(dishes) if name.startswith('dish') else 24
+        arrays[name] = np.lib.format.open_memmap(
+            directory / f'{name}.npy', mode='w+', dtype=dtype, shape=(capacity, len(restaurants), width)
+        )
+        if previous is not None and copy_days:
+            arrays[name][:copy_days] = previous.arrays[name][:copy_days]
+    return arrays
+
+
+def _remove_old_versions(keep):
+    # Процессы, открывшие старую версию, дочитывают ее: файлы удаляются из
+    # каталога, но страницы живут, пока открыт mmap
+    for path in CUBE_DIR.iterdir():
+        if path.is_dir() and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def build_cube(rebuild=False, today=None):
+    """
+    Достроить куб до вчерашнего дня включительно; возвращает словарь
+    days (дней в кубе), filled (пересчитано дней), rebuilt (полная
+    пересборка).
+    """
+    today = today or timezone.localdate()
+    CUBE_DIR.mkdir(parents=True, exist_ok=True)
+    restaurants = sorted(Restaurant.objects.values_list('id', flat=True))
+    dishes = sorted(MenuItem.objects.values_list('id', flat=True))
+    meta = _read_meta()
+
+    if meta and not rebuild and meta['restaurants'] == restaurants and meta['dishes'] == dishes:
+        start = date.fromisoformat(meta['start'])
+        days = max((today - start).days, 0)
+        first = max(min(meta['days'], days) - REFRESH_DAYS, 0)
+        # Открытую другими процессами версию не меняем: неизменные дни
+        # копируются в новую версию (большего размера, если места под новые
+        # дни нет), читатели переключаются на нее через meta.json
+        capacity = max(meta['capacity'], _capacity(days))
+        version = uuid.uuid4().hex
+        arrays = _create(version, capacity, restaurants, dishes, Cube(meta, CUBE_DIR / meta['version']), first)
+        rebuilt = False
+    else:
+        first_order = Order.objects.aggregate(first=Min('created_at'))['first']
+        start = timezone.localtime(first_order).date() if first_order else today
+        days = max((today - start).days, 0)
+        first = 0
+        version, capacity = uuid.uuid4().hex, _capacity(days)
+        arrays = _create(version, capacity, restaurants, dishes)
+        rebuilt = True
+
+    _fill(arrays, start, first, days, restaurants, dishes)
+    _write_meta({
+        'version': version,
+        'start': start.isoformat(),
+        'days': days,
+        'capacity': capacity,
+        'restaurants': restaurants,
+        'dishes': dishes,
+        'built_at': timezone.now().isoformat(),
+    })
+    _remove_old_versions(version)
+    reset()
+    return {'days': days, 'filled': days - first, 'rebuilt': rebuilt}
@@ -0,0 +1,184 @@
+# apps/analytics/distributions.py
+"""
+Распределения заказов по дневным сводкам: перцентили суммы заказа,
+числа порций и времени приготовления, число различных столов и блюд.
+
+Для каждого ресторана и дня хранится DailySketch. Изменение заказа
+помечает сводку его дня устаревшей (см. signals), refresh_stale
+пересобирает только устаревшие дни по заказам этих дней. Перцентили за
+период получаются объединением дневных сводок - число читаемых строк
+равно числу дней (× ресторанов), а не числу заказов. Полный пересчет -
+команда rebuild_daily_sketches.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem
+from .models import DailySketch
+from .sketches import DistinctSketch, QuantileSketch
+
+QUANTILE_FIELDS = {
+    'order_value': 'Сумма заказа',
+    'items_per_order': 'Порций в заказе',
+    'prep_minutes': 'Время приготовления (мин)',
+}
+DISTINCT_FIELDS = {
+    'tables': 'Столов',
+    'dishes': 'Блюд',
+}
+PERCENTILES = (50, 75, 90, 95, 99)
+
+# Сколько устаревших дней пересобирается за один проход
+REFRESH_BATCH = 60
+
+
+def mark_stale(restaurant_id, moment):
+    """Пометить день заказа устаревшим (строка создается, если ее еще нет)"""
+    day = timezone.localtime(moment).date()
+    DailySketch.objects.bulk_create([DailySketch(restaurant_id=restaurant_id, day=day)], ignore_conflicts=True)
+    DailySketch.objects.filter(restaurant_id=restaurant_id, day=day).update(
+        is_stale=True, revision=F('revision') + 1
+    )
+
+
+def _build(condition):
+    """(ресторан, день) -> значения полей DailySketch по заказам, подходящим под condition"""
+    orders = Order.objects.filter(condition).exclude(status=Order.Status.CANCELLED)
+    values = defaultdict(lambda: defaultdict(list))
+    for _, restaurant_id, created_at, completed_at, total_price, table_number, units in orders.values_list(
+        'id', 'restaurant_id', 'created_at', 'completed_at', 'total_price', 'table_number'
+    ).annotate(units=Sum('items__quantity')).order_by():
+        day = values[restaurant_id, timezone.localtime(created_at).date()]
+        day['order_value'].append(total_price)
+        day['items_per_order'].append(units or 0)
+        if completed_at:
+            day['prep_minutes'].append(max((completed_at - created_at).total_seconds(), 0) / 60)
+        if table_number:
+            day['tables'].append(f'{restaurant_id}:{table_number}')
+
+    for restaurant_id, created_at, dish_id in OrderItem.objects.filter(order__in=orders).values_list(
+        'order__restaurant_id', 'order__created_at', 'menu_item_id'
+    ).distinct():
+        values[restaurant_id, timezone.localtime(created_at).date()]['dishes'].append(dish_id)
+
+    sketches = {}
+    for key, day in values.items():
+        fields = {'orders': len(day['order_value'])}
+        for field in QUANTILE_FIELDS:
+            fields[field] = QuantileSketch().extend(day[field]).to_bytes()
+        for field in DISTINCT_FIELDS:
+            fields[field] = DistinctSketch().extend(day[field]).to_bytes()
+        sketches[key] = fields
+    return sketches
+
+
+def _empty():
+    fields = {'orders': 0}
+    fields.update({field: b'' for field in (*QUANTILE_FIELDS, *DISTINCT_FIELDS)})
+    return fields
+
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def refresh_stale():
+    """Пересобрать устаревшие дни; возвращает число пересобранных строк"""
+    refreshed = 0
+    while True:
+        stale = list(DailySketch.objects.filter(is_stale=True).values_list(
+            'id', 'restaurant_id', 'day', 'revision'
+        )[:REFRESH_BATCH])
+        if not stale:
+            return refreshed
+
+        condition = Q()
+        for _, restaurant_id, day, _ in stale:
+            start, end = _day_range(day)
+            condition |= Q(restaurant_id=restaurant_id, created_at__gte=start, created_at__lt=end)
+        sketches = _build(condition)
+
+        with transaction.atomic():
+            for row_id, restaurant_id, day, revision in stale:
+                # Если день снова пометили во время пересборки, строка
+                # остается устаревшей и пересобирается следующим проходом
+                refreshed += DailySketch.objects.filter(id=row_id, revision=revision).update(
+                    is_stale=False, **sketches.get((restaurant_id, day), _empty())
+                )
+
+
+def rebuild():
+    """Полный пересчет дневных сводок по всей истории; возвращает число строк"""
+    sketches = _build(Q())
+    with transaction.atomic():
+        DailySketch.objects.all().delete()
+        DailySketch.objects.bulk_create([
+            DailySketch(restaurant_id=restaurant_id, day=day, is_stale=False, **fields)
+            for (restaurant_id, day), fields in sketches.items()
+        ], batch_size=500)
+    return len(sketches)
+
+
+def _rows(start_date=None, end_date=None, restaurant_ids=None):
+    refresh_stale()
+    rows = DailySketch.objects.all()
+    if start_date:
+        rows = rows.filter(day__gte=start_date)
+    if end_date:
+        rows = rows.filter(day__lte=end_date)
+    if restaurant_ids:
+        rows = rows.filter(restaurant_id__in=restaurant_ids)
+    return rows
+
+
+def _summary(orders, quantiles, distinct):
+    result = {'orders': orders}
+    for field, title in QUANTILE_FIELDS.items():
+        sketch = quantiles[field]
+        result[field] = {
+            'title': title,
+            'count': sketch.count,
+            'percentiles': {f'p{p}': _round(sketch.quantile(p / 100)) for p in PERCENTILES},
+        }
+    for field, title in DISTINCT_FIELDS.items():
+        result[field] = {'title': title, 'estimate': distinct[field].estimate()}
+    return result
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def distribution(start_date=None, end_date=None, restaurant_ids=None):
+    """
+    Распределения за период: для полей QUANTILE_FIELDS - число значений и
+    перцентили PERCENTILES, для DISTINCT_FIELDS - оценка числа различных.
+    """
+    quantiles = {field: QuantileSketch() for field in QUANTILE_FIELDS}
+    distinct = {field: DistinctSketch() for field in DISTINCT_FIELDS}
+    orders = 0
+    for row in _rows(start_date, end_date, restaurant_ids).values('orders', *QUANTILE_FIELDS, *DISTINCT_FIELDS):
+        orders += row['orders']
+        for field in QUANTILE_FIELDS:
+            quantiles[field].merge(QuantileSketch.from_bytes(row[field]))
+        for field in DISTINCT_FIELDS:
+            distinct[field].merge(DistinctSketch.from_bytes(row[field]))
+    return _summary(orders, quantiles, distinct)
+
+
+def daily_percentiles(field, start_date=None, end_date=None, restaurant_ids=None, percentiles=(50, 90, 99)):
+    """Ряд перцентилей поля QUANTILE_FIELDS по дням: [(день, {pNN: значение})]"""
+    if field not in QUANTILE_FIELDS:
+        raise ValueError(f'Неизвестное распределение: {field}')
+    days = defaultdict(QuantileSketch)
+    for day, payload in _rows(start_date, end_date, restaurant_ids).values_list('day', field):
+        days[day].merge(QuantileSketch.from_bytes(payload))
+    return [
+        (day, {f'p{p}': _round(days[day].quantile(p / 100)) for p in percentiles})
+        for day in sorted(days)
+    ]
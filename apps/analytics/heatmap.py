@@ -0,0 +1,134 @@
+# apps/analytics/heatmap.py
+"""
+Почасовой свод продаж и тепловая карта «час суток × день недели».
+
+Заказы сворачиваются в HourlySales: одна строка на ресторан и час
+(заказы, порции, выручка без отмененных заказов). Сохранение или
+удаление заказа и позиции помечает строку его часа устаревшей (см.
+signals), а refresh_stale пересчитывает только устаревшие часы - по
+заказам внутри этих часов, без разбора created_at по всей истории.
+Полный пересчет истории - команда rebuild_hourly_sales.
+
+Тепловая карта читает только свод: не больше 24 строк на ресторан и
+день.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem
+from .models import HourlySales
+
+METRICS = ('orders', 'revenue', 'units')
+WEEKDAYS = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+# Сколько устаревших часов пересчитывается одним запросом
+REFRESH_BATCH = 200
+
+
+def hour_start(moment):
+    """Начало местного часа, в котором находится moment"""
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _row(restaurant_id, hour, **values):
+    return HourlySales(restaurant_id=restaurant_id, hour=hour, weekday=hour.weekday(),
+                       hour_of_day=hour.hour, **values)
+
+
+def mark_stale(restaurant_id, moment):
+    """Пометить час заказа устаревшим (строка создается, если ее еще нет)"""
+    hour = hour_start(moment)
+    HourlySales.objects.bulk_create([_row(restaurant_id, hour)], ignore_conflicts=True)
+    HourlySales.objects.filter(restaurant_id=restaurant_id, hour=hour).update(
+        is_stale=True, revision=F('revision') + 1
+    )
+
+
+def _aggregate(condition):
+    """(ресторан, начало часа) -> заказы, порции и выручка по заказам, подходящим под condition"""
+    totals = defaultdict(lambda: {'orders': 0, 'units': 0, 'revenue': 0})
+    orders = Order.objects.filter(condition).exclude(status=Order.Status.CANCELLED)
+    for restaurant_id, hour, count, revenue in orders.annotate(bucket=TruncHour('created_at')).values_list(
+        'restaurant_id', 'bucket'
+    ).annotate(count=Count('id'), revenue=Sum('total_price')).order_by():
+        totals[restaurant_id, hour].update(orders=count, revenue=revenue or 0)
+
+    items = OrderItem.objects.filter(order__in=orders)
+    for restaurant_id, hour, units in items.annotate(bucket=TruncHour('order__created_at')).values_list(
+        'order__restaurant_id', 'bucket'
+    ).annotate(units=Sum('quantity')).order_by():
+        totals[restaurant_id, hour]['units'] = units or 0
+    return totals
+
+
+def refresh_stale():
+    """Пересчитать устаревшие часы; возвращает число пересчитанных строк"""
+    refreshed = 0
+    while True:
+        stale = list(HourlySales.objects.filter(is_stale=True).values_list(
+            'id', 'restaurant_id', 'hour', 'revision'
+        )[:REFRESH_BATCH])
+        if not stale:
+            return refreshed
+
+        condition = Q()
+        for _, restaurant_id, hour, _ in stale:
+            condition |= Q(restaurant_id=restaurant_id, created_at__gte=hour,
+                           created_at__lt=hour + timedelta(hours=1))
+        totals = _aggregate(condition)
+
+        with transaction.atomic():
+            for row_id, restaurant_id, hour, revision in stale:
+                values = totals.get((restaurant_id, hour_start(hour)), {'orders': 0, 'units': 0, 'revenue': 0})
+                # Если час снова пометили во время пересчета, строка
+                # остается устаревшей и пересчитается следующим проходом
+                refreshed += HourlySales.objects.filter(id=row_id, revision=revision).update(
+                    is_stale=False, **values
+                )
+
+
+def rebuild():
+    """Полный пересчет свода по всей истории заказов; возвращает число строк"""
+    totals = _aggregate(Q())
+    with transaction.atomic():
+        HourlySales.objects.all().delete()
+        HourlySales.objects.bulk_create([
+            _row(restaurant_id, hour_start(hour), is_stale=False, **values)
+            for (restaurant_id, hour), values in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def heatmap(metric='orders', start_date=None, end_date=None, restaurant_ids=None):
+    """
+    Тепловая карта metric (orders, revenue, units) за дни
+    start_date..end_date: матрица 7 × 24 (дни недели с понедельника ×
+    часы суток). Перед чтением пересчитываются устаревшие часы.
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Неизвестный показатель: {metric}')
+    refresh_stale()
+
+    rows = HourlySales.objects.all()
+    if start_date:
+        rows = rows.filter(hour__gte=_day_start(start_date))
+    if end_date:
+        rows = rows.filter(hour__lt=_day_start(end_date + timedelta(days=1)))
+    if restaurant_ids:
+        rows = rows.filter(restaurant_id__in=restaurant_ids)
+
+    matrix = [[0] * 24 for _ in WEEKDAYS]
+    for weekday, hour_of_day, value in rows.values_list('weekday', 'hour_of_day').annotate(
+        value=Sum(metric)
+    ).order_by():
+        matrix[weekday][hour_of_day] = float(value) if metric == 'revenue' else value
+    return matrix
@@ -0,0 +1,32 @@
+# apps/analytics/management/commands/build_analytics_cube.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.analytics.cube import build_cube, get_cube
+
+
+class Command(BaseCommand):
+    help = 'Достроить куб продаж для срезов аналитики до вчерашнего дня (ночной запуск)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Пересобрать куб с нуля')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = build_cube(rebuild=options['rebuild'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Куб продаж: дней {result["days"]}, пересчитано {result["filled"]}'
+            f'{" (полная пересборка)" if result["rebuilt"] else ""} за {elapsed:.2f} с'
+        ))
+
+        cube = get_cube()
+        if cube is None or not cube.days:
+            return
+        for group_by, metric in (('day', 'revenue'), ('restaurant', 'revenue'),
+                                 ('dish', 'units'), ('hour', 'orders'), ('weekday', 'revenue')):
+            started = time.perf_counter()
+            cube.query(metric=metric, group_by=group_by)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'  {metric} по {group_by}: {elapsed:.2f} мс')
@@ -0,0 +1,35 @@
+# apps/analytics/management/commands/explain_reports.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.analytics.branches import FAMILIES, branch_reports
+from apps.analytics.reports import Plan
+from apps.analytics.views import dashboard_reports, menu_reports, sales_reports
+
+
+class Command(BaseCommand):
+    help = 'План запросов страниц аналитики: какие GROUP BY выполняются и какие отчеты из них получаются'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sql', action='store_true', help='Показать SQL запросов')
+        parser.add_argument('--explain', action='store_true', help='Показать план СУБД (EXPLAIN)')
+
+    def handle(self, *args, **options):
+        pages = [
+            ('Дашборд', dashboard_reports(timezone.localdate())),
+            ('Отчет по продажам', sales_reports()),
+            ('Отчет по меню', menu_reports()),
+            ('Отчет по филиалам', branch_reports(FAMILIES)),
+        ]
+        for title, reports in pages:
+            plan = Plan(*reports)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{title}: отчетов {len(reports)}, запросов {len(plan.queries)}'
+            ))
+            for query in plan.queries:
+                self.stdout.write(f'  {query.describe()}')
+                if options['sql']:
+                    self.stdout.write(f'    {query.sql}')
+                if options['explain']:
+                    for line in query.explain().splitlines():
+                        self.stdout.write(f'    {line}')
@@ -0,0 +1,23 @@
+# apps/analytics/management/commands/forecast_sales.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.analytics.forecast import HISTORY_DAYS, HORIZON, save_forecast
+
+
+class Command(BaseCommand):
+    help = 'Прогноз продаж блюд по ресторанам на ближайшие дни (ночной запуск)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=HORIZON, help='Горизонт прогноза в днях')
+        parser.add_argument('--history', type=int, default=HISTORY_DAYS,
+                            help='Сколько дней истории продаж использовать')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        series, rows = save_forecast(horizon=options['days'], history_days=options['history'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогноз продаж: рядов {series}, записано строк {rows} за {elapsed:.2f} с'
+        ))
@@ -0,0 +1,24 @@
+# apps/analytics/management/commands/rebuild_daily_sketches.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.analytics.distributions import rebuild, refresh_stale
+
+
+class Command(BaseCommand):
+    help = 'Дневные сводки распределений заказов: пересборка устаревших дней или всей истории'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересобрать сводки по всей истории заказов')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['full']:
+            rows = rebuild()
+            message = f'Сводки пересобраны: дней {rows}'
+        else:
+            rows = refresh_stale()
+            message = f'Пересобрано устаревших дней: {rows}'
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'{message} за {elapsed:.2f} с'))
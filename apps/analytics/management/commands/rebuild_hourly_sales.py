@@ -0,0 +1,24 @@
+# apps/analytics/management/commands/rebuild_hourly_sales.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.analytics.heatmap import rebuild, refresh_stale
+
+
+class Command(BaseCommand):
+    help = 'Почасовой свод продаж для тепловой карты: пересчет устаревших часов или всей истории'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Пересчитать свод по всей истории заказов')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['full']:
+            rows = rebuild()
+            message = f'Свод пересобран: часов {rows}'
+        else:
+            rows = refresh_stale()
+            message = f'Пересчитано устаревших часов: {rows}'
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'{message} за {elapsed:.2f} с'))
@@ -0,0 +1,235 @@
+# apps/analytics/menu_engineering.py
+"""
+Матрица меню (menu engineering): каждое блюдо филиала относится к
+одному из четырех классов по популярности и маржинальной прибыли порции.
+
+- популярность - доля блюда в порциях филиала; высокая, если не меньше
+  POPULARITY_FACTOR / (число блюд в меню филиала);
+- маржа порции - средняя цена продажи минус себестоимость; высокая, если
+  не меньше средневзвешенной маржи порции по филиалу.
+
+Себестоимость порции - по рецепту (apps.menu.models.Recipe, количество ×
+стоимость единицы ингредиента), а для блюд без рецепта - cost_price
+блюда. Цена продажи - фактическая выручка порции за период, для блюд
+без продаж - цена в филиале (с учетом MenuItemOverride).
+
+Все филиалы считаются одним проходом: продажи, рецепты, блюда и
+настройки филиалов читаются четырьмя запросами, классификация -
+операции NumPy над матрицами «филиал × блюдо» без циклов по блюдам.
+Результат каждого филиала и сети в целом кешируется по (филиал, период);
+для закрытого периода - дольше.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from apps.menu.models import MenuItem, MenuItemOverride, Recipe
+from apps.orders.models import Order, OrderItem
+from apps.restaurants.models import Restaurant
+
+# (код, название, цвет Bootstrap, рекомендация)
+CLASSES = (
+    ('star', 'Звезда', 'success', 'Сохранить цену и подачу, держать на виду'),
+    ('plowhorse', 'Рабочая лошадка', 'primary', 'Поднять цену или снизить себестоимость'),
+    ('puzzle', 'Загадка', 'warning', 'Продвигать: место в меню, рекомендации официантов'),
+    ('dog', 'Собака', 'secondary', 'Пересмотреть или убрать из меню'),
+)
+CLASS_NAMES = {code: name for code, name, _, _ in CLASSES}
+
+# Порог популярности - доля от равной доли блюда (правило 70%)
+POPULARITY_FACTOR = 0.7
+
+# Сколько хранится результат для периода, включающего сегодня, и для закрытого
+CACHE_TIMEOUT = 10 * 60
+CLOSED_CACHE_TIMEOUT = 24 * 60 * 60
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+CENT = Decimal('0.01')
+
+
+def _cache_key(restaurant_id, start_date, end_date):
+    return f'analytics:menu_engineering:{restaurant_id or "all"}:{start_date or ""}:{end_date or ""}'
+
+
+def _load(start_date, end_date):
+    """
+    Матрицы «филиал × блюдо»: порции и выручка за период, цена в филиале,
+    признак блюда в меню филиала; вектор себестоимости порции.
+    """
+    restaurants = list(Restaurant.objects.order_by('pk').values_list('pk', flat=True))
+    items = list(MenuItem.objects.order_by('pk').values_list(
+        'pk', 'price', 'cost_price', 'is_available', 'name', 'category__name'
+    ))
+    r_index = {pk: i for i, pk in enumerate(restaurants)}
+    d_index = {item[0]: j for j, item in enumerate(items)}
+    shape = (len(restaurants), len(items))
+
+    prices = np.tile(np.array([float(item[1]) for item in items]), (shape[0], 1))
+    on_menu = np.tile(np.array([item[3] for item in items], dtype=bool), (shape[0], 1))
+    for restaurant_id, dish_id, price, is_available in MenuItemOverride.objects.filter(
+        Q(price__isnull=False) | Q(is_available__isnull=False)
+    ).values_list('restaurant_id', 'menu_item_id', 'price', 'is_available'):
+        i, j = r_index[restaurant_id], d_index[dish_id]
+        if price is not None:
+            prices[i, j] = float(price)
+        if is_available is not None:
+            on_menu[i, j] = is_available
+
+    # Себестоимость: рецепт, иначе cost_price блюда (NaN - неизвестна)
+    costs = np.array([np.nan if item[2] is None else float(item[2]) for item in items])
+    for dish_id, cost in Recipe.objects.values('dish_id').annotate(
+        cost=Sum(ExpressionWrapper(F('quantity') * F('ingredient__cost_per_unit'), output_field=MONEY))
+    ).values_list('dish_id', 'cost'):
+        costs[d_index[dish_id]] = float(cost or 0)
+
+    sales = OrderItem.objects.exclude(order__status=Order.Status.CANCELLED)
+    if start_date:
+        sales = sales.filter(order__created_at__date__gte=start_date)
+    if end_date:
+        sales = sales.filter(order__created_at__date__lte=end_date)
+    rows = list(sales.values_list('order__restaurant_id', 'menu_item_id').annotate(
+        units=Sum('quantity'),
+        revenue=Sum(ExpressionWrapper(F('price_at_moment') * F('quantity') - F('discount'), output_field=MONEY)),
+    ).order_by())
+
+    units = np.zeros(shape)
+    revenue = np.zeros(shape)
+    if rows:
+        i = np.array([r_index[row[0]] for row in rows])
+        j = np.array([d_index[row[1]] for row in rows])
+        units[i, j] = [row[2] for row in rows]
+        revenue[i, j] = [float(row[3] or 0) for row in rows]
+    return restaurants, items, units, revenue, prices, on_menu, costs
+
+
+def classify(units, revenue, prices, on_menu, costs):
+    """
+    Классификация блюд по строкам матриц (одна строка - один филиал или
+    сеть). Возвращает словарь матриц: included (блюдо в меню или
+    продавалось), share, margin (маржа порции), total_margin, классы
+    high_popularity и high_margin и пороги по строкам.
+    """
+    included = on_menu | (units > 0)
+    menu_size = included.sum(axis=1, keepdims=True)
+    total_units = units.sum(axis=1, keepdims=True)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(total_units > 0, units / total_units, 0.0)
+        price = np.where(units > 0, revenue / units, prices)
+        popularity_threshold = np.where(menu_size > 0, POPULARITY_FACTOR / menu_size, 0.0)
+
+    # Неизвестная себестоимость считается нулевой для маржи, но блюдо
+    # помечается в отчете
+    margin = price - np.nan_to_num(costs)[None, :]
+    total_margin = margin * units
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin_threshold = np.where(total_units > 0, total_margin.sum(axis=1, keepdims=True) / total_units, 0.0)
+
+    return {
+        'included': included,
+        'share': share,
+        'price': price,
+        'margin': margin,
+        'total_margin': total_margin,
+        'high_popularity': share >= popularity_threshold,
+        'high_margin': margin >= margin_threshold,
+        'popularity_threshold': popularity_threshold[:, 0],
+        'margin_threshold': margin_threshold[:, 0],
+    }
+
+
+def _class_codes(high_popularity, high_margin):
+    codes = np.array([code for code, _, _, _ in CLASSES])
+    # star, plowhorse, puzzle, dog
+    return codes[np.where(high_popularity, np.where(high_margin, 0, 1), np.where(high_margin, 2, 3))]
+
+
+def _money(value):
+    return Decimal(float(value)).quantize(CENT)
+
+
+def _report(row, result, items, units, costs):
+    """Отчет одной строки матриц: блюда, пороги и число блюд по классам"""
+    included = np.flatnonzero(result['included'][row])
+    codes = _class_codes(result['high_popularity'][row], result['high_margin'][row])
+    order = {code: position for position, (code, _, _, _) in enumerate(CLASSES)}
+
+    dishes = [
+        {
+            'id': items[j][0],
+            'name': items[j][4],
+            'category': items[j][5] or '',
+            'units': int(units[row, j]),
+            'share': round(float(result['share'][row, j]) * 100, 2),
+            'price': _money(result['price'][row, j]),
+            'cost': None if np.isnan(costs[j]) else _money(costs[j]),
+            'margin': _money(result['margin'][row, j]),
+            'total_margin': _money(result['total_margin'][row, j]),
+            'class': str(codes[j]),
+            'class_name': CLASS_NAMES[str(codes[j])],
+        }
+        for j in included.tolist()
+    ]
+    dishes.sort(key=lambda dish: (order[dish['class']], -dish['total_margin']))
+    summary = {code: 0 for code, _, _, _ in CLASSES}
+    for dish in dishes:
+        summary[dish['class']] += 1
+    return {
+        'dishes': dishes,
+        'summary': summary,
+        'popularity_threshold': round(float(result['popularity_threshold'][row]) * 100, 2),
+        'margin_threshold': _money(result['margin_threshold'][row]),
+        'total_units': int(units[row].sum()),
+        'total_margin': _money(result['total_margin'][row].sum()),
+    }
+
+
+def compute(start_date=None, end_date=None):
+    """
+    Матрица меню каждого филиала и сети за период: {restaurant_id или
+    None (сеть): отчет}. Сеть - суммы продаж всех филиалов, блюдо в меню
+    сети, если оно в меню хотя бы одного филиала.
+    """
+    restaurants, items, units, revenue, prices, on_menu, costs = _load(start_date, end_date)
+    if not items:
+        return {}
+
+    # Строка сети - последняя: цена без продаж - базовая цена блюда
+    base_prices = np.array([float(item[1]) for item in items])
+    base_menu = np.array([item[3] for item in items], dtype=bool)
+    units = np.vstack([units, units.sum(axis=0)])
+    revenue = np.vstack([revenue, revenue.sum(axis=0)])
+    prices = np.vstack([prices, base_prices])
+    on_menu = np.vstack([on_menu, on_menu.any(axis=0) if restaurants else base_menu])
+
+    result = classify(units, revenue, prices, on_menu, costs)
+    return {
+        restaurant_id: _report(row, result, items, units, costs)
+        for row, restaurant_id in enumerate([*restaurants, None])
+    }
+
+
+def menu_engineering(start_date=None, end_date=None, restaurant_id=None):
+    """
+    Матрица меню филиала (или сети при restaurant_id=None) за период.
+
+    При промахе кеша считаются все филиалы сразу и кладутся в кеш
+    одним set_many: соседние филиалы за тот же период уже готовы.
+    """
+    key = _cache_key(restaurant_id, start_date, end_date)
+    report = cache.get(key)
+    if report is None:
+        reports = compute(start_date, end_date)
+        closed = end_date is not None and end_date < timezone.localdate()
+        cache.set_many(
+            {_cache_key(pk, start_date, end_date): value for pk, value in reports.items()},
+            CLOSED_CACHE_TIMEOUT if closed else CACHE_TIMEOUT,
+        )
+        report = reports.get(restaurant_id) or {
+            'dishes': [], 'summary': {code: 0 for code, _, _, _ in CLASSES},
+            'popularity_threshold': 0, 'margin_threshold': Decimal(0), 'total_units': 0, 'total_margin': Decimal(0),
+        }
+    return report
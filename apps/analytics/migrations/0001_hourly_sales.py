@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Начало часа')),
+                ('weekday', models.PositiveSmallIntegerField(help_text='0 - понедельник ... 6 - воскресенье', verbose_name='День недели')),
+                ('hour_of_day', models.PositiveSmallIntegerField(verbose_name='Час суток')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Порций')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+                ('is_stale', models.BooleanField(default=True, verbose_name='Устарела')),
+                ('revision', models.PositiveIntegerField(default=0, help_text='Увеличивается при каждой пометке устаревшей', verbose_name='Ревизия')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_sales', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Продажи за час',
+                'verbose_name_plural': 'Продажи по часам',
+                'indexes': [models.Index(fields=['hour', 'restaurant'], name='hourly_sales_hour_idx'), models.Index(condition=models.Q(('is_stale', True)), fields=['is_stale'], name='hourly_sales_stale_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'hour'), name='unique_hourly_sales')],
+            },
+        ),
+    ]
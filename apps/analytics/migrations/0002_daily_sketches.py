@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_hourly_sales'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('order_value', models.BinaryField(default=b'', verbose_name='Суммы заказов')),
+                ('items_per_order', models.BinaryField(default=b'', verbose_name='Порций в заказе')),
+                ('prep_minutes', models.BinaryField(default=b'', verbose_name='Время приготовления')),
+                ('tables', models.BinaryField(default=b'', verbose_name='Столы')),
+                ('dishes', models.BinaryField(default=b'', verbose_name='Блюда')),
+                ('is_stale', models.BooleanField(default=True, verbose_name='Устарела')),
+                ('revision', models.PositiveIntegerField(default=0, help_text='Увеличивается при каждой пометке устаревшей', verbose_name='Ревизия')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sketches', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Сводка распределений за день',
+                'verbose_name_plural': 'Сводки распределений по дням',
+                'indexes': [models.Index(fields=['day', 'restaurant'], name='daily_sketch_day_idx'), models.Index(condition=models.Q(('is_stale', True)), fields=['is_stale'], name='daily_sketch_stale_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'day'), name='unique_daily_sketch')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_daily_sketches'),
+        ('menu', '0007_menu_item_overrides'),
+        ('orders', '0004_order_completed_at'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BasketOrder',
+            fields=[
+                ('order', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='orders.order', verbose_name='Заказ')),
+                ('dishes', models.JSONField(default=list, verbose_name='Блюда')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Учтенный заказ',
+                'verbose_name_plural': 'Учтенные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='BasketTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='basket_total', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Итог корзин',
+                'verbose_name_plural': 'Итоги корзин',
+            },
+        ),
+        migrations.CreateModel(
+            name='DishPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('companion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menuitem', verbose_name='Вместе с блюдом')),
+                ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.menuitem', verbose_name='Блюдо')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dish_pairs', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Пара блюд',
+                'verbose_name_plural': 'Пары блюд',
+                'indexes': [models.Index(fields=['restaurant', 'dish', '-orders'], name='dish_pair_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'dish', 'companion'), name='unique_dish_pair')],
+            },
+        ),
+    ]
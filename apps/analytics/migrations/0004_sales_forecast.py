@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_dish_pairs'),
+        ('menu', '0007_menu_item_overrides'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('units', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Порций')),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Выручка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Рассчитан')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_forecasts', to='menu.menuitem', verbose_name='Блюдо')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_forecasts', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Прогноз продаж',
+                'verbose_name_plural': 'Прогнозы продаж',
+                'indexes': [models.Index(fields=['day', 'restaurant'], name='sales_forecast_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'menu_item', 'day'), name='unique_sales_forecast')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_sales_forecast'),
+        ('restaurants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaffDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('shift', models.CharField(max_length=10, verbose_name='Смена')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Порций')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+                ('is_stale', models.BooleanField(default=True, verbose_name='Устарела')),
+                ('revision', models.PositiveIntegerField(default=0, help_text='Увеличивается при каждой пометке устаревшей', verbose_name='Ревизия')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='staff_sales', to='restaurants.restaurant', verbose_name='Ресторан')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL, verbose_name='Сотрудник')),
+            ],
+            options={
+                'verbose_name': 'Продажи сотрудника за смену',
+                'verbose_name_plural': 'Продажи сотрудников по сменам',
+                'indexes': [models.Index(fields=['user', 'day'], name='staff_sales_user_idx'), models.Index(fields=['day', 'restaurant'], name='staff_sales_day_idx'), models.Index(condition=models.Q(('is_stale', True)), fields=['is_stale'], name='staff_sales_stale_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'user', 'day', 'shift'), name='unique_staff_daily_sales')],
+            },
+        ),
+    ]
@@ -1,3 +1,212 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from apps.menu.models import MenuItem
+from apps.orders.models import Order
+from apps.restaurants.models import Restaurant
+
+
+class HourlySales(models.Model):
+    """
+    Продажи ресторана за час (см. apps.analytics.heatmap).
+
+    Строка помечается устаревшей при любом изменении заказов этого часа
+    и пересчитывается только по заказам своего часа; weekday и
+    hour_of_day - местное время начала часа, по ним строится тепловая
+    карта «час × день недели».
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='hourly_sales',
+                                   verbose_name='Ресторан')
+    hour = models.DateTimeField('Начало часа')
+    weekday = models.PositiveSmallIntegerField('День недели', help_text='0 - понедельник ... 6 - воскресенье')
+    hour_of_day = models.PositiveSmallIntegerField('Час суток')
+    orders = models.PositiveIntegerField('Заказов', default=0)
+    units = models.PositiveIntegerField('Порций', default=0)
+    revenue = models.DecimalField('Выручка', max_digits=12, decimal_places=2, default=0)
+    is_stale = models.BooleanField('Устарела', default=True)
+    revision = models.PositiveIntegerField('Ревизия', default=0,
+                                           help_text='Увеличивается при каждой пометке устаревшей')
+
+    class Meta:
+        verbose_name = 'Продажи за час'
+        verbose_name_plural = 'Продажи по часам'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'hour'], name='unique_hourly_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['hour', 'restaurant'], name='hourly_sales_hour_idx'),
+            models.Index(fields=['is_stale'], name='hourly_sales_stale_idx',
+                         condition=models.Q(is_stale=True)),
+        ]
+
+    def __str__(self):
+        return f'{self.restaurant.name}, {self.hour:%Y-%m-%d %H}:00'
+
+
+class DailySketch(models.Model):
+    """
+    Сводки распределений ресторана за день (см. apps.analytics.distributions).
+
+    Квантильные сводки суммы заказа, числа порций и времени приготовления
+    и HyperLogLog столов и блюд хранятся в сериализованном виде и
+    объединяются за любой период без чтения заказов. Как и HourlySales,
+    строка помечается устаревшей при изменении заказов дня.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='daily_sketches',
+                                   verbose_name='Ресторан')
+    day = models.DateField('День')
+    orders = models.PositiveIntegerField('Заказов', default=0)
+    order_value = models.BinaryField('Суммы заказов', default=b'')
+    items_per_order = models.BinaryField('Порций в заказе', default=b'')
+    prep_minutes = models.BinaryField('Время приготовления', default=b'')
+    tables = models.BinaryField('Столы', default=b'')
+    dishes = models.BinaryField('Блюда', default=b'')
+    is_stale = models.BooleanField('Устарела', default=True)
+    revision = models.PositiveIntegerField('Ревизия', default=0,
+                                           help_text='Увеличивается при каждой пометке устаревшей')
+
+    class Meta:
+        verbose_name = 'Сводка распределений за день'
+        verbose_name_plural = 'Сводки распределений по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'day'], name='unique_daily_sketch'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'restaurant'], name='daily_sketch_day_idx'),
+            models.Index(fields=['is_stale'], name='daily_sketch_stale_idx',
+                         condition=models.Q(is_stale=True)),
+        ]
+
+    def __str__(self):
+        return f'{self.restaurant.name}, {self.day}'
+
+
+class DishPair(models.Model):
+    """
+    Число завершенных заказов ресторана, в которых вместе были dish и
+    companion (см. apps.analytics.baskets).
+
+    Пара хранится в обе стороны, поэтому спутники блюда - один диапазон
+    индекса (restaurant, dish, -orders). Строка dish = companion - число
+    заказов с этим блюдом (для поддержки и lift).
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='dish_pairs',
+                                   verbose_name='Ресторан')
+    dish = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+', verbose_name='Блюдо')
+    companion = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+',
+                                  verbose_name='Вместе с блюдом')
+    orders = models.PositiveIntegerField('Заказов', default=0)
+
+    class Meta:
+        verbose_name = 'Пара блюд'
+        verbose_name_plural = 'Пары блюд'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'dish', 'companion'], name='unique_dish_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['restaurant', 'dish', '-orders'], name='dish_pair_top_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.dish} + {self.companion}: {self.orders}'
+
+
+class BasketTotal(models.Model):
+    """Число завершенных заказов ресторана, учтенных в DishPair"""
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, related_name='basket_total',
+                                      verbose_name='Ресторан')
+    orders = models.PositiveIntegerField('Заказов', default=0)
+
+    class Meta:
+        verbose_name = 'Итог корзин'
+        verbose_name_plural = 'Итоги корзин'
+
+    def __str__(self):
+        return f'{self.restaurant.name}: {self.orders}'
+
+
+class BasketOrder(models.Model):
+    """
+    Заказ, учтенный в DishPair, и набор его блюд на момент учета - чтобы
+    изменение, отмена или удаление заказа вычитали ровно то, что было
+    добавлено. Связь без ограничения в базе: строка удаленного заказа
+    остается до вычитания.
+    """
+    order = models.OneToOneField(Order, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True,
+                                 related_name='+', verbose_name='Заказ')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='+',
+                                   verbose_name='Ресторан')
+    dishes = models.JSONField('Блюда', default=list)
+
+    class Meta:
+        verbose_name = 'Учтенный заказ'
+        verbose_name_plural = 'Учтенные заказы'
+
+    def __str__(self):
+        return f'Заказ №{self.order_id}'
+
+
+class SalesForecast(models.Model):
+    """
+    Прогноз продаж блюда в ресторане на день (см. apps.analytics.forecast).
+
+    Таблица целиком пересчитывается ночной командой forecast_sales;
+    хранятся только дни с ненулевым прогнозом.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='sales_forecasts',
+                                   verbose_name='Ресторан')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='sales_forecasts',
+                                  verbose_name='Блюдо')
+    day = models.DateField('День')
+    units = models.DecimalField('Порций', max_digits=10, decimal_places=2)
+    revenue = models.DecimalField('Выручка', max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField('Рассчитан', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Прогноз продаж'
+        verbose_name_plural = 'Прогнозы продаж'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'menu_item', 'day'], name='unique_sales_forecast'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'restaurant'], name='sales_forecast_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.menu_item} в {self.restaurant.name}, {self.day}: {self.units}'
+
+
+class StaffDailySales(models.Model):
+    """
+    Продажи сотрудника (Order.created_by) в ресторане за смену дня (см.
+    apps.analytics.staff). Изменение заказа помечает устаревшими строки
+    сотрудника за этот день, они пересчитываются по заказам этого дня.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='staff_sales',
+                                   verbose_name='Ресторан')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_sales',
+                             verbose_name='Сотрудник')
+    day = models.DateField('День')
+    shift = models.CharField('Смена', max_length=10)
+    orders = models.PositiveIntegerField('Заказов', default=0)
+    units = models.PositiveIntegerField('Порций', default=0)
+    revenue = models.DecimalField('Выручка', max_digits=12, decimal_places=2, default=0)
+    is_stale = models.BooleanField('Устарела', default=True)
+    revision = models.PositiveIntegerField('Ревизия', default=0,
+                                           help_text='Увеличивается при каждой пометке устаревшей')
+
+    class Meta:
+        verbose_name = 'Продажи сотрудника за смену'
+        verbose_name_plural = 'Продажи сотрудников по сменам'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'user', 'day', 'shift'], name='unique_staff_daily_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day'], name='staff_sales_user_idx'),
+            models.Index(fields=['day', 'restaurant'], name='staff_sales_day_idx'),
+            models.Index(fields=['is_stale'], name='staff_sales_stale_idx',
+                         condition=models.Q(is_stale=True)),
+        ]
+
+    def __str__(self):
+        return f'{self.user}, {self.day}, {self.shift}'
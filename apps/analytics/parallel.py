@@ -0,0 +1,124 @@
+# apps/analytics/parallel.py
+"""
+Параллельное выполнение групп показателей для асинхронных страниц
+аналитики.
+
+Независимые группы (справочные счетчики, каждый запрос компилятора
+отчетов, последние заказы) запускаются одновременно в ограниченном пуле
+потоков - ORM синхронная, у каждого потока свое соединение с базой.
+Время страницы приближается ко времени самой медленной группы, а не к
+сумме всех.
+
+Группа ограничена timeout секундами с момента постановки в пул. Если она
+не успела или упала, страница получает последний удачный результат этой
+группы из кеша с пометкой «устарело» (или значение по умолчанию, если
+удачных результатов еще не было), а запрос в базе прерывается: в SQLite -
+interrupt() соединения потока, в PostgreSQL его снимает
+statement_timeout, выставленный на время группы.
+"""
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 6
+QUERY_TIMEOUT = 5.0
+
+# Сколько хранится последний удачный результат группы
+STALE_TIMEOUT = 24 * 60 * 60
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='analytics')
+
+
+class Group:
+    """
+    Группа показателей: функция без аргументов, выполняемая в потоке пула.
+
+    key - ключ последнего удачного результата в кеше (по умолчанию имя
+    группы); default - результат, если группа не успела и в кеше пусто.
+    """
+
+    def __init__(self, name, func, label='', key=None, default=None):
+        self.name = name
+        self.func = func
+        self.label = label or name
+        self.key = 'analytics:group:' + hashlib.sha1((key or name).encode()).hexdigest()
+        self.default = default
+
+
+class Results(dict):
+    """Результаты групп по именам; stale - группы, отданные из кеша или по умолчанию"""
+
+    def __init__(self, values, stale):
+        super().__init__(values)
+        self.stale = stale
+
+
+def _execute(func, timeout, handle):
+    close_old_connections()
+    # Соединение этого потока (django.db.connection - прокси, в другом
+    # потоке он указал бы на чужое соединение)
+    connection = handle['connection'] = connections[DEFAULT_DB_ALIAS]
+    postgres = connection.vendor == 'postgresql'
+    try:
+        if postgres:
+            with connection.cursor() as cursor:
+                cursor.execute('SET statement_timeout = %s', [int(timeout * 1000)])
+        return func()
+    finally:
+        if postgres and connection.connection is not None:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET statement_timeout = DEFAULT')
+            except Exception:
+                connection.close()
+        close_old_connections()
+
+
+def _interrupt(handle):
+    """Прервать запрос потока, который уже не дождутся (SQLite)"""
+    worker_connection = handle.get('connection')
+    if worker_connection is not None and worker_connection.vendor == 'sqlite':
+        raw = worker_connection.connection
+        if raw is not None:
+            raw.interrupt()
+
+
+async def _run_group(loop, group, timeout):
+    handle = {}
+    future = loop.run_in_executor(_executor, _execute, group.func, timeout, handle)
+    try:
+        result = await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        _interrupt(handle)
+        logger.warning('Группа аналитики %s не уложилась в %.1f с', group.name, timeout)
+    except Exception:
+        logger.exception('Ошибка группы аналитики %s', group.name)
+    else:
+        await asyncio.to_thread(cache.set, group.key, result, STALE_TIMEOUT)
+        return result, False
+
+    cached = await asyncio.to_thread(cache.get, group.key)
+    return (group.default if cached is None else cached), True
+
+
+async def gather(groups, timeout=None):
+    """
+    Выполнить группы одновременно (timeout по умолчанию - QUERY_TIMEOUT);
+    возвращает Results с результатами по именам групп и списком названий
+    устаревших групп в stale.
+    """
+    loop = asyncio.get_running_loop()
+    timeout = timeout or QUERY_TIMEOUT
+    outcomes = await asyncio.gather(*(_run_group(loop, group, timeout) for group in groups))
+    values, stale = {}, []
+    for group, (result, is_stale) in zip(groups, outcomes):
+        values[group.name] = result
+        if is_stale:
+            stale.append(group.label)
+    return Results(values, stale)
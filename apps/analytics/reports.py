@@ -0,0 +1,424 @@
+# apps/analytics/reports.py
+"""
+Компилятор отчетов по продажам.
+
+Отчет (Report) описывается декларативно: показатели, измерения, фильтры
+и срезы. Компилятор (Plan) собирает отчеты в минимальное число запросов
+с GROUP BY:
+    - отчеты по одной таблице фактов с одинаковыми фильтрами считаются
+      одним запросом;
+    - срезы («выручка за сегодня», «завершенные заказы») - условная
+      агрегация SUM(...) FILTER (WHERE ...) в том же запросе, а не
+      отдельный проход по таблице;
+    - измерения малой мощности (филиал, статус) добавляются в группировку
+      общего запроса, отчеты без них получают строки сверткой в Python;
+    - отчет по категориям сворачивается из запроса по блюдам, по неделям
+      и месяцам - из запроса по дням.
+
+Таблицы фактов:
+    - orders - заказы (Order): число заказов, выручка по total_price;
+    - items - позиции заказов (OrderItem): порции, строки, выручка позиций
+      (цена * количество - скидка), скидки; нужны для измерений «блюдо» и
+      «категория».
+Показатель берется из заказов, если это позволяют измерения отчета.
+
+Показатель в отчете - имя из METRICS/DERIVED или «имя@срез», где срез -
+ключ Report.slices; в строках результата он называется «имя_срез».
+Фильтры и срезы - словари с ключами start_date, end_date (даты
+включительно), restaurant_ids, statuses.
+
+Plan.describe() - план: какие запросы будут выполнены и какие отчеты из
+каждого получаются; CompiledQuery.sql и explain() - SQL и план СУБД.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DateField, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem
+
+ORDERS, ITEMS = 'orders', 'items'
+CENT = Decimal('0.01')
+
+# Таблица фактов -> (модель, путь от нее к заказу)
+SOURCES = {
+    ORDERS: (Order, ''),
+    ITEMS: (OrderItem, 'order__'),
+}
+
+LINE_COST = ExpressionWrapper(
+    F('price_at_moment') * F('quantity') - F('discount'),
+    output_field=DecimalField(max_digits=12, decimal_places=2)
+)
+
+
+class Metric:
+    """
+    Показатель: агрегат для каждой таблицы фактов, где он считается.
+    Выражения - функции от условия среза (Q или None).
+
+    distinct - агрегат по позициям считает различные заказы, поэтому не
+    сворачивается по измерениям позиций (заказ с двумя блюдами категории
+    учелся бы дважды).
+    """
+
+    def __init__(self, label, orders=None, items=None, distinct=False):
+        self.label = label
+        self.expressions = {source: expression for source, expression in
+                            ((ORDERS, orders), (ITEMS, items)) if expression}
+        self.distinct = distinct
+
+
+METRICS = {
+    'orders': Metric(
+        'Заказов',
+        orders=lambda condition: Count('id', filter=condition),
+        items=lambda condition: Count('order', distinct=True, filter=condition),
+        distinct=True,
+    ),
+    'revenue': Metric(
+        'Выручка',
+        orders=lambda condition: Sum('total_price', filter=condition),
+        items=lambda condition: Sum(LINE_COST, filter=condition),
+    ),
+    'units': Metric('Порций', items=lambda condition: Sum('quantity', filter=condition)),
+    'lines': Metric('Позиций в заказах', items=lambda condition: Count('id', filter=condition)),
+    'discount': Metric('Скидки', items=lambda condition: Sum('discount', filter=condition)),
+}
+
+# Производные показатели: (название, исходные показатели, формула)
+DERIVED = {
+    'aov': ('Средний чек', ('revenue', 'orders'),
+            lambda revenue, orders: (Decimal(revenue) / orders).quantize(CENT) if orders else None),
+}
+
+
+class Dimension:
+    """
+    Измерение: поля строки результата и выражения для них (функции от
+    пути к заказу).
+
+    items_only - есть только у позиций заказа; rollup - малой мощности,
+    добавляется в группировку общего запроса; implies - измерения, которые
+    однозначно определяются этим (категория - блюдом).
+    """
+
+    def __init__(self, label, fields, items_only=False, rollup=False, implies=()):
+        self.label = label
+        self.fields = fields
+        self.items_only = items_only
+        self.rollup = rollup
+        self.implies = implies
+
+
+DIMENSIONS = {
+    'day': Dimension('День', {'day': lambda prefix: TruncDate(f'{prefix}created_at')},
+                     implies=('week', 'month')),
+    'week': Dimension('Неделя', {
+        'week': lambda prefix: TruncWeek(f'{prefix}created_at', output_field=DateField())
+    }),
+    'month': Dimension('Месяц', {
+        'month': lambda prefix: TruncMonth(f'{prefix}created_at', output_field=DateField())
+    }),
+    'restaurant': Dimension('Филиал', {
+        'restaurant': lambda prefix: F(f'{prefix}restaurant_id'),
+        'restaurant_name': lambda prefix: F(f'{prefix}restaurant__name'),
+    }, rollup=True),
+    'status': Dimension('Статус', {'status': lambda prefix: F(f'{prefix}status')}, rollup=True),
+    'employee': Dimension('Сотрудник', {
+        'employee': lambda prefix: F(f'{prefix}created_by_id'),
+        'employee_name': lambda prefix: F(f'{prefix}created_by__username'),
+    }),
+    'dish': Dimension('Блюдо', {
+        'dish': lambda prefix: F('menu_item_id'),
+        'dish_name': lambda prefix: F('menu_item__name'),
+    }, items_only=True, implies=('category',)),
+    'category': Dimension('Категория', {
+        'category': lambda prefix: F('menu_item__category_id'),
+        'category_name': lambda prefix: F('menu_item__category__name'),
+    }, items_only=True),
+}
+
+FILTER_KEYS = {'start_date', 'end_date', 'restaurant_ids', 'statuses'}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def period_condition(prefix='', start_date=None, end_date=None):
+    """
+    Условие на время создания заказа за период с start_date по end_date
+    включительно. Сравнение с границами суток, а не created_at__date, не
+    вычисляет дату для каждой строки.
+    """
+    condition = Q()
+    if start_date:
+        condition &= Q(**{f'{prefix}created_at__gte': _day_start(start_date)})
+    if end_date:
+        condition &= Q(**{f'{prefix}created_at__lt': _day_start(end_date + timedelta(days=1))})
+    return condition
+
+
+def filter_condition(spec, prefix=''):
+    """Q по словарю фильтра (см. описание модуля)"""
+    condition = period_condition(prefix, spec.get('start_date'), spec.get('end_date'))
+    if spec.get('restaurant_ids') is not None:
+        condition &= Q(**{f'{prefix}restaurant_id__in': list(spec['restaurant_ids'])})
+    if spec.get('statuses') is not None:
+        condition &= Q(**{f'{prefix}status__in': list(spec['statuses'])})
+    return condition
+
+
+def _freeze(spec):
+    """Хешируемый ключ фильтра: одинаковые фильтры разных отчетов совпадают"""
+    return tuple(sorted(
+        (key, tuple(sorted(value)) if key in ('restaurant_ids', 'statuses') else value)
+        for key, value in (spec or {}).items() if value is not None
+    ))
+
+
+def _closure(dimensions):
+    """Измерения вместе с теми, что ими однозначно определяются"""
+    result = set(dimensions)
+    stack = list(dimensions)
+    while stack:
+        for implied in DIMENSIONS[stack.pop()].implies:
+            if implied not in result:
+                result.add(implied)
+                stack.append(implied)
+    return result
+
+
+class Report:
+    """
+    Описание отчета.
+
+    metrics - показатели («revenue», «orders@today»); dimensions -
+    измерения из DIMENSIONS; filters - фильтр всего отчета; slices -
+    именованные условия для показателей «имя@срез»; order_by - ключи
+    строк, «-» - по убыванию; limit - число строк.
+    """
+
+    def __init__(self, metrics, dimensions=(), filters=None, slices=None, order_by=(), limit=None, name=''):
+        self.dimensions = tuple(dimensions)
+        self.name = name or ', '.join(self.dimensions) or 'итоги'
+        self.filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        self.slices = slices or {}
+        self.order_by = tuple(order_by)
+        self.limit = limit
+
+        for dimension in self.dimensions:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f'Неизвестное измерение: {dimension}')
+        for spec in [self.filters, *self.slices.values()]:
+            unknown = set(spec) - FILTER_KEYS
+            if unknown:
+                raise ValueError(f'Неизвестные условия: {", ".join(sorted(unknown))}')
+
+        self.items_only = any(DIMENSIONS[d].items_only for d in self.dimensions)
+        # (показатель, срез, ключ в строке)
+        self.columns = []
+        self.derived = []
+        for entry in metrics:
+            metric, _, slice_name = entry.partition('@')
+            if slice_name and slice_name not in self.slices:
+                raise ValueError(f'Неизвестный срез: {slice_name}')
+            key = f'{metric}_{slice_name}' if slice_name else metric
+            if metric in DERIVED:
+                self.derived.append((metric, slice_name, key))
+                for base in DERIVED[metric][1]:
+                    self._add_column(base, slice_name)
+            elif metric in METRICS:
+                self._add_column(metric, slice_name)
+            else:
+                raise ValueError(f'Неизвестный показатель: {metric}')
+
+    def _add_column(self, metric, slice_name):
+        column = (metric, slice_name, f'{metric}_{slice_name}' if slice_name else metric)
+        if column not in self.columns:
+            self.columns.append(column)
+
+    def source(self, metric):
+        """Таблица фактов, из которой считается показатель"""
+        expressions = METRICS[metric].expressions
+        if ORDERS in expressions and not self.items_only:
+            return ORDERS
+        if ITEMS not in expressions:
+            raise ValueError(f'Показатель {metric} не считается по измерениям {", ".join(self.dimensions)}')
+        return ITEMS
+
+    @property
+    def keys(self):
+        """Поля измерений в строках отчета"""
+        return [key for dimension in self.dimensions for key in DIMENSIONS[dimension].fields]
+
+
+class CompiledQuery:
+    """Один запрос с GROUP BY, из которого получаются строки нескольких отчетов"""
+
+    def __init__(self, source, grain, filters):
+        self.source = source
+        self.grain = set(grain)
+        self.dimensions = set(grain)
+        self.filters = filters
+        self.columns = {}
+        self.slices = {}
+        self.reports = []
+
+    def covers(self, report, grain):
+        if not grain <= _closure(self.grain):
+            return False
+        # Различные заказы по позициям сворачиваются только по измерениям заказа
+        distinct = any(METRICS[metric].distinct for metric, _, _ in report.columns
+                       if report.source(metric) == self.source)
+        return not (distinct and self.source == ITEMS and grain != self.grain)
+
+    def column(self, metric, spec):
+        key = (metric, _freeze(spec))
+        if key not in self.columns:
+            self.columns[key] = f'm{len(self.columns)}'
+            self.slices[key] = spec
+        return self.columns[key]
+
+    @property
+    def fields(self):
+        return [key for dimension in sorted(self.dimensions) for key in DIMENSIONS[dimension].fields]
+
+    def queryset(self):
+        model, prefix = SOURCES[self.source]
+        queryset = model.objects.filter(filter_condition(dict(self.filters), prefix))
+        conditions = [filter_condition(spec, prefix) if spec else None for spec in self.slices.values()]
+        if conditions and all(conditions):
+            # Все показатели - по срезам: строки вне срезов не читаются
+            union = Q()
+            for condition in conditions:
+                union |= condition
+            queryset = queryset.filter(union)
+
+        aggregates = {
+            alias: METRICS[metric].expressions[self.source](condition)
+            for ((metric, _), alias), condition in zip(self.columns.items(), conditions)
+        }
+        dimensions = {
+            f'dim_{key}': build(prefix)
+            for dimension in sorted(self.dimensions)
+            for key, build in DIMENSIONS[dimension].fields.items()
+        } or {'dim_': Value(1)}
+        return queryset.order_by().values(**dimensions).annotate(**aggregates)
+
+    @property
+    def sql(self):
+        return str(self.queryset().query)
+
+    def explain(self):
+        return self.queryset().explain()
+
+    def execute(self):
+        rows = []
+        for row in self.queryset():
+            rows.append({
+                name[4:] if name.startswith('dim_') else name: value
+                for name, value in row.items() if name != 'dim_'
+            })
+        return rows
+
+    def describe(self):
+        grouping = ', '.join(sorted(self.dimensions)) or 'без группировки'
+        reports = ', '.join(report.name for report in self.reports)
+        filters = ', '.join(f'{key}={value}' for key, value in self.filters)
+        return (f'{self.source}: GROUP BY {grouping}; показателей {len(self.columns)}'
+                f'{"; фильтр " + filters if filters else ""}; отчеты: {reports}')
+
+
+class Plan:
+    """
+    План выполнения набора отчетов.
+
+    queries - запросы плана; run() выполняет каждый один раз и возвращает
+    строки отчетов в порядке аргументов.
+    """
+
+    def __init__(self, *reports):
+        self.reports = reports
+        self.queries = []
+        # report -> [(запрос, {ключ строки отчета: псевдоним в запросе})]
+        self.parts = {id(report): [] for report in reports}
+
+        wanted = []
+        for report in reports:
+            by_source = defaultdict(list)
+            for column in report.columns:
+                by_source[report.source(column[0])].append(column)
+            for source, columns in by_source.items():
+                grain = {d for d in report.dimensions if not DIMENSIONS[d].rollup}
+                wanted.append((report, source, grain, columns))
+
+        # Сначала самые детальные: отчеты по категориям попадают в запрос по блюдам
+        wanted.sort(key=lambda part: -len(_closure(part[2])))
+        for report, source, grain, columns in wanted:
+            filters = _freeze(report.filters)
+            query = next(
+                (query for query in self.queries
+                 if query.source == source and query.filters == filters and query.covers(report, grain)),
+                None
+            )
+            if query is None:
+                query = CompiledQuery(source, grain, filters)
+                self.queries.append(query)
+            query.dimensions |= set(report.dimensions)
+            if report not in query.reports:
+                query.reports.append(report)
+            self.parts[id(report)].append((query, {
+                key: query.column(metric, report.slices.get(slice_name) if slice_name else None)
+                for metric, slice_name, key in columns
+            }))
+
+    def describe(self):
+        return [query.describe() for query in self.queries]
+
+    def run(self):
+        return self.assemble([query.execute() for query in self.queries])
+
+    def assemble(self, results):
+        """
+        Строки отчетов по строкам запросов (список в порядке queries) -
+        для выполнения запросов плана в другом месте, например параллельно
+        (см. apps.analytics.parallel).
+        """
+        results = {id(query): rows for query, rows in zip(self.queries, results)}
+        return [self._rows(report, results) for report in self.reports]
+
+    def _rows(self, report, results):
+        keys = report.keys
+        metric_keys = [key for _, _, key in report.columns]
+        merged = {}
+        for query, aliases in self.parts[id(report)]:
+            for row in results[id(query)]:
+                group = tuple(row[key] for key in keys)
+                target = merged.setdefault(group, dict(zip(keys, group)))
+                for key, alias in aliases.items():
+                    target[key] = (target.get(key) or 0) + (row[alias] or 0)
+
+        rows = list(merged.values()) or ([{}] if not keys else [])
+        for row in rows:
+            for key in metric_keys:
+                row.setdefault(key, 0)
+            for metric, slice_name, key in report.derived:
+                _, bases, formula = DERIVED[metric]
+                row[key] = formula(*(row[f'{base}_{slice_name}' if slice_name else base] for base in bases))
+
+        for key in reversed(report.order_by):
+            descending = key.startswith('-')
+            key = key.lstrip('-')
+            rows.sort(key=lambda row: (row[key] is not None if descending else row[key] is None, row[key]),
+                      reverse=descending)
+        return rows[:report.limit] if report.limit is not None else rows
+
+
+def run(*reports):
+    """Строки отчетов, посчитанные минимальным числом запросов"""
+    return Plan(*reports).run()
@@ -0,0 +1,45 @@
+# apps/analytics/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.orders.models import Order, OrderItem
+from . import baskets, distributions, heatmap, staff
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    """Час заказа в почасовом своде и сводки его дня пересчитываются при следующем чтении"""
+    restaurant_id, created_at = instance.restaurant_id, instance.created_at
+    transaction.on_commit(lambda: heatmap.mark_stale(restaurant_id, created_at))
+    transaction.on_commit(lambda: distributions.mark_stale(restaurant_id, created_at))
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_staff_changed(sender, instance, **kwargs):
+    """Строки сотрудника, оформившего заказ, за день заказа пересчитываются при следующем чтении"""
+    if instance.created_by_id is not None:
+        restaurant_id, user_id, created_at = instance.restaurant_id, instance.created_by_id, instance.created_at
+        transaction.on_commit(lambda: staff.mark_stale(restaurant_id, user_id, created_at))
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_basket_changed(sender, instance, **kwargs):
+    """Счетчики пар блюд меняют завершение заказа и любые изменения после него"""
+    order_id = instance.pk
+    transaction.on_commit(lambda: baskets.record_order(order_id))
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_deleted(sender, instance, **kwargs):
+    """Сохранение позиции пересохраняет заказ, удаление - нет"""
+    order = Order.objects.filter(pk=instance.order_id).values_list(
+        'restaurant_id', 'created_at', 'created_by_id'
+    ).first()
+    if order is not None:
+        order_id = instance.order_id
+        restaurant_id, created_at, user_id = order
+        transaction.on_commit(lambda: heatmap.mark_stale(restaurant_id, created_at))
+        transaction.on_commit(lambda: distributions.mark_stale(restaurant_id, created_at))
+        transaction.on_commit(lambda: staff.mark_stale(restaurant_id, user_id, created_at))
+        transaction.on_commit(lambda: baskets.record_order(order_id))
@@ -0,0 +1,214 @@
+# apps/analytics/staff.py
+"""
+Показатели сотрудников по заказам, которые они оформили
+(Order.created_by): заказы, выручка, средний чек и порций на заказ по
+дням и сменам.
+
+Заказы сворачиваются в StaffDailySales - строка на ресторан, сотрудника,
+день и смену (без отмененных заказов и заказов без сотрудника).
+Изменение заказа помечает устаревшими строки сотрудника за день заказа
+(см. signals), refresh_stale пересчитывает только эти дни по заказам
+этих дней. Профиль сотрудника и рейтинг читают только свод. Полный
+пересчет - команда rebuild_staff_sales.
+
+Смена определяется по местному часу создания заказа (SHIFTS); ночная
+смена относится к календарному дню заказа.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem
+from apps.staff.models import Employee
+from .models import StaffDailySales
+
+# (код, название, с какого часа, до какого часа)
+SHIFTS = (
+    ('morning', 'Утро', 6, 12),
+    ('day', 'День', 12, 17),
+    ('evening', 'Вечер', 17, 23),
+    ('night', 'Ночь', 23, 6),
+)
+SHIFT_NAMES = {code: name for code, name, _, _ in SHIFTS}
+
+# Сколько устаревших дней сотрудников пересчитывается за один проход
+REFRESH_BATCH = 100
+
+CENT = Decimal('0.01')
+
+
+def shift_of(hour):
+    """Код смены для местного часа суток"""
+    for code, _, start, end in SHIFTS:
+        if start <= hour < end or (start > end and (hour >= start or hour < end)):
+            return code
+
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def mark_stale(restaurant_id, user_id, moment):
+    """Пометить устаревшими строки сотрудника за день заказа (строка смены заказа создается)"""
+    if user_id is None:
+        return
+    local = timezone.localtime(moment)
+    StaffDailySales.objects.bulk_create([StaffDailySales(
+        restaurant_id=restaurant_id, user_id=user_id, day=local.date(), shift=shift_of(local.hour)
+    )], ignore_conflicts=True)
+    StaffDailySales.objects.filter(restaurant_id=restaurant_id, user_id=user_id, day=local.date()).update(
+        is_stale=True, revision=F('revision') + 1
+    )
+
+
+def _aggregate(condition):
+    """(ресторан, сотрудник, день, смена) -> заказы, порции и выручка"""
+    totals = defaultdict(lambda: {'orders': 0, 'units': 0, 'revenue': 0})
+    orders = Order.objects.filter(condition, created_by__isnull=False).exclude(status=Order.Status.CANCELLED)
+
+    def key(restaurant_id, user_id, hour):
+        hour = timezone.localtime(hour)
+        return restaurant_id, user_id, hour.date(), shift_of(hour.hour)
+
+    for restaurant_id, user_id, hour, count, revenue in orders.annotate(
+        bucket=TruncHour('created_at')
+    ).values_list('restaurant_id', 'created_by_id', 'bucket').annotate(
+        count=Count('id'), revenue=Sum('total_price')
+    ).order_by():
+        row = totals[key(restaurant_id, user_id, hour)]
+        row['orders'] += count
+        row['revenue'] += revenue or 0
+
+    for restaurant_id, user_id, hour, units in OrderItem.objects.filter(order__in=orders).annotate(
+        bucket=TruncHour('order__created_at')
+    ).values_list('order__restaurant_id', 'order__created_by_id', 'bucket').annotate(
+        units=Sum('quantity')
+    ).order_by():
+        totals[key(restaurant_id, user_id, hour)]['units'] += units or 0
+    return totals
+
+
+def refresh_stale():
+    """Пересчитать устаревшие строки; возвращает число пересчитанных строк"""
+    refreshed = 0
+    while True:
+        stale = list(StaffDailySales.objects.filter(is_stale=True).values_list(
+            'restaurant_id', 'user_id', 'day'
+        ).distinct()[:REFRESH_BATCH])
+        if not stale:
+            return refreshed
+
+        condition = Q()
+        for restaurant_id, user_id, day in stale:
+            start, end = _day_range(day)
+            condition |= Q(restaurant_id=restaurant_id, created_by_id=user_id,
+                           created_at__gte=start, created_at__lt=end)
+        totals = _aggregate(condition)
+
+        rows = StaffDailySales.objects.filter(is_stale=True).filter(
+            Q(*[Q(restaurant_id=r, user_id=u, day=d) for r, u, d in stale], _connector=Q.OR)
+        ).values_list('id', 'restaurant_id', 'user_id', 'day', 'shift', 'revision')
+        with transaction.atomic():
+            for row_id, restaurant_id, user_id, day, shift, revision in list(rows):
+                values = totals.pop((restaurant_id, user_id, day, shift), {'orders': 0, 'units': 0, 'revenue': 0})
+                # Если день снова пометили во время пересчета, строка
+                # остается устаревшей и пересчитается следующим проходом
+                refreshed += StaffDailySales.objects.filter(id=row_id, revision=revision).update(
+                    is_stale=False, **values
+                )
+            # Смены, для которых строки еще нет (заказ перенесен в другой час)
+            StaffDailySales.objects.bulk_create([
+                StaffDailySales(restaurant_id=restaurant_id, user_id=user_id, day=day, shift=shift,
+                                is_stale=False, **values)
+                for (restaurant_id, user_id, day, shift), values in totals.items()
+            ], ignore_conflicts=True)
+
+
+def rebuild():
+    """Полный пересчет свода по всей истории заказов; возвращает число строк"""
+    totals = _aggregate(Q())
+    with transaction.atomic():
+        StaffDailySales.objects.all().delete()
+        StaffDailySales.objects.bulk_create([
+            StaffDailySales(restaurant_id=restaurant_id, user_id=user_id, day=day, shift=shift,
+                            is_stale=False, **values)
+            for (restaurant_id, user_id, day, shift), values in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def _rows(start_date=None, end_date=None, restaurant_ids=None, user_ids=None, shift=None):
+    refresh_stale()
+    rows = StaffDailySales.objects.all()
+    if start_date:
+        rows = rows.filter(day__gte=start_date)
+    if end_date:
+        rows = rows.filter(day__lte=end_date)
+    if restaurant_ids:
+        rows = rows.filter(restaurant_id__in=restaurant_ids)
+    if user_ids:
+        rows = rows.filter(user_id__in=user_ids)
+    if shift:
+        rows = rows.filter(shift=shift)
+    return rows
+
+
+def _with_ratios(row):
+    orders = row['orders'] or 0
+    row['revenue'] = row['revenue'] or 0
+    row['avg_ticket'] = (Decimal(row['revenue']) / orders).quantize(CENT) if orders else None
+    row['items_per_order'] = round(row['units'] / orders, 1) if orders else None
+    return row
+
+
+SUMS = {'orders': Sum('orders'), 'units': Sum('units'), 'revenue': Sum('revenue')}
+
+
+def _totals(rows, *fields):
+    return [_with_ratios(row) for row in rows.values(*fields).annotate(**SUMS).order_by(*fields)]
+
+
+def employee_stats(user_id, start_date=None, end_date=None):
+    """
+    Показатели сотрудника за период: totals (итог), shifts (по сменам),
+    days (по дням, с последнего).
+    """
+    rows = _rows(start_date, end_date, user_ids=[user_id])
+    totals = rows.aggregate(**SUMS)
+    totals['orders'], totals['units'] = totals['orders'] or 0, totals['units'] or 0
+    shifts = {row['shift']: row for row in _totals(rows, 'shift')}
+    return {
+        'totals': _with_ratios(totals),
+        'shifts': [dict(shifts[code], name=name) for code, name, _, _ in SHIFTS if code in shifts],
+        'days': _totals(rows, 'day')[::-1],
+    }
+
+
+def ranking(start_date=None, end_date=None, restaurant_ids=None, shift=None, order_by='revenue'):
+    """
+    Рейтинг сотрудников за период: заказы, порции, выручка, средний чек и
+    порций на заказ, по убыванию order_by. К строкам добавляются name,
+    position и employee_id (если у пользователя есть профиль сотрудника).
+    """
+    rows = _totals(_rows(start_date, end_date, restaurant_ids, shift=shift), 'user_id')
+    rows.sort(key=lambda row: -(row[order_by] or 0))
+
+    employees = {
+        employee.user_id: employee
+        for employee in Employee.objects.filter(user_id__in=[row['user_id'] for row in rows]).select_related(
+            'user', 'restaurant'
+        )
+    }
+    for row in rows:
+        employee = employees.get(row['user_id'])
+        row['employee_id'] = employee.pk if employee else None
+        row['name'] = (employee.user.get_full_name() or employee.user.username) if employee else f'#{row["user_id"]}'
+        row['position'] = employee.position if employee else ''
+        row['restaurant'] = employee.restaurant.name if employee and employee.restaurant else ''
+    return rows
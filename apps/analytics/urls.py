@@ -10,10 +10,13 @@ urlpatterns = [
 
     # API для получения данных графиков
     path('api/', views.AnalyticsAPIView.as_view(), name='analytics_api'),
+    path('api/companions/<int:dish_id>/', views.dish_companions, name='dish_companions'),
 
     # Детальные отчеты (для будущего развития)
     path('reports/', views.ReportsView.as_view(), name='reports'),
     path('reports/sales/', views.SalesReportView.as_view(), name='sales_report'),
     path('reports/menu/', views.MenuReportView.as_view(), name='menu_report'),
+    path('reports/menu/engineering/', views.MenuEngineeringView.as_view(), name='menu_engineering_report'),
     path('reports/branches/', views.BranchesReportView.as_view(), name='branches_report'),
+    path('reports/staff/', views.StaffReportView.as_view(), name='staff_report'),
 ]
\ No newline at end of file
@@ -1,76 +1,186 @@
 # apps/analytics/views.py
-from django.shortcuts import render
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
-from django.db.models import Count, Sum, Avg, Q, F
-from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
-from datetime import datetime, timedelta
+from django.db.models import Count
+from datetime import timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from functools import partial
 import json
 
 from apps.restaurants.models import Restaurant
 from apps.menu.models import MenuItem, Category
-from apps.orders.models import Order, OrderItem
-from apps.inventory.models import StockItem
+from apps.orders.models import Order
 from apps.accounts.models import CustomUser
+from .baskets import companions, top_pairs
+from .branches import branch_metrics
+from .cube import CubeError, get_cube
+from .distributions import QUANTILE_FIELDS, daily_percentiles, distribution
+from .forecast import daily_forecast
+from .heatmap import METRICS as HEATMAP_METRICS, WEEKDAYS, heatmap
+from .menu_engineering import CLASSES as MENU_CLASSES, menu_engineering
+from .parallel import Group, gather
+from .reports import Plan, Report, run
+from .staff import SHIFTS, ranking
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    LoginRequiredMixin для асинхронных представлений: пользователь
+    загружается через request.auser(), без синхронного запроса к базе
+    из цикла событий.
+    """
 
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
 
-class DashboardView(LoginRequiredMixin, TemplateView):
+
+def dashboard_reports(today):
+    """
+    Отчеты дашборда. Итоги по периодам, статусы и филиалы - один запрос
+    по заказам (периоды - срезы), продажи по дням - второй, популярные
+    блюда и категории - один запрос по позициям.
     """
-    Улучшенный главный дашборд с интерактивной аналитикой
+    last_7_days = today - timedelta(days=7)
+    periods = {
+        'today': {'start_date': today, 'end_date': today},
+        'week': {'start_date': last_7_days},
+        'month': {'start_date': today - timedelta(days=30)},
+        'prev_week': {'start_date': last_7_days - timedelta(days=7), 'end_date': last_7_days - timedelta(days=1)},
+    }
+    return [
+        Report(['orders', 'revenue', 'orders@today', 'revenue@today', 'orders@week', 'revenue@week',
+                'orders@month', 'revenue@month', 'revenue@prev_week'], slices=periods, name='Итоги'),
+        Report(['orders'], ['status'], order_by=['status'], name='Статусы заказов'),
+        Report(['orders', 'revenue', 'aov'], ['restaurant'], order_by=['-revenue', 'restaurant_name'], limit=5,
+               name='Топ филиалов'),
+        Report(['orders', 'revenue'], ['day'], filters={'start_date': last_7_days}, order_by=['day'],
+               name='Продажи по дням'),
+        Report(['lines', 'revenue'], ['dish'], order_by=['-lines', 'dish_name'], limit=10,
+               name='Популярные блюда'),
+        Report(['lines'], ['category'], order_by=['-lines'], name='Категории'),
+    ]
+
+
+def sales_reports(start_date=None, end_date=None, restaurant_id=None):
+    """Отчет по продажам: итоги сворачиваются из продаж по дням (один запрос)"""
+    filters = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'restaurant_ids': [restaurant_id] if restaurant_id else None,
+    }
+    return [
+        Report(['orders', 'revenue', 'aov'], filters=filters, name='Итоги'),
+        Report(['orders', 'revenue'], ['day'], filters=filters, order_by=['day'], name='Продажи по дням'),
+    ]
+
+
+def menu_reports():
+    """Отчет по меню: категории сворачиваются из продаж по блюдам (один запрос)"""
+    return [
+        Report(['lines', 'revenue'], ['dish'], order_by=['-lines', 'dish_name'], name='Блюда'),
+        Report(['lines', 'revenue'], ['category'], name='Категории'),
+    ]
+
+
+def reference_counts():
+    """Счетчики справочников для дашборда"""
+    return {
+        'total_restaurants': Restaurant.objects.count(),
+        'total_menu_items': MenuItem.objects.filter(is_available=True).count(),
+        'total_users': CustomUser.objects.count(),
+        'total_categories': Category.objects.filter(is_active=True).count(),
+    }
+
+
+def recent_orders():
+    return list(Order.objects.select_related(
+        'restaurant', 'created_by'
+    ).prefetch_related('items__menu_item').order_by('-created_at')[:8])
+
+
+def with_dishes(rows):
+    """Блюда из строк отчета по измерению dish с order_count и total_revenue"""
+    dishes = MenuItem.objects.select_related('category').in_bulk([row['dish'] for row in rows])
+    result = []
+    for row in rows:
+        dish = dishes.get(row['dish'])
+        if dish is None:
+            continue
+        dish.order_count = row['lines']
+        dish.total_revenue = row['revenue']
+        result.append(dish)
+    return result
+
+
+def with_categories(rows, categories):
+    """
+    Категории с orders_count и revenue из строк отчета по измерению
+    category; категории без продаж - с нулями, в конце списка.
+    """
+    stats = {row['category']: row for row in rows}
+    result = list(categories)
+    for category in result:
+        row = stats.get(category.id, {})
+        category.orders_count = row.get('lines', 0)
+        category.revenue = row.get('revenue', 0)
+    result.sort(key=lambda category: -category.orders_count)
+    return result
+
+
+class DashboardView(AsyncLoginRequiredMixin, TemplateView):
+    """
+    Улучшенный главный дашборд с интерактивной аналитикой.
+
+    Справочные счетчики, запросы отчетов и последние заказы выполняются
+    одновременно (apps.analytics.parallel); группы, не уложившиеся во
+    время, показываются по последним данным с пометкой «устарело».
     """
     template_name = 'analytics/dashboard.html'
 
-    def get_context_data(self, **kwargs):
+    async def get(self, request, *args, **kwargs):
+        plan = Plan(*dashboard_reports(timezone.localdate()))
+        groups = [
+            Group('counts', reference_counts, 'Справочники', default={
+                'total_restaurants': 0, 'total_menu_items': 0, 'total_users': 0, 'total_categories': 0,
+            }),
+            *[
+                Group(f'query{number}', query.execute, ', '.join(report.name for report in query.reports),
+                      key=query.sql, default=[])
+                for number, query in enumerate(plan.queries)
+            ],
+            Group('recent_orders', recent_orders, 'Последние заказы', default=[]),
+        ]
+        results = await gather(groups)
+        context = await sync_to_async(self.get_context_data)(plan=plan, results=results, **kwargs)
+        return self.render_to_response(context)
+
+    def get_context_data(self, plan, results, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Получаем даты для фильтрации
-        today = timezone.now().date()
-        last_7_days = today - timedelta(days=7)
-        last_30_days = today - timedelta(days=30)
+        totals, statuses, branches, daily_sales, dishes, categories = plan.assemble(
+            [results[f'query{number}'] for number in range(len(plan.queries))]
+        )
+        totals = totals[0]
+        context['stale'] = results.stale
 
         # === ОСНОВНЫЕ МЕТРИКИ ===
-        context.update({
-            'total_restaurants': Restaurant.objects.count(),
-            'total_menu_items': MenuItem.objects.filter(is_available=True).count(),
-            'total_users': CustomUser.objects.count(),
-            'total_orders': Order.objects.count(),
-            'total_categories': Category.objects.filter(is_active=True).count(),
-        })
+        context.update(results['counts'])
+        context['total_orders'] = totals['orders']
 
         # === ФИНАНСОВАЯ СТАТИСТИКА ===
-        # За сегодня
-        today_orders = Order.objects.filter(created_at__date=today)
-        context['today_orders'] = today_orders.count()
-        context['today_revenue'] = today_orders.aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-
-        # За последние 7 дней
-        week_orders = Order.objects.filter(created_at__date__gte=last_7_days)
-        context['week_orders'] = week_orders.count()
-        context['week_revenue'] = week_orders.aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-
-        # За последние 30 дней
-        month_orders = Order.objects.filter(created_at__date__gte=last_30_days)
-        context['month_orders'] = month_orders.count()
-        context['month_revenue'] = month_orders.aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
+        # За сегодня, последние 7 и 30 дней
+        for period in ('today', 'week', 'month'):
+            context[f'{period}_orders'] = totals[f'orders_{period}']
+            context[f'{period}_revenue'] = totals[f'revenue_{period}']
 
         # === СРАВНЕНИЕ С ПРЕДЫДУЩИМ ПЕРИОДОМ ===
-        # Предыдущая неделя
-        prev_week_start = last_7_days - timedelta(days=7)
-        prev_week_orders = Order.objects.filter(
-            created_at__date__gte=prev_week_start,
-            created_at__date__lt=last_7_days
-        )
-        prev_week_revenue = prev_week_orders.aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
+        prev_week_revenue = totals['revenue_prev_week']
 
         # Рост в процентах
         if prev_week_revenue > 0:
@@ -81,55 +191,29 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context['revenue_growth'] = round(revenue_growth, 1)
 
         # === СТАТИСТИКА ПО ФИЛИАЛАМ ===
-        branches_stats = Restaurant.objects.annotate(
-            orders_count=Count('order'),
-            revenue=Sum('order__total_price'),
-            avg_order_value=Avg('order__total_price')
-        ).order_by('-revenue')
-
-        context['top_restaurants'] = branches_stats[:5]
-        context['total_revenue'] = sum(r.revenue or 0 for r in branches_stats)
+        context['top_restaurants'] = branches
+        context['heatmap_restaurants'] = list(Restaurant.objects.order_by('name').values('id', 'name'))
+        context['total_revenue'] = totals['revenue']
 
         # === ПОПУЛЯРНЫЕ БЛЮДА ===
-        popular_dishes = MenuItem.objects.annotate(
-            order_count=Count('orderitem'),
-            total_revenue=Sum(F('orderitem__quantity') * F('orderitem__price_at_moment'))
-        ).filter(order_count__gt=0).order_by('-order_count')[:10]
-
-        context['popular_dishes'] = popular_dishes
+        context['popular_dishes'] = with_dishes(dishes)
 
         # === СТАТИСТИКА ПО СТАТУСАМ ЗАКАЗОВ ===
-        orders_by_status = Order.objects.values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-
-        context['orders_by_status'] = list(orders_by_status)
+        orders_by_status = [{'status': row['status'], 'count': row['orders']} for row in statuses]
+        context['orders_by_status'] = orders_by_status
 
         # === ПОСЛЕДНИЕ ЗАКАЗЫ ===
-        context['recent_orders'] = Order.objects.select_related(
-            'restaurant', 'created_by'
-        ).prefetch_related('items__menu_item').order_by('-created_at')[:8]
+        context['recent_orders'] = results['recent_orders']
 
         # === СТАТИСТИКА ПО КАТЕГОРИЯМ ===
-        categories_stats = Category.objects.annotate(
-            dishes_count=Count('menu_items', filter=Q(menu_items__is_available=True)),
-            orders_count=Count('menu_items__orderitem')
-        ).filter(is_active=True).order_by('-orders_count')
-
-        context['categories_stats'] = categories_stats[:5]
+        # Число блюд - счетчики самой категории (available_dishes_count)
+        context['categories_stats'] = with_categories(categories, Category.objects.filter(is_active=True))[:5]
 
         # === ДАННЫЕ ДЛЯ ГРАФИКОВ (JSON) ===
         # График продаж за последние 7 дней
-        daily_sales = Order.objects.filter(
-            created_at__date__gte=last_7_days
-        ).values('created_at__date').annotate(
-            orders=Count('id'),
-            revenue=Sum('total_price')
-        ).order_by('created_at__date')
-
         context['daily_sales_json'] = json.dumps([
             {
-                'date': item['created_at__date'].strftime('%Y-%m-%d'),
+                'date': item['day'].strftime('%Y-%m-%d'),
                 'orders': item['orders'],
                 'revenue': float(item['revenue'] or 0)
             }
@@ -158,70 +242,183 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return status_map.get(status, status)
 
 
-class AnalyticsAPIView(LoginRequiredMixin, TemplateView):
-    """API для получения данных аналитики через AJAX"""
+class AnalyticsAPIView(AsyncLoginRequiredMixin, TemplateView):
+    """
+    API для получения данных аналитики через AJAX. Если данные не успели
+    посчитаться, отдаются последние удачные с признаком stale.
+
+    chart=slice - произвольный срез из куба продаж (apps.analytics.cube)
+    без запросов к заказам: start, end (ГГГГ-ММ-ДД), restaurant, dish,
+    hour (можно несколько), group_by, metric, limit.
+
+    chart=heatmap - тепловая карта «час × день недели» из почасового
+    свода (apps.analytics.heatmap): period, metric, restaurant.
+
+    chart=percentiles - перцентили p50/p90/p99 по дням из дневных сводок
+    (apps.analytics.distributions): period, field, restaurant.
 
-    def get(self, request, *args, **kwargs):
+    chart=forecast - фактические порции за period дней и прогноз из
+    таблицы SalesForecast (apps.analytics.forecast): period, restaurant.
+    """
+
+    # Ответ, если данных нет ни свежих, ни прошлых
+    EMPTY = {
+        'sales': {'labels': [], 'orders': [], 'revenue': []},
+        'popular_dishes': {'labels': [], 'data': []},
+        'branches': {'labels': [], 'data': []},
+        'heatmap': {'hours': list(range(24)), 'weekdays': WEEKDAYS, 'data': []},
+        'percentiles': {'labels': [], 'p50': [], 'p90': [], 'p99': []},
+        'forecast': {'labels': [], 'units': [], 'forecast_units': [], 'forecast_revenue': []},
+    }
+
+    async def get(self, request, *args, **kwargs):
         period = request.GET.get('period', '7')  # дни
         chart_type = request.GET.get('chart', 'sales')
 
+        if chart_type == 'slice':
+            return JsonResponse(await sync_to_async(self.get_slice_data)(request.GET))
+
         try:
             days = int(period)
         except:
             days = 7
 
-        start_date = timezone.now().date() - timedelta(days=days)
+        start_date = timezone.localdate() - timedelta(days=days)
 
-        if chart_type == 'sales':
-            data = self.get_sales_data(start_date)
-        elif chart_type == 'popular_dishes':
-            data = self.get_popular_dishes_data(start_date)
-        elif chart_type == 'branches':
-            data = self.get_branches_data(start_date)
+        charts = {
+            'sales': self.get_sales_data,
+            'popular_dishes': self.get_popular_dishes_data,
+            'branches': self.get_branches_data,
+        }
+        restaurant_ids = [int(i) for i in request.GET.getlist('restaurant') if i.isdigit()]
+        if chart_type == 'heatmap':
+            metric = request.GET.get('metric', 'orders')
+            charts['heatmap'] = partial(self.get_heatmap_data, metric=metric, restaurant_ids=restaurant_ids)
+            key = f'api:heatmap:{start_date}:{metric}:{restaurant_ids}'
+        elif chart_type == 'forecast':
+            charts['forecast'] = partial(self.get_forecast_data, restaurant_ids=restaurant_ids)
+            key = f'api:forecast:{start_date}:{restaurant_ids}'
+        elif chart_type == 'percentiles':
+            field = request.GET.get('field', 'order_value')
+            charts['percentiles'] = partial(self.get_percentiles_data, field=field, restaurant_ids=restaurant_ids)
+            key = f'api:percentiles:{start_date}:{field}:{restaurant_ids}'
         else:
-            data = {'error': 'Unknown chart type'}
+            key = f'api:{chart_type}:{start_date}'
+        if chart_type not in charts:
+            return JsonResponse({'error': 'Unknown chart type'})
+
+        results = await gather([Group(
+            chart_type, partial(charts[chart_type], start_date),
+            key=key, default=self.EMPTY[chart_type]
+        )])
+        data = dict(results[chart_type], stale=bool(results.stale))
 
         return JsonResponse(data)
 
+    def get_slice_data(self, params):
+        """Срез куба продаж"""
+        cube = get_cube()
+        if cube is None:
+            return {'error': 'Куб продаж не построен (manage.py build_analytics_cube)'}
+
+        group_by = params.get('group_by', 'day')
+        try:
+            keys, values = cube.query(
+                metric=params.get('metric', 'revenue'),
+                group_by=group_by,
+                start=parse_date(params['start']) if params.get('start') else None,
+                end=parse_date(params['end']) if params.get('end') else None,
+                restaurant_ids=[int(i) for i in params.getlist('restaurant')] or None,
+                dish_ids=[int(i) for i in params.getlist('dish')] or None,
+                hours=[int(i) for i in params.getlist('hour')] or None,
+            )
+            limit = int(params.get('limit', 0))
+        except (CubeError, ValueError, TypeError) as error:
+            return {'error': str(error)}
+
+        if group_by in ('restaurant', 'dish'):
+            pairs = sorted(zip(keys, values), key=lambda pair: -pair[1])
+            if limit:
+                pairs = pairs[:limit]
+            keys, values = [key for key, _ in pairs], [value for _, value in pairs]
+            model = Restaurant if group_by == 'restaurant' else MenuItem
+            names = dict(model.objects.filter(id__in=keys).values_list('id', 'name'))
+            labels = [names.get(key, f'#{key}') for key in keys]
+        elif group_by == 'day':
+            labels = [key.strftime('%d.%m') for key in keys]
+        elif group_by == 'weekday':
+            labels = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+        elif group_by == 'hour':
+            labels = [f'{key:02d}:00' for key in keys]
+        else:
+            labels = ['Итого']
+
+        return {'labels': labels, 'data': values, 'cube_end': cube.end.isoformat()}
+
+    def get_heatmap_data(self, start_date, metric, restaurant_ids):
+        """Тепловая карта спроса: дни недели × часы суток"""
+        return {
+            'hours': list(range(24)),
+            'weekdays': WEEKDAYS,
+            'data': heatmap(metric if metric in HEATMAP_METRICS else 'orders',
+                            start_date=start_date, restaurant_ids=restaurant_ids),
+        }
+
+    def get_forecast_data(self, start_date, restaurant_ids):
+        """Фактические продажи порций и прогноз на следующие дни"""
+        today = timezone.localdate()
+        actual, = run(Report(
+            ['units'], ['day'], order_by=['day'],
+            filters={'start_date': start_date, 'end_date': today - timedelta(days=1),
+                     'restaurant_ids': restaurant_ids or None}
+        ))
+        forecast = daily_forecast(restaurant_ids, today)
+
+        return {
+            'labels': [row['day'].strftime('%d.%m') for row in actual + forecast],
+            'units': [row['units'] for row in actual] + [None] * len(forecast),
+            'forecast_units': [None] * len(actual) + [float(row['units']) for row in forecast],
+            'forecast_revenue': [None] * len(actual) + [float(row['revenue']) for row in forecast],
+        }
+
+    def get_percentiles_data(self, start_date, field, restaurant_ids):
+        """Перцентили распределения по дням"""
+        series = daily_percentiles(field if field in QUANTILE_FIELDS else 'order_value',
+                                   start_date=start_date, restaurant_ids=restaurant_ids)
+        return {
+            'labels': [day.strftime('%d.%m') for day, _ in series],
+            **{p: [values[p] for _, values in series] for p in ('p50', 'p90', 'p99')},
+        }
+
     def get_sales_data(self, start_date):
         """Данные продаж по дням"""
-        daily_sales = Order.objects.filter(
-            created_at__date__gte=start_date
-        ).extra(
-            select={'date': 'date(created_at)'}
-        ).values('date').annotate(
-            orders=Count('id'),
-            revenue=Sum('total_price')
-        ).order_by('date')
+        daily_sales, = run(Report(
+            ['orders', 'revenue'], ['day'], filters={'start_date': start_date}, order_by=['day']
+        ))
 
         return {
-            'labels': [item['date'].strftime('%d.%m') for item in daily_sales],
+            'labels': [item['day'].strftime('%d.%m') for item in daily_sales],
             'orders': [item['orders'] for item in daily_sales],
             'revenue': [float(item['revenue'] or 0) for item in daily_sales]
         }
 
     def get_popular_dishes_data(self, start_date):
         """Данные по популярным блюдам"""
-        popular = MenuItem.objects.annotate(
-            order_count=Count(
-                'orderitem',
-                filter=Q(orderitem__order__created_at__date__gte=start_date)
-            )
-        ).filter(order_count__gt=0).order_by('-order_count')[:10]
+        popular, = run(Report(
+            ['lines'], ['dish'], filters={'start_date': start_date}, order_by=['-lines', 'dish_name'], limit=10
+        ))
 
         return {
-            'labels': [dish.name for dish in popular],
-            'data': [dish.order_count for dish in popular]
+            'labels': [dish['dish_name'] for dish in popular],
+            'data': [dish['lines'] for dish in popular]
         }
 
     def get_branches_data(self, start_date):
         """Данные по филиалам"""
-        branches = Restaurant.objects.annotate(
-            revenue=Sum(
-                'order__total_price',
-                filter=Q(order__created_at__date__gte=start_date)
-            )
-        ).filter(revenue__gt=0).order_by('-revenue')[:8]
+        branches = [
+            branch for branch in branch_metrics(start_date, families=('orders',))
+            if branch.revenue > 0
+        ][:8]
 
         return {
             'labels': [branch.name for branch in branches],
@@ -252,6 +449,13 @@ class ReportsView(LoginRequiredMixin, TemplateView):
                 'url': 'analytics:menu_report',
                 'color': 'success'
             },
+            {
+                'name': 'Матрица меню',
+                'description': 'Звезды, рабочие лошадки, загадки и собаки по филиалам',
+                'icon': 'fa-th-large',
+                'url': 'analytics:menu_engineering_report',
+                'color': 'danger'
+            },
             {
                 'name': 'Отчет по филиалам',
                 'description': 'Сравнительная аналитика филиалов',
@@ -259,6 +463,13 @@ class ReportsView(LoginRequiredMixin, TemplateView):
                 'url': 'analytics:branches_report',
                 'color': 'warning'
             },
+            {
+                'name': 'Отчет по сотрудникам',
+                'description': 'Заказы, выручка и средний чек сотрудников по сменам',
+                'icon': 'fa-user-tie',
+                'url': 'analytics:staff_report',
+                'color': 'info'
+            },
         ]
 
         return context
@@ -276,21 +487,18 @@ class SalesReportView(LoginRequiredMixin, TemplateView):
         end_date = self.request.GET.get('end_date')
         branch_id = self.request.GET.get('branch')
 
-        # Базовый queryset заказов
-        orders = Order.objects.all()
-
-        if start_date:
-            orders = orders.filter(created_at__date__gte=start_date)
-        if end_date:
-            orders = orders.filter(created_at__date__lte=end_date)
-        if branch_id:
-            orders = orders.filter(restaurant_id=branch_id)
+        period = (
+            parse_date(start_date) if start_date else None,
+            parse_date(end_date) if end_date else None,
+        )
+        restaurant_id = int(branch_id) if branch_id and branch_id.isdigit() else None
+        totals, daily_sales = run(*sales_reports(*period, restaurant_id))
 
         # Статистика
         context.update({
-            'total_orders': orders.count(),
-            'total_revenue': orders.aggregate(Sum('total_price'))['total_price'] or 0,
-            'avg_order_value': orders.aggregate(Avg('total_price'))['total_price'] or 0,
+            'total_orders': totals[0]['orders'],
+            'total_revenue': totals[0]['revenue'],
+            'avg_order_value': totals[0]['aov'] or 0,
             'branches': Restaurant.objects.all(),
             'selected_branch': branch_id,
             'start_date': start_date,
@@ -298,15 +506,12 @@ class SalesReportView(LoginRequiredMixin, TemplateView):
         })
 
         # Продажи по дням
-        daily_sales = orders.extra(
-            select={'date': 'date(created_at)'}
-        ).values('date').annotate(
-            orders_count=Count('id'),
-            revenue=Sum('total_price')
-        ).order_by('date')
-
         context['daily_sales'] = daily_sales
 
+        # Перцентили и число различных столов и блюд - из дневных сводок
+        context['distribution'] = distribution(*period, [restaurant_id] if restaurant_id else None)
+        context['distribution_rows'] = [context['distribution'][field] for field in QUANTILE_FIELDS]
+
         return context
 
 
@@ -317,21 +522,14 @@ class MenuReportView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Популярные блюда
-        popular_dishes = MenuItem.objects.annotate(
-            order_count=Count('orderitem'),
-            total_revenue=Sum(F('orderitem__quantity') * F('orderitem__price_at_moment'))
-        ).filter(order_count__gt=0).order_by('-order_count')
-
-        context['popular_dishes'] = popular_dishes
+        dishes, categories = run(*menu_reports())
 
-        # Статистика по категориям
-        category_stats = Category.objects.annotate(
-            dishes_count=Count('menu_items'),
-            orders_count=Count('menu_items__orderitem'),
-            revenue=Sum(F('menu_items__orderitem__quantity') * F('menu_items__orderitem__price_at_moment'))
-        ).filter(is_active=True).order_by('-revenue')
+        # Популярные блюда
+        context['popular_dishes'] = with_dishes(dishes)
 
+        # Статистика по категориям (число блюд - счетчик dishes_count категории)
+        category_stats = with_categories(categories, Category.objects.filter(is_active=True))
+        category_stats.sort(key=lambda category: -category.revenue)
         context['category_stats'] = category_stats
 
         # Неиспользуемые блюда
@@ -341,6 +539,49 @@ class MenuReportView(LoginRequiredMixin, TemplateView):
 
         context['unused_dishes'] = unused_dishes
 
+        # Часто заказывают вместе (счетчики пар, apps.analytics.baskets)
+        context['dish_pairs'] = top_pairs()
+
+        return context
+
+
+class MenuEngineeringView(LoginRequiredMixin, TemplateView):
+    """Матрица меню: популярность и маржа блюд филиала за период"""
+    template_name = 'analytics/menu_engineering.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        start_date = self.request.GET.get('start_date')
+        end_date = self.request.GET.get('end_date')
+        branch_id = self.request.GET.get('branch')
+
+        # Все филиалы считаются одним проходом и кешируются (apps.analytics.menu_engineering)
+        report = menu_engineering(
+            parse_date(start_date) if start_date else None,
+            parse_date(end_date) if end_date else None,
+            int(branch_id) if branch_id and branch_id.isdigit() else None
+        )
+
+        context.update({
+            'report': report,
+            'classes': [
+                {'code': code, 'name': name, 'color': color, 'hint': hint, 'count': report['summary'][code]}
+                for code, name, color, hint in MENU_CLASSES
+            ],
+            'chart_json': json.dumps({
+                'classes': [(code, name) for code, name, _, _ in MENU_CLASSES],
+                'points': [
+                    {'x': dish['share'], 'y': float(dish['margin']), 'name': dish['name'], 'class': dish['class']}
+                    for dish in report['dishes']
+                ],
+            }),
+            'branches': Restaurant.objects.all(),
+            'selected_branch': branch_id,
+            'start_date': start_date,
+            'end_date': end_date,
+        })
+
         return context
 
 
@@ -351,18 +592,98 @@ class BranchesReportView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Статистика по филиалам
-        branches_stats = Restaurant.objects.annotate(
-            orders_count=Count('order'),
-            revenue=Sum('order__total_price'),
-            avg_order_value=Avg('order__total_price'),
-            employees_count=Count('employees', distinct=True)
-        ).order_by('-revenue')
+        start_date = self.request.GET.get('start_date')
+        end_date = self.request.GET.get('end_date')
 
-        context['branches_stats'] = branches_stats
+        # Статистика по филиалам: каждое семейство показателей - свой запрос
+        branches_stats = branch_metrics(
+            parse_date(start_date) if start_date else None,
+            parse_date(end_date) if end_date else None
+        )
 
         # Общая статистика
-        total_revenue = sum(b.revenue or 0 for b in branches_stats)
-        context['total_revenue'] = total_revenue
+        total_revenue = sum(b.revenue for b in branches_stats)
+        for branch in branches_stats:
+            branch.revenue_share = branch.revenue * 100 / total_revenue if total_revenue else 0
 
-        return context
\ No newline at end of file
+        context.update({
+            'branches_stats': branches_stats,
+            'total_revenue': total_revenue,
+            'total_orders': sum(b.orders_count for b in branches_stats),
+            'total_employees': sum(b.employees_count for b in branches_stats),
+            'start_date': start_date,
+            'end_date': end_date,
+        })
+
+        return context
+
+
+class StaffReportView(LoginRequiredMixin, TemplateView):
+    """Рейтинг сотрудников по заказам, которые они оформили"""
+    template_name = 'analytics/staff_report.html'
+    sort_fields = {
+        'revenue': 'Выручка',
+        'orders': 'Заказов',
+        'avg_ticket': 'Средний чек',
+        'items_per_order': 'Порций на заказ',
+    }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        start_date = self.request.GET.get('start_date')
+        end_date = self.request.GET.get('end_date')
+        branch_id = self.request.GET.get('branch')
+        shift = self.request.GET.get('shift')
+        sort = self.request.GET.get('sort')
+        if shift not in {code for code, _, _, _ in SHIFTS}:
+            shift = None
+        if sort not in self.sort_fields:
+            sort = 'revenue'
+
+        # Только свод StaffDailySales (apps.analytics.staff)
+        staff_stats = ranking(
+            parse_date(start_date) if start_date else None,
+            parse_date(end_date) if end_date else None,
+            [int(branch_id)] if branch_id and branch_id.isdigit() else None,
+            shift, sort
+        )
+
+        context.update({
+            'staff_stats': staff_stats,
+            'total_orders': sum(row['orders'] for row in staff_stats),
+            'total_revenue': sum(row['revenue'] for row in staff_stats),
+            'branches': Restaurant.objects.all(),
+            'shifts': [(code, name) for code, name, _, _ in SHIFTS],
+            'sort_fields': self.sort_fields.items(),
+            'selected_branch': branch_id,
+            'selected_shift': shift or '',
+            'selected_sort': sort,
+            'start_date': start_date,
+            'end_date': end_date,
+        })
+
+        return context
+
+
+def dish_companions(request, dish_id):
+    """
+    AJAX блюда, которые чаще всего заказывают вместе с блюдом (подсказки
+    кассе для допродажи)
+
+    Ресторан - параметр restaurant или филиал сотрудника; без него -
+    по всей сети.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'Не авторизован'})
+
+    restaurant_id = request.GET.get('restaurant') or getattr(
+        getattr(request.user, 'employee', None), 'restaurant_id', None
+    )
+    try:
+        restaurant_id = int(restaurant_id) if restaurant_id else None
+        limit = min(int(request.GET.get('limit', 5)), 20)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Некорректные параметры'})
+
+    return JsonResponse({'success': True, 'companions': companions(dish_id, restaurant_id, limit)})
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import ImageSet
+
+
+@admin.register(ImageSet)
+class ImageSetAdmin(admin.ModelAdmin):
+    list_display = ('source', 'width', 'height', 'created_at')
+    search_fields = ('source',)
+    readonly_fields = ('source', 'width', 'height', 'variants', 'created_at')
@@ -0,0 +1,144 @@
+# apps/images/derivatives.py
+"""
+Уменьшенные копии загруженных изображений.
+
+Для каждого изображения из IMAGE_FIELDS Pillow строит копии шириной
+WIDTHS (не больше оригинала) в JPEG и WebP. Файлы сохраняются как
+derivatives/<хеш содержимого>-<ширина>.<расширение>: новое содержимое -
+новое имя, поэтому копии отдаются с «вечными» заголовками кеширования.
+
+Генерация запускается после сохранения модели (см. signals) в фоновом
+пуле потоков процесса и не задерживает ответ на загрузку; для уже
+загруженных файлов - manage.py generate_image_derivatives.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import ImageSet
+
+logger = logging.getLogger(__name__)
+
+# (модель, поле) - изображения, для которых строятся копии
+IMAGE_FIELDS = (
+    ('menu.MenuItem', 'image'),
+    ('menu.Category', 'image'),
+    ('restaurants.Restaurant', 'image'),
+    ('staff.Employee', 'photo'),
+)
+
+WIDTHS = (160, 320, 640, 1280)
+DIRECTORY = 'derivatives'
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Отсутствие набора кешируется ненадолго: копии могут появиться в другом процессе
+MISSING_TIMEOUT = 60
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+_pending = set()
+
+
+def _cache_key(source):
+    return 'imageset:' + hashlib.sha1(source.encode()).hexdigest()
+
+
+def _widths(width):
+    widths = [w for w in WIDTHS if w < width]
+    return widths + [min(width, WIDTHS[-1])]
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == 'jpeg':
+        if image.mode != 'RGB':
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+            image = background
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _store(data, width, extension):
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    name = f'{DIRECTORY}/{digest[:2]}/{digest}-{width}.{extension}'
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return name
+
+
+def generate(source, force=False):
+    """
+    Копии изображения source (имя файла в хранилище). Возвращает ImageSet
+    или None, если файл не найден или не является изображением.
+    """
+    if not force:
+        existing = ImageSet.objects.filter(source=source).first()
+        if existing:
+            return existing
+
+    try:
+        with default_storage.open(source, 'rb') as file:
+            image = Image.open(BytesIO(file.read()))
+            image = ImageOps.exif_transpose(image)
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as error:
+        logger.warning('Не удалось открыть изображение %s: %s', source, error)
+        return None
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    variants = {'jpeg': {}, 'webp': {}}
+    # От большей ширины к меньшей: каждая копия уменьшается из предыдущей
+    resized = image
+    for width in sorted(_widths(image.width), reverse=True):
+        height = max(1, round(image.height * width / image.width))
+        resized = resized.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        variants['jpeg'][str(width)] = _store(_encode(resized, 'jpeg'), width, 'jpg')
+        variants['webp'][str(width)] = _store(_encode(resized, 'webp'), width, 'webp')
+
+    image_set, _ = ImageSet.objects.update_or_create(
+        source=source,
+        defaults={'width': image.width, 'height': image.height, 'variants': variants}
+    )
+    cache.set(_cache_key(source), image_set, None)
+    return image_set
+
+
+def _run(source):
+    try:
+        generate(source)
+    except Exception:
+        logger.exception('Ошибка генерации копий изображения %s', source)
+    finally:
+        _pending.discard(source)
+        close_old_connections()
+
+
+def schedule(source):
+    """Генерация копий в фоновом потоке (повторный вызов для того же файла игнорируется)"""
+    if not source or source in _pending:
+        return
+    _pending.add(source)
+    _executor.submit(_run, source)
+
+
+def get_image_set(source):
+    """Набор копий для шаблонов; None, пока копии не построены"""
+    if not source:
+        return None
+    key = _cache_key(source)
+    image_set = cache.get(key)
+    if image_set is None:
+        image_set = ImageSet.objects.filter(source=source).first() or False
+        cache.set(key, image_set, None if image_set else MISSING_TIMEOUT)
+    return image_set or None
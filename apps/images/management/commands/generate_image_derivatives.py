@@ -0,0 +1,27 @@
+# apps/images/management/commands/generate_image_derivatives.py
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from apps.images.derivatives import IMAGE_FIELDS, generate
+
+
+class Command(BaseCommand):
+    help = 'Построение уменьшенных копий (JPEG/WebP) для уже загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Перестроить существующие копии')
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for model_label, field_name in IMAGE_FIELDS:
+            model = apps.get_model(model_label)
+            sources = model.objects.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            ).values_list(field_name, flat=True).distinct()
+            for source in sources.iterator():
+                if generate(source, force=options['force']):
+                    built += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'Не удалось обработать {source}')
+        self.stdout.write(self.style.SUCCESS(f'Обработано изображений: {built}, с ошибками: {failed}'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True, verbose_name='Исходный файл')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина оригинала')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота оригинала')),
+                ('variants', models.JSONField(default=dict, verbose_name='Копии')),
+                ('created_at', models.DateTimeField(auto_now=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Набор изображений',
+                'verbose_name_plural': 'Наборы изображений',
+            },
+        ),
+    ]
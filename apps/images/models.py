@@ -0,0 +1,33 @@
+# apps/images/models.py
+from django.core.files.storage import default_storage
+from django.db import models
+
+
+class ImageSet(models.Model):
+    """
+    Уменьшенные копии загруженного изображения (см. apps.images.derivatives).
+
+    source - имя исходного файла в хранилище (значение ImageField);
+    variants - {"jpeg": {"320": имя файла, ...}, "webp": {...}}. Имена
+    копий содержат хеш содержимого, поэтому их можно кешировать навсегда.
+    """
+    source = models.CharField('Исходный файл', max_length=255, unique=True)
+    width = models.PositiveIntegerField('Ширина оригинала')
+    height = models.PositiveIntegerField('Высота оригинала')
+    variants = models.JSONField('Копии', default=dict)
+    created_at = models.DateTimeField('Создано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Набор изображений'
+        verbose_name_plural = 'Наборы изображений'
+
+    def __str__(self):
+        return self.source
+
+    def srcset(self, image_format):
+        """Значение атрибута srcset для формата jpeg или webp"""
+        sizes = self.variants.get(image_format, {})
+        return ', '.join(
+            f'{default_storage.url(name)} {width}w'
+            for width, name in sorted(sizes.items(), key=lambda size: int(size[0]))
+        )
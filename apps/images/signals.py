@@ -0,0 +1,21 @@
+# apps/images/signals.py
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .derivatives import IMAGE_FIELDS, schedule
+
+
+def _connect(model_label, field_name):
+    def image_saved(sender, instance, **kwargs):
+        """Копии нового изображения строятся после фиксации транзакции"""
+        source = getattr(instance, field_name).name
+        if source:
+            transaction.on_commit(lambda: schedule(source))
+
+    post_save.connect(image_saved, sender=apps.get_model(model_label), weak=False,
+                      dispatch_uid=f'image_derivatives_{model_label}_{field_name}')
+
+
+for model_label, field_name in IMAGE_FIELDS:
+    _connect(model_label, field_name)
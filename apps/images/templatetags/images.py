@@ -0,0 +1,46 @@
+# apps/images/templatetags/images.py
+"""
+{% load images %}
+{% responsive_image dish.image alt=dish.name sizes="(max-width: 768px) 100vw, 33vw" css_class="card-img-top" %}
+
+Выводит <picture> с WebP и JPEG копиями в srcset и loading="lazy".
+Пока копии не построены, выводится исходный файл.
+"""
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from apps.images.derivatives import get_image_set
+
+register = template.Library()
+
+# Ширина копии в src - для браузеров без поддержки srcset
+FALLBACK_WIDTH = 640
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class='', style='', width=None, height=None):
+    if not image:
+        return ''
+
+    image_set = get_image_set(image.name)
+    if image_set is not None and not width and not height:
+        width, height = image_set.width, image_set.height
+    attrs = format_html_join('', ' {}="{}"', (
+        (name, value)
+        for name, value in (('alt', alt), ('class', css_class), ('style', style), ('width', width), ('height', height))
+        if value or name == 'alt'
+    ))
+
+    if image_set is None:
+        return format_html('<img src="{}" loading="lazy" decoding="async"{}>', image.url, attrs)
+
+    jpeg = image_set.variants['jpeg']
+    fallback = max((w for w in jpeg if int(w) <= FALLBACK_WIDTH), key=int, default=min(jpeg, key=int))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" loading="lazy" decoding="async"{}></picture>',
+        image_set.srcset('webp'), sizes,
+        default_storage.url(jpeg[fallback]), image_set.srcset('jpeg'), sizes,
+        attrs
+    )
@@ -0,0 +1,20 @@
+# apps/images/views.py
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+from .derivatives import DIRECTORY
+
+# Имена копий содержат хеш содержимого и никогда не меняются
+CACHE_SECONDS = 365 * 24 * 60 * 60
+
+
+def serve_derivative(request, path):
+    """
+    Копии изображений с «вечными» заголовками кеширования (режим DEBUG;
+    в продакшене тот же Cache-Control для /media/derivatives/ выставляет
+    веб-сервер).
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT / DIRECTORY)
+    patch_cache_control(response, public=True, max_age=CACHE_SECONDS, immutable=True)
+    return response
@@ -1,16 +1,96 @@
 from django.contrib import admin
-from .models import Ingredient, StockItem, Recipe
+from .models import (
+    Supplier, Ingredient, StockItem, StockLot, StockMovement, Stocktake, StocktakeLine, StockTransfer,
+    StockTransferLine, StockAlert, PurchaseOrder, PurchaseOrderLine, Recipe
+)
+
+@admin.register(Supplier)
+class SupplierAdmin(admin.ModelAdmin):
+    list_display = ('name', 'phone_number', 'email')
+    search_fields = ('name',)
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'unit')
+    list_display = ('name', 'unit', 'shelf_life_days', 'supplier')
+    list_filter = ('supplier',)
     search_fields = ('name',)
 
 @admin.register(StockItem)
 class StockItemAdmin(admin.ModelAdmin):
-    list_display = ('ingredient', 'restaurant', 'quantity', 'last_updated')
-    list_filter = ('restaurant',)
+    list_display = ('ingredient', 'restaurant', 'get_quantity', 'is_low', 'last_updated')
+    list_filter = ('restaurant', 'is_low')
     search_fields = ('ingredient__name',)
     autocomplete_fields = ('ingredient', 'restaurant')
 
-admin.site.register(Recipe)
\ No newline at end of file
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient', 'restaurant')
+
+    def get_quantity(self, obj):
+        return obj.quantity_display
+
+    get_quantity.short_description = 'Количество'
+    get_quantity.admin_order_field = 'quantity'
+
+@admin.register(StockAlert)
+class StockAlertAdmin(admin.ModelAdmin):
+    list_display = ('ingredient', 'restaurant', 'quantity_display', 'created_at')
+    list_filter = ('restaurant',)
+    search_fields = ('ingredient__name',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient', 'restaurant')
+
+@admin.register(StockLot)
+class StockLotAdmin(admin.ModelAdmin):
+    list_display = ('ingredient', 'restaurant', 'quantity_display', 'received_at', 'expires_at')
+    list_filter = ('restaurant',)
+    search_fields = ('ingredient__name',)
+    date_hierarchy = 'expires_at'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient', 'restaurant')
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('ingredient', 'restaurant', 'kind', 'quantity_display', 'created_at')
+    list_filter = ('kind', 'restaurant')
+    search_fields = ('ingredient__name',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient', 'restaurant')
+
+class StocktakeLineInline(admin.TabularInline):
+    model = StocktakeLine
+    extra = 0
+    fields = ('ingredient', 'counted', 'expected')
+
+@admin.register(Stocktake)
+class StocktakeAdmin(admin.ModelAdmin):
+    list_display = ('id', 'restaurant', 'counted_at', 'created_by')
+    list_filter = ('restaurant',)
+    inlines = [StocktakeLineInline]
+
+class StockTransferLineInline(admin.TabularInline):
+    model = StockTransferLine
+    extra = 0
+    fields = ('ingredient', 'quantity')
+
+@admin.register(StockTransfer)
+class StockTransferAdmin(admin.ModelAdmin):
+    list_display = ('id', 'source', 'destination', 'status', 'created_at', 'completed_at')
+    list_filter = ('status', 'source', 'destination')
+    readonly_fields = ('status', 'completed_at')
+    inlines = [StockTransferLineInline]
+
+class PurchaseOrderLineInline(admin.TabularInline):
+    model = PurchaseOrderLine
+    extra = 0
+    fields = ('ingredient', 'quantity', 'forecast', 'on_hand')
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'restaurant', 'supplier', 'status', 'horizon_days', 'created_at')
+    list_filter = ('status', 'restaurant', 'supplier')
+    inlines = [PurchaseOrderLineInline]
+
+admin.site.register(Recipe)
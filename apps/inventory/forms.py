@@ -1,10 +1,46 @@
 from django import forms
-from .models import StockItem, Ingredient, Recipe
+from .models import StockItem, Ingredient, Recipe, StockTransfer, StockTransferLine
 from apps.restaurants.models import Restaurant
 from apps.menu.models import MenuItem
 
 
-class StockItemForm(forms.ModelForm):
+class BaseUnitQuantityMixin:
+    """
+    Ввод количеств в единицах ингредиента (кг, л, шт...) для полей,
+    которые хранятся в целых базовых единицах
+    """
+    base_unit_fields = ('quantity',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.base_unit_fields:
+            field = self.fields[name]
+            field.widget.attrs.pop('max', None)
+            self.fields[name] = forms.DecimalField(
+                label=field.label,
+                required=field.required,
+                min_value=0,
+                max_digits=15,
+                decimal_places=3,
+                widget=field.widget,
+            )
+            if self.instance.pk:
+                self.initial[name] = self.instance.ingredient.from_base(getattr(self.instance, name))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        ingredient = cleaned_data.get('ingredient')
+        if ingredient is None and self.instance.ingredient_id:
+            ingredient = self.instance.ingredient
+        if ingredient is not None:
+            for name in self.base_unit_fields:
+                amount = cleaned_data.get(name)
+                if amount is not None:
+                    cleaned_data[name] = ingredient.to_base(amount)
+        return cleaned_data
+
+
+class StockItemForm(BaseUnitQuantityMixin, forms.ModelForm):
     """Форма для добавления товара на склад"""
 
     class Meta:
@@ -34,6 +70,44 @@ class StockItemForm(forms.ModelForm):
         self.fields['ingredient'].empty_label = "Выберите ингредиент..."
         self.fields['restaurant'].empty_label = "Выберите ресторан..."
 
+    def validate_unique(self):
+        # Существующая позиция не ошибка: поступление прибавляется к остатку
+        pass
+
+
+class StockQuantityForm(BaseUnitQuantityMixin, forms.ModelForm):
+    """Форма изменения остатка, точки заказа и целевого запаса"""
+    base_unit_fields = ('quantity', 'reorder_point', 'par_level')
+
+    class Meta:
+        model = StockItem
+        fields = ['quantity', 'reorder_point', 'par_level']
+        widgets = {
+            'quantity': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'step': '0.001',
+            }),
+            'reorder_point': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'step': '0.001',
+            }),
+            'par_level': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'step': '0.001',
+            })
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        reorder_point = cleaned_data.get('reorder_point')
+        par_level = cleaned_data.get('par_level')
+        if reorder_point is not None and par_level and par_level < reorder_point:
+            self.add_error('par_level', 'Целевой запас не может быть ниже точки заказа')
+        return cleaned_data
+
 
 class QuickIngredientForm(forms.ModelForm):
     """Быстрая форма для создания ингредиента"""
@@ -63,7 +137,7 @@ class QuickIngredientForm(forms.ModelForm):
         }
 
 
-class RecipeForm(forms.ModelForm):
+class RecipeForm(BaseUnitQuantityMixin, forms.ModelForm):
     """Форма для создания рецептов блюд"""
 
     class Meta:
@@ -89,4 +163,144 @@ class RecipeForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['menu_item'].queryset = MenuItem.objects.all().order_by('category__name', 'name')
-        self.fields['ingredient'].queryset = Ingredient.objects.all().order_by('name')
\ No newline at end of file
+        self.fields['ingredient'].queryset = Ingredient.objects.all().order_by('name')
+
+class DeliveryIntakeForm(forms.Form):
+    """Форма загрузки накладной поставщика"""
+
+    restaurant = forms.ModelChoiceField(
+        queryset=Restaurant.objects.all().order_by('name'),
+        label='Филиал',
+        empty_label='Выберите ресторан...',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    invoice = forms.FileField(
+        label='Накладная (CSV или XLSX)',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx'
+        })
+    )
+
+    def clean_invoice(self):
+        invoice = self.cleaned_data['invoice']
+        if not invoice.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Поддерживаются только файлы CSV и XLSX')
+        return invoice
+
+
+class StocktakeForm(forms.Form):
+    """
+    Инвентаризация ресторана: поле фактического остатка на каждую позицию
+    склада. Пустые поля означают, что позиция не пересчитывалась.
+    """
+
+    note = forms.CharField(
+        label='Комментарий',
+        required=False,
+        max_length=255,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Например: конец месяца'})
+    )
+
+    def __init__(self, *args, stock_items=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stock_items = list(stock_items)
+        for item in self.stock_items:
+            self.fields[self.field_name(item.ingredient_id)] = forms.DecimalField(
+                label=item.ingredient.name,
+                required=False,
+                min_value=0,
+                max_digits=15,
+                decimal_places=3,
+                widget=forms.NumberInput(attrs={
+                    'class': 'form-control form-control-sm',
+                    'min': '0',
+                    'step': '0.001',
+                    'placeholder': str(item.amount)
+                })
+            )
+
+    @staticmethod
+    def field_name(ingredient_id):
+        return f'count_{ingredient_id}'
+
+    def rows(self):
+        """Пары (позиция склада, поле ввода) для шаблона"""
+        return [(item, self[self.field_name(item.ingredient_id)]) for item in self.stock_items]
+
+    def counts(self):
+        """Пересчитанные остатки {ingredient_id: базовые единицы}"""
+        counts = {}
+        for item in self.stock_items:
+            amount = self.cleaned_data.get(self.field_name(item.ingredient_id))
+            if amount is not None:
+                counts[item.ingredient_id] = item.ingredient.to_base(amount)
+        return counts
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not self.errors and not self.counts():
+            raise forms.ValidationError('Введите фактический остаток хотя бы для одной позиции')
+        return cleaned_data
+
+
+class StockTransferForm(forms.ModelForm):
+    """Шапка перемещения между филиалами"""
+
+    class Meta:
+        model = StockTransfer
+        fields = ['source', 'destination', 'note']
+        widgets = {
+            'source': forms.Select(attrs={'class': 'form-select'}),
+            'destination': forms.Select(attrs={'class': 'form-select'}),
+            'note': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Комментарий'})
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['source'].queryset = Restaurant.objects.all().order_by('name')
+        self.fields['destination'].queryset = Restaurant.objects.all().order_by('name')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        source = cleaned_data.get('source')
+        if source and source == cleaned_data.get('destination'):
+            self.add_error('destination', 'Филиал-получатель должен отличаться от отправителя')
+        return cleaned_data
+
+
+class StockTransferLineForm(BaseUnitQuantityMixin, forms.ModelForm):
+    """Позиция перемещения"""
+
+    class Meta:
+        model = StockTransferLine
+        fields = ['ingredient', 'quantity']
+        widgets = {
+            'ingredient': forms.Select(attrs={'class': 'form-select'}),
+            'quantity': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '0',
+                'step': '0.001',
+                'placeholder': 'Количество'
+            })
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['ingredient'].queryset = Ingredient.objects.all().order_by('name')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('quantity') == 0:
+            self.add_error('quantity', 'Количество должно быть больше нуля')
+        return cleaned_data
+
+
+StockTransferLineFormSet = forms.inlineformset_factory(
+    StockTransfer, StockTransferLine,
+    form=StockTransferLineForm,
+    extra=5,
+    can_delete=False,
+    min_num=1,
+    validate_min=True
+)
@@ -0,0 +1,213 @@
+# apps/inventory/intake.py
+"""
+Приемка поставки по накладной поставщика (CSV или XLSX).
+
+Файл читается построчно, названия ингредиентов сопоставляются одним
+запросом, а все приращения применяются к складу ресторана одной
+транзакцией (см. services.receive_stock).
+
+Ожидаемые колонки: название ингредиента, количество и (необязательно)
+единица измерения. Если единица не указана, используется единица
+ингредиента; единица того же измерения (г вместо кг) пересчитывается.
+"""
+import codecs
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+from zipfile import BadZipFile
+
+from .models import Ingredient
+from .services import receive_stock
+from . import units
+
+NAME_HEADERS = {'ингредиент', 'название', 'наименование', 'товар', 'ingredient', 'name'}
+QUANTITY_HEADERS = {'количество', 'кол-во', 'quantity', 'qty'}
+UNIT_HEADERS = {'единица', 'ед', 'ед.', 'ед. изм.', 'unit'}
+
+
+class InvoiceFormatError(ValueError):
+    """Файл накладной не удалось разобрать"""
+
+
+def _normalize(value):
+    return ' '.join(str(value or '').split()).casefold()
+
+
+# Сколько байт начала файла проверяется при выборе кодировки
+ENCODING_SAMPLE = 64 * 1024
+
+
+def _detect_encoding(file):
+    """UTF-8 (с BOM или без), иначе cp1251 - кодировка CSV из Excel в русской локали"""
+    sample = file.read(ENCODING_SAMPLE)
+    file.seek(0)
+    try:
+        # final=False: обрезанный на границе выборки символ - не ошибка
+        codecs.getincrementaldecoder('utf-8-sig')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return 'cp1251'
+    return 'utf-8-sig'
+
+
+def _iter_csv(file):
+    stream = io.TextIOWrapper(file, encoding=_detect_encoding(file), newline='')
+    try:
+        first_line = stream.readline()
+        if not first_line:
+            return
+        # Выгрузки из Excel в русской локали используют «;»
+        delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+        yield from csv.reader(chain([first_line], stream), delimiter=delimiter)
+    except UnicodeDecodeError:
+        raise InvoiceFormatError('Не удалось определить кодировку файла, сохраните его в UTF-8')
+    finally:
+        # Загруженный файл закрывает Django, а не обертка
+        stream.detach()
+
+
+def _iter_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise InvoiceFormatError('Для импорта XLSX установите пакет openpyxl')
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (BadZipFile, InvalidFileException, KeyError, OSError):
+        raise InvoiceFormatError('Файл XLSX поврежден или имеет другой формат')
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """Строки таблицы CSV или XLSX (списки значений ячеек)"""
+    if filename.lower().endswith('.xlsx'):
+        return _iter_xlsx(file)
+    if filename.lower().endswith(('.csv', '.txt')):
+        return _iter_csv(file)
+    raise InvoiceFormatError('Поддерживаются только файлы CSV и XLSX')
+
+
+def iter_invoice_rows(file, filename):
+    """
+    Построчное чтение накладной.
+
+    Возвращает генератор (номер строки, название, количество, единица);
+    строка заголовка определяется по названиям колонок и пропускается.
+    """
+    rows = read_rows(file, filename)
+
+    columns = (0, 1, 2)
+    header_checked = False
+    for line_number, row in enumerate(rows, start=1):
+        cells = [_normalize(cell) for cell in row]
+        if not any(cells):
+            continue
+
+        is_header = not header_checked and NAME_HEADERS.intersection(cells)
+        header_checked = True
+        if is_header:
+            def find(headers, default):
+                return next((i for i, cell in enumerate(cells) if cell in headers), default)
+
+            columns = (find(NAME_HEADERS, 0), find(QUANTITY_HEADERS, 1), find(UNIT_HEADERS, None))
+            continue
+
+        name_col, quantity_col, unit_col = columns
+
+        def cell(index):
+            if index is None or index >= len(row):
+                return None
+            return row[index]
+
+        yield line_number, cell(name_col), cell(quantity_col), cell(unit_col)
+
+
+def _parse_quantity(value):
+    if isinstance(value, (int, float, Decimal)):
+        value = Decimal(str(value))
+    else:
+        text = str(value or '').strip().replace('\xa0', '').replace(' ', '').replace(',', '.')
+        value = Decimal(text)
+    # NaN и Infinity разбираются Decimal, но не являются количеством
+    if not value.is_finite():
+        raise ValueError(value)
+    return value
+
+
+def import_invoice(restaurant, file, filename):
+    """
+    Приемка накладной на склад ресторана.
+
+    Возвращает отчет:
+        lines    - количество разобранных строк с данными
+        applied  - [{'ingredient', 'quantity'}] по каждому пополненному ингредиенту
+        unknown  - [{'line', 'name'}] строки с неизвестными ингредиентами
+        errors   - [{'line', 'name', 'message'}] строки с ошибками в данных
+    """
+    ingredients = {
+        _normalize(name): (ingredient_id, name, unit)
+        for ingredient_id, name, unit in Ingredient.objects.values_list('id', 'name', 'unit')
+    }
+
+    report = {'lines': 0, 'applied': [], 'unknown': [], 'errors': []}
+    increments = {}
+
+    for line_number, name, raw_quantity, raw_unit in iter_invoice_rows(file, filename):
+        report['lines'] += 1
+        match = ingredients.get(_normalize(name))
+        if match is None:
+            report['unknown'].append({'line': line_number, 'name': str(name or '').strip()})
+            continue
+
+        ingredient_id, ingredient_name, ingredient_unit = match
+        try:
+            amount = _parse_quantity(raw_quantity)
+        except (InvalidOperation, ValueError):
+            report['errors'].append({
+                'line': line_number,
+                'name': ingredient_name,
+                'message': f'Некорректное количество «{raw_quantity}»'
+            })
+            continue
+        if amount <= 0:
+            report['errors'].append({
+                'line': line_number,
+                'name': ingredient_name,
+                'message': 'Количество должно быть больше нуля'
+            })
+            continue
+
+        unit = str(raw_unit or '').strip().rstrip('.').lower() or ingredient_unit
+        if unit not in units.UNIT_FACTORS or units.dimension_of(unit) != units.dimension_of(ingredient_unit):
+            report['errors'].append({
+                'line': line_number,
+                'name': ingredient_name,
+                'message': f'Единица «{unit}» не подходит для ингредиента ({ingredient_unit})'
+            })
+            continue
+
+        total = increments.get(ingredient_id, 0)
+        if amount * units.factor_of(unit) > units.MAX_QUANTITY - total:
+            report['errors'].append({
+                'line': line_number,
+                'name': ingredient_name,
+                'message': f'Слишком большое количество «{raw_quantity}»'
+            })
+            continue
+
+        increments[ingredient_id] = total + units.to_base(amount, unit)
+
+    receive_stock(restaurant.id, increments)
+
+    names = {ingredient_id: (name, unit) for ingredient_id, name, unit in ingredients.values()}
+    for ingredient_id, amount in increments.items():
+        name, unit = names[ingredient_id]
+        report['applied'].append({'ingredient': name, 'quantity': units.format_quantity(amount, unit)})
+    report['applied'].sort(key=lambda line: line['ingredient'])
+
+    return report
@@ -0,0 +1,125 @@
+# apps/inventory/lots.py
+"""
+Партии товара: поступление, расход по FIFO и сроки годности.
+
+Расход считается одним запросом с оконной суммой: для каждой партии
+ингредиента известно, сколько лежит в партиях, которые расходуются раньше
+нее, поэтому сразу видно, сколько взять из самой партии. Результат
+применяется одним UPDATE. Партии выбираются по индексу
+(restaurant, ingredient, expires_at), просроченные не расходуются.
+
+Функции модуля вызываются из services внутри транзакции, которая уже
+заблокировала строки StockItem тех же ингредиентов.
+"""
+from datetime import timedelta
+
+from django.db.models import Case, F, Q, Sum, Value, When, BigIntegerField, Window
+from django.db.models.expressions import RowRange
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import Ingredient, StockLot
+
+# Сначала партии с ближайшим сроком годности, бессрочные - последними
+FIFO_ORDER = [F('expires_at').asc(nulls_last=True), F('received_at').asc(), F('id').asc()]
+
+
+def add_lots(restaurant_id, increments, lots=None, now=None):
+    """
+    Новые партии на складе ресторана.
+
+    increments - {ingredient_id: базовые единицы}; срок годности считается
+    от срока хранения ингредиента. Если переданы lots - список
+    (ingredient_id, количество, годна до), партии создаются из него
+    (перемещение сохраняет сроки исходных партий).
+    """
+    now = now or timezone.now()
+    if lots is None:
+        shelf_life = dict(Ingredient.objects.filter(
+            id__in=list(increments), shelf_life_days__isnull=False
+        ).values_list('id', 'shelf_life_days'))
+        lots = [
+            (ingredient_id, quantity,
+             now + timedelta(days=shelf_life[ingredient_id]) if ingredient_id in shelf_life else None)
+            for ingredient_id, quantity in increments.items()
+        ]
+    return StockLot.objects.bulk_create([
+        StockLot(restaurant_id=restaurant_id, ingredient_id=ingredient_id, quantity=quantity,
+                 received_at=now, expires_at=expires_at)
+        for ingredient_id, quantity, expires_at in lots if quantity > 0
+    ])
+
+
+def usable_lots(restaurant_id, ingredient_ids, now=None):
+    """Непросроченные партии с остатком"""
+    now = now or timezone.now()
+    return StockLot.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+        restaurant_id=restaurant_id,
+        ingredient_id__in=list(ingredient_ids),
+        quantity__gt=0
+    )
+
+
+def consume_lots(restaurant_id, requirements, now=None):
+    """
+    Расход партий по FIFO.
+
+    requirements - {ingredient_id: базовые единицы}. Возвращает список
+    (ingredient_id, взято, годна до) по каждой затронутой партии. Если
+    партий не хватает, расходуется все, что есть.
+    """
+    if not requirements:
+        return []
+
+    need = Case(
+        *[When(ingredient_id=ingredient_id, then=Value(quantity))
+          for ingredient_id, quantity in requirements.items()],
+        default=Value(0),
+        output_field=BigIntegerField()
+    )
+    running = Window(
+        Sum('quantity'),
+        partition_by=[F('ingredient_id')],
+        order_by=FIFO_ORDER,
+        frame=RowRange(start=None, end=0)
+    )
+    taken = list(
+        usable_lots(restaurant_id, requirements, now).annotate(
+            take=Least(F('quantity'), Greatest(need - (running - F('quantity')), Value(0)))
+        ).filter(take__gt=0).values_list('id', 'ingredient_id', 'take', 'expires_at')
+    )
+    if not taken:
+        return []
+
+    StockLot.objects.filter(id__in=[lot_id for lot_id, _, _, _ in taken]).update(
+        quantity=F('quantity') - Case(
+            *[When(id=lot_id, then=Value(take)) for lot_id, _, take, _ in taken],
+            default=Value(0),
+            output_field=BigIntegerField()
+        )
+    )
+    return [(ingredient_id, take, expires_at) for _, ingredient_id, take, expires_at in taken]
+
+
+def expiring_lots(days=3, restaurant_id=None, now=None):
+    """
+    Партии с остатком, срок которых истекает в ближайшие days дней
+    (включая уже просроченные). Условие совпадает с частичным индексом
+    stock_lot_expiry_idx, поэтому читается только нужный диапазон.
+    """
+    now = now or timezone.now()
+    lots = StockLot.objects.filter(quantity__gt=0, expires_at__lte=now + timedelta(days=days))
+    if restaurant_id:
+        lots = lots.filter(restaurant_id=restaurant_id)
+    return lots.order_by('expires_at')
+
+
+def reconcile_lots(restaurant_id, deltas, now=None):
+    """
+    Приведение партий к исправленному остатку (инвентаризация, ручная
+    правка): излишек становится новой партией, недостача расходует
+    партии по FIFO. deltas - {ingredient_id: новое - старое}.
+    """
+    add_lots(restaurant_id, {i: delta for i, delta in deltas.items() if delta > 0}, now=now)
+    consume_lots(restaurant_id, {i: -delta for i, delta in deltas.items() if delta < 0}, now=now)
@@ -0,0 +1,32 @@
+# apps/inventory/management/commands/generate_purchase_orders.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.inventory.forecasting import generate_purchase_orders, DEFAULT_HISTORY_DAYS, DEFAULT_ALPHA
+
+
+class Command(BaseCommand):
+    help = 'Прогноз расхода ингредиентов и черновики заказов поставщикам (ночной запуск)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Горизонт прогноза в днях')
+        parser.add_argument('--history', type=int, default=DEFAULT_HISTORY_DAYS,
+                            help='Сколько дней истории продаж использовать')
+        parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                            help='Коэффициент экспоненциального сглаживания (0..1)')
+        parser.add_argument('--restaurant', type=int, action='append', dest='restaurants',
+                            help='ID ресторана (можно указать несколько раз)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        orders = generate_purchase_orders(
+            horizon=options['days'],
+            history_days=options['history'],
+            alpha=options['alpha'],
+            restaurant_ids=options['restaurants']
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано черновиков заказов поставщикам: {len(orders)} за {elapsed:.2f} с'
+        ))
@@ -0,0 +1,39 @@
+# apps/inventory/management/commands/import_delivery.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inventory.intake import import_invoice, InvoiceFormatError
+from apps.restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Приемка поставки на склад ресторана из накладной поставщика (CSV или XLSX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('restaurant_id', type=int, help='ID ресторана')
+        parser.add_argument('path', help='Путь к файлу накладной')
+
+    def handle(self, *args, **options):
+        try:
+            restaurant = Restaurant.objects.get(pk=options['restaurant_id'])
+        except Restaurant.DoesNotExist:
+            raise CommandError(f'Ресторан с ID {options["restaurant_id"]} не найден')
+
+        path = options['path']
+        try:
+            with open(path, 'rb') as invoice:
+                report = import_invoice(restaurant, invoice, path)
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
+        except InvoiceFormatError as e:
+            raise CommandError(str(e))
+
+        for line in report['applied']:
+            self.stdout.write(f'+ {line["ingredient"]}: {line["quantity"]}')
+        for line in report['unknown']:
+            self.stdout.write(self.style.WARNING(f'Строка {line["line"]}: неизвестный ингредиент «{line["name"]}»'))
+        for line in report['errors']:
+            self.stdout.write(self.style.ERROR(f'Строка {line["line"]} ({line["name"]}): {line["message"]}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{restaurant.name}: строк {report["lines"]}, пополнено позиций {len(report["applied"])}'
+        ))
@@ -0,0 +1,15 @@
+# apps/inventory/management/commands/write_off_expired.py
+from django.core.management.base import BaseCommand
+
+from apps.inventory.services import write_off_expired
+
+
+class Command(BaseCommand):
+    help = 'Списание просроченных партий со складов (ночной запуск)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, help='ID ресторана (по умолчанию все)')
+
+    def handle(self, *args, **options):
+        written_off = write_off_expired(restaurant_id=options['restaurant'])
+        self.stdout.write(self.style.SUCCESS(f'Списано просроченных партий: {written_off}'))
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:00
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+# Копия таблицы apps.inventory.units на момент миграции
+UNIT_FACTORS = {
+    'кг': 1_000_000,
+    'г': 1_000,
+    'л': 1_000,
+    'мл': 1,
+    'шт': 1_000,
+    'уп': 1_000,
+}
+
+
+def to_base_units(apps, schema_editor):
+    for model_name in ('StockItem', 'Recipe'):
+        model = apps.get_model('inventory', model_name)
+        rows = list(model.objects.select_related('ingredient'))
+        for row in rows:
+            factor = UNIT_FACTORS.get(row.ingredient.unit, 1)
+            value = Decimal(row.quantity or 0) * factor
+            row.quantity_base = int(value.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+        model.objects.bulk_update(rows, ['quantity_base'], batch_size=500)
+
+
+def from_base_units(apps, schema_editor):
+    for model_name in ('StockItem', 'Recipe'):
+        model = apps.get_model('inventory', model_name)
+        rows = list(model.objects.select_related('ingredient'))
+        for row in rows:
+            factor = UNIT_FACTORS.get(row.ingredient.unit, 1)
+            row.quantity = (Decimal(row.quantity_base) / factor).quantize(Decimal('0.001'))
+        model.objects.bulk_update(rows, ['quantity'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_alter_ingredient_options_alter_ingredient_unit'),
+    ]
+
+    operations = [
+        # default нужен, чтобы откат мог заново добавить старую колонку
+        migrations.AlterField(
+            model_name='recipe',
+            name='quantity',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=10, verbose_name='Количество'),
+        ),
+        migrations.AddField(
+            model_name='stockitem',
+            name='quantity_base',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='quantity_base',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(to_base_units, from_base_units),
+        migrations.RemoveField(
+            model_name='stockitem',
+            name='quantity',
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='quantity',
+        ),
+        migrations.RenameField(
+            model_name='stockitem',
+            old_name='quantity_base',
+            new_name='quantity',
+        ),
+        migrations.RenameField(
+            model_name='recipe',
+            old_name='quantity_base',
+            new_name='quantity',
+        ),
+        migrations.AlterField(
+            model_name='stockitem',
+            name='quantity',
+            field=models.BigIntegerField(default=0, help_text='В базовых единицах: мг, мл или тысячные доли штуки', verbose_name='Количество'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='quantity',
+            field=models.BigIntegerField(help_text='Сколько базовых единиц ингредиента нужно на одну порцию', verbose_name='Количество'),
+        ),
+    ]
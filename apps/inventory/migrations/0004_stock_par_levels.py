@@ -0,0 +1,82 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+# Прежний жестко заданный порог «меньше 10 единиц», в базовых единицах
+LEGACY_REORDER_POINTS = {
+    'кг': 10_000_000,
+    'г': 10_000,
+    'л': 10_000,
+    'мл': 10,
+    'шт': 10_000,
+    'уп': 10_000,
+}
+
+
+def seed_reorder_points(apps, schema_editor):
+    StockItem = apps.get_model('inventory', 'StockItem')
+    for unit, reorder_point in LEGACY_REORDER_POINTS.items():
+        StockItem.objects.filter(ingredient__unit=unit).update(reorder_point=reorder_point)
+    StockItem.objects.filter(quantity__lt=F('reorder_point')).update(is_low=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_quantity_base_units'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(verbose_name='Остаток')),
+                ('reorder_point', models.BigIntegerField(verbose_name='Точка заказа')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+            ],
+            options={
+                'verbose_name': 'Оповещение о низком остатке',
+                'verbose_name_plural': 'Оповещения о низких остатках',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='stockitem',
+            name='is_low',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Заканчивается'),
+        ),
+        migrations.AddField(
+            model_name='stockitem',
+            name='par_level',
+            field=models.BigIntegerField(default=0, help_text='До какого уровня пополнять склад (базовые единицы)', verbose_name='Целевой запас'),
+        ),
+        migrations.AddField(
+            model_name='stockitem',
+            name='reorder_point',
+            field=models.BigIntegerField(default=0, help_text='Остаток ниже этого уровня считается низким (базовые единицы)', verbose_name='Точка заказа'),
+        ),
+        migrations.AddIndex(
+            model_name='stockitem',
+            index=models.Index(condition=models.Q(('is_low', True)), fields=['restaurant'], name='stock_low_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.ingredient', verbose_name='Ингредиент'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='restaurants.restaurant', verbose_name='Ресторан'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='stock_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='inventory.stockitem', verbose_name='Позиция на складе'),
+        ),
+        migrations.RunPython(seed_reorder_points, migrations.RunPython.noop),
+    ]
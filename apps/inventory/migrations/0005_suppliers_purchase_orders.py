@@ -0,0 +1,70 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stock_par_levels'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Supplier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, unique=True, verbose_name='Название поставщика')),
+                ('phone_number', models.CharField(blank=True, max_length=20, verbose_name='Телефон')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='Email')),
+            ],
+            options={
+                'verbose_name': 'Поставщик',
+                'verbose_name_plural': 'Поставщики',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('DRAFT', 'Черновик'), ('SENT', 'Отправлен'), ('RECEIVED', 'Получен'), ('CANCELLED', 'Отменен')], default='DRAFT', max_length=20, verbose_name='Статус')),
+                ('horizon_days', models.PositiveIntegerField(default=7, verbose_name='Горизонт прогноза (дней)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_orders', to='restaurants.restaurant', verbose_name='Ресторан')),
+                ('supplier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchase_orders', to='inventory.supplier', verbose_name='Поставщик')),
+            ],
+            options={
+                'verbose_name': 'Заказ поставщику',
+                'verbose_name_plural': 'Заказы поставщикам',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='supplier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingredients', to='inventory.supplier', verbose_name='Поставщик'),
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(help_text='В базовых единицах', verbose_name='Заказать')),
+                ('forecast', models.BigIntegerField(default=0, help_text='В базовых единицах', verbose_name='Прогноз расхода')),
+                ('on_hand', models.BigIntegerField(default=0, help_text='В базовых единицах', verbose_name='Остаток на момент прогноза')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.ingredient', verbose_name='Ингредиент')),
+                ('purchase_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.purchaseorder', verbose_name='Заказ поставщику')),
+            ],
+            options={
+                'verbose_name': 'Позиция заказа поставщику',
+                'verbose_name_plural': 'Позиции заказов поставщикам',
+                'unique_together': {('purchase_order', 'ingredient')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['restaurant', 'status'], name='inventory_p_restaur_38193f_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_suppliers_purchase_orders'),
+        ('restaurants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stocktake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted_at', models.DateTimeField(auto_now_add=True, verbose_name='Время пересчета')),
+                ('note', models.CharField(blank=True, max_length=255, verbose_name='Комментарий')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Провел')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocktakes', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Инвентаризация',
+                'verbose_name_plural': 'Инвентаризации',
+                'ordering': ['-counted_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StocktakeLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted', models.BigIntegerField(help_text='В базовых единицах', verbose_name='Фактически')),
+                ('expected', models.BigIntegerField(default=0, help_text='Учетный остаток на момент пересчета', verbose_name='По учету')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.ingredient', verbose_name='Ингредиент')),
+                ('stocktake', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.stocktake', verbose_name='Инвентаризация')),
+            ],
+            options={
+                'verbose_name': 'Позиция инвентаризации',
+                'verbose_name_plural': 'Позиции инвентаризации',
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('RECEIPT', 'Поступление')], max_length=20, verbose_name='Тип')),
+                ('quantity', models.BigIntegerField(help_text='В базовых единицах, расход со знаком минус', verbose_name='Количество')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.ingredient', verbose_name='Ингредиент')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Движение товара',
+                'verbose_name_plural': 'Движения товара',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['restaurant', 'created_at'], name='inventory_s_restaur_6ef921_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stocktake',
+            index=models.Index(fields=['restaurant', 'counted_at'], name='inventory_s_restaur_b67b10_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stocktakeline',
+            unique_together={('stocktake', 'ingredient')},
+        ),
+    ]
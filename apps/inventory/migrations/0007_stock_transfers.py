@@ -0,0 +1,54 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_stocktakes'),
+        ('restaurants', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='kind',
+            field=models.CharField(choices=[('RECEIPT', 'Поступление'), ('TRANSFER_IN', 'Перемещение: приход'), ('TRANSFER_OUT', 'Перемещение: расход')], max_length=20, verbose_name='Тип'),
+        ),
+        migrations.CreateModel(
+            name='StockTransfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('DRAFT', 'Черновик'), ('COMPLETED', 'Проведено')], default='DRAFT', max_length=20, verbose_name='Статус')),
+                ('note', models.CharField(blank=True, max_length=255, verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Проведено')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Создал')),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers_in', to='restaurants.restaurant', verbose_name='Куда')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers_out', to='restaurants.restaurant', verbose_name='Откуда')),
+            ],
+            options={
+                'verbose_name': 'Перемещение',
+                'verbose_name_plural': 'Перемещения',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockTransferLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(help_text='В базовых единицах', verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.ingredient', verbose_name='Ингредиент')),
+                ('transfer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.stocktransfer', verbose_name='Перемещение')),
+            ],
+            options={
+                'verbose_name': 'Позиция перемещения',
+                'verbose_name_plural': 'Позиции перемещения',
+                'unique_together': {('transfer', 'ingredient')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_initial_lots(apps, schema_editor):
+    # Текущие остатки становятся бессрочными партиями
+    StockItem = apps.get_model('inventory', 'StockItem')
+    StockLot = apps.get_model('inventory', 'StockLot')
+    StockLot.objects.bulk_create([
+        StockLot(restaurant_id=restaurant_id, ingredient_id=ingredient_id, quantity=quantity,
+                 received_at=last_updated)
+        for restaurant_id, ingredient_id, quantity, last_updated in StockItem.objects.filter(
+            quantity__gt=0
+        ).values_list('restaurant_id', 'ingredient_id', 'quantity', 'last_updated').iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_stock_transfers'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='shelf_life_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Пусто - не скоропортящийся', null=True, verbose_name='Срок годности, дней'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='kind',
+            field=models.CharField(choices=[('RECEIPT', 'Поступление'), ('TRANSFER_IN', 'Перемещение: приход'), ('TRANSFER_OUT', 'Перемещение: расход'), ('WRITE_OFF', 'Списание просроченного')], max_length=20, verbose_name='Тип'),
+        ),
+        migrations.CreateModel(
+            name='StockLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(help_text='В базовых единицах', verbose_name='Остаток партии')),
+                ('received_at', models.DateTimeField(verbose_name='Поступила')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Годна до')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='inventory.ingredient', verbose_name='Ингредиент')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_lots', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Партия',
+                'verbose_name_plural': 'Партии',
+                'indexes': [models.Index(fields=['restaurant', 'ingredient', 'expires_at'], name='stock_lot_fifo_idx'), models.Index(condition=models.Q(('quantity__gt', 0)), fields=['expires_at', 'restaurant'], name='stock_lot_expiry_idx')],
+            },
+        ),
+        migrations.RunPython(open_initial_lots, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,24 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.conf import settings
 from apps.restaurants.models import Restaurant
 from apps.menu.models import MenuItem
+from . import units
+from .signals import low_stock_detected
+
+
+class Supplier(models.Model):
+    name = models.CharField('Название поставщика', max_length=150, unique=True)
+    phone_number = models.CharField('Телефон', max_length=20, blank=True)
+    email = models.EmailField('Email', blank=True)
+
+    class Meta:
+        verbose_name = 'Поставщик'
+        verbose_name_plural = 'Поставщики'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
 
 
 class Ingredient(models.Model):
@@ -15,6 +33,10 @@ class Ingredient(models.Model):
 
     name = models.CharField('Название ингредиента', max_length=100, unique=True)
     unit = models.CharField('Единица измерения', max_length=20, choices=UNIT_CHOICES, help_text='Единица измерения')
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='ingredients', verbose_name='Поставщик')
+    shelf_life_days = models.PositiveIntegerField('Срок годности, дней', null=True, blank=True,
+                                                  help_text='Пусто - не скоропортящийся')
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -24,28 +46,359 @@ class Ingredient(models.Model):
     def __str__(self):
         return f'{self.name} ({self.unit})'
 
+    def clean(self):
+        # Остатки, партии, движения и рецепты хранятся в базовых единицах
+        # измерения: смена измерения (кг -> шт) молча переосмыслила бы их
+        super().clean()
+        if not self.pk or self.unit not in units.UNIT_FACTORS:
+            return
+        previous = Ingredient.objects.filter(pk=self.pk).values_list('unit', flat=True).first()
+        if previous is None or units.dimension_of(previous) == units.dimension_of(self.unit):
+            return
+        if any(model.objects.filter(ingredient_id=self.pk).exists()
+               for model in (StockItem, StockLot, StockMovement, Recipe)):
+            allowed = ', '.join(units.units_of(units.dimension_of(previous)))
+            raise ValidationError({
+                'unit': f'Ингредиент уже есть на складе или в рецептах: единицу «{previous}» '
+                        f'можно сменить только на единицу того же измерения ({allowed})'
+            })
+
+    @property
+    def dimension(self):
+        """Измерение единицы ингредиента (масса, объем, штуки)"""
+        return units.dimension_of(self.unit)
+
+    def to_base(self, amount):
+        """Количество в единицах ингредиента -> целые базовые единицы"""
+        return units.to_base(amount, self.unit)
+
+    def from_base(self, value):
+        """Целые базовые единицы -> количество в единицах ингредиента"""
+        return units.from_base(value, self.unit)
+
 
 class StockItem(models.Model):
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='stock_items',
                                    verbose_name='Ресторан')
-    quantity = models.DecimalField('Количество', max_digits=10, decimal_places=3, default=0)
+    quantity = models.BigIntegerField('Количество', default=0,
+                                      help_text='В базовых единицах: мг, мл или тысячные доли штуки')
+    reorder_point = models.BigIntegerField('Точка заказа', default=0,
+                                           help_text='Остаток ниже этого уровня считается низким (базовые единицы)')
+    par_level = models.BigIntegerField('Целевой запас', default=0,
+                                       help_text='До какого уровня пополнять склад (базовые единицы)')
+    # Поддерживается при каждом движении товара, см. apps.inventory.services
+    is_low = models.BooleanField('Заканчивается', default=False, editable=False)
     last_updated = models.DateTimeField('Последнее обновление', auto_now=True)
 
     class Meta:
         unique_together = ('ingredient', 'restaurant')
         verbose_name = 'Позиция на складе'
         verbose_name_plural = 'Склад'
+        indexes = [
+            # Частичный индекс: дашборд читает только небольшое множество низких остатков
+            models.Index(fields=['restaurant'], condition=models.Q(is_low=True), name='stock_low_idx'),
+        ]
 
     def __str__(self):
         return f'{self.ingredient.name} на складе {self.restaurant.name}'
 
+    def save(self, *args, **kwargs):
+        was_low = self.is_low
+        self.is_low = self.quantity < self.reorder_point
+        super().save(*args, **kwargs)
+        if self.is_low and not was_low:
+            StockAlert.publish([self])
+
+    @property
+    def below_par(self):
+        return self.quantity < self.par_level
+
+    @property
+    def to_order(self):
+        """Сколько базовых единиц нужно докупить до целевого запаса"""
+        return max(self.par_level - self.quantity, 0)
+
+    @property
+    def reorder_point_amount(self):
+        return self.ingredient.from_base(self.reorder_point)
+
+    @property
+    def par_level_amount(self):
+        return self.ingredient.from_base(self.par_level)
+
+    @property
+    def amount(self):
+        """Остаток в единицах ингредиента"""
+        return self.ingredient.from_base(self.quantity)
+
+    @property
+    def quantity_display(self):
+        return units.format_quantity(self.quantity, self.ingredient.unit)
+
+
+class StockLot(models.Model):
+    """
+    Партия товара на складе.
+
+    Сумма остатков партий совпадает с StockItem.quantity; партии
+    расходуются в порядке срока годности, затем даты поступления.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='stock_lots',
+                                   verbose_name='Ресторан')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='lots',
+                                   verbose_name='Ингредиент')
+    quantity = models.BigIntegerField('Остаток партии', help_text='В базовых единицах')
+    received_at = models.DateTimeField('Поступила')
+    expires_at = models.DateTimeField('Годна до', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Партия'
+        verbose_name_plural = 'Партии'
+        indexes = [
+            models.Index(fields=['restaurant', 'ingredient', 'expires_at'], name='stock_lot_fifo_idx'),
+            models.Index(fields=['expires_at', 'restaurant'], condition=models.Q(quantity__gt=0),
+                         name='stock_lot_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient.name}: {self.quantity_display}'
+
+    @property
+    def quantity_display(self):
+        return units.format_quantity(self.quantity, self.ingredient.unit)
+
+
+class StockMovement(models.Model):
+    """
+    Журнал поступлений и перемещений товара (кроме списаний по заказам,
+    которые восстанавливаются из продаж и рецептов).
+    """
+    class Kind(models.TextChoices):
+        RECEIPT = 'RECEIPT', 'Поступление'
+        TRANSFER_IN = 'TRANSFER_IN', 'Перемещение: приход'
+        TRANSFER_OUT = 'TRANSFER_OUT', 'Перемещение: расход'
+        WRITE_OFF = 'WRITE_OFF', 'Списание просроченного'
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='stock_movements',
+                                   verbose_name='Ресторан')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
+    kind = models.CharField('Тип', max_length=20, choices=Kind.choices)
+    quantity = models.BigIntegerField('Количество', help_text='В базовых единицах, расход со знаком минус')
+    created_at = models.DateTimeField('Время', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Движение товара'
+        verbose_name_plural = 'Движения товара'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['restaurant', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()}: {self.ingredient.name}'
+
+    @property
+    def quantity_display(self):
+        return units.format_quantity(self.quantity, self.ingredient.unit)
+
+
+class Stocktake(models.Model):
+    """Инвентаризация: фактически пересчитанные остатки ресторана"""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='stocktakes',
+                                   verbose_name='Ресторан')
+    counted_at = models.DateTimeField('Время пересчета', auto_now_add=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   verbose_name='Провел')
+    note = models.CharField('Комментарий', max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = 'Инвентаризация'
+        verbose_name_plural = 'Инвентаризации'
+        ordering = ['-counted_at']
+        indexes = [
+            models.Index(fields=['restaurant', 'counted_at']),
+        ]
+
+    def __str__(self):
+        return f'Инвентаризация {self.restaurant.name} от {self.counted_at.strftime("%Y-%m-%d %H:%M")}'
+
+    def get_previous(self):
+        """Предыдущая инвентаризация этого ресторана"""
+        return Stocktake.objects.filter(
+            restaurant_id=self.restaurant_id,
+            counted_at__lt=self.counted_at
+        ).order_by('-counted_at').first()
+
+
+class StocktakeLine(models.Model):
+    stocktake = models.ForeignKey(Stocktake, on_delete=models.CASCADE, related_name='lines',
+                                  verbose_name='Инвентаризация')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
+    counted = models.BigIntegerField('Фактически', help_text='В базовых единицах')
+    expected = models.BigIntegerField('По учету', default=0, help_text='Учетный остаток на момент пересчета')
+
+    class Meta:
+        unique_together = ('stocktake', 'ingredient')
+        verbose_name = 'Позиция инвентаризации'
+        verbose_name_plural = 'Позиции инвентаризации'
+
+    def __str__(self):
+        return f'{self.ingredient.name}: {units.format_quantity(self.counted, self.ingredient.unit)}'
+
+
+class StockTransfer(models.Model):
+    """Перемещение товара между филиалами"""
+    class Status(models.TextChoices):
+        DRAFT = 'DRAFT', 'Черновик'
+        COMPLETED = 'COMPLETED', 'Проведено'
+
+    source = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='transfers_out',
+                               verbose_name='Откуда')
+    destination = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='transfers_in',
+                                    verbose_name='Куда')
+    status = models.CharField('Статус', max_length=20, choices=Status.choices, default=Status.DRAFT)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   verbose_name='Создал')
+    note = models.CharField('Комментарий', max_length=255, blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    completed_at = models.DateTimeField('Проведено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Перемещение'
+        verbose_name_plural = 'Перемещения'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Перемещение #{self.id}: {self.source.name} → {self.destination.name}'
+
+
+class StockTransferLine(models.Model):
+    transfer = models.ForeignKey(StockTransfer, on_delete=models.CASCADE, related_name='lines',
+                                 verbose_name='Перемещение')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
+    quantity = models.BigIntegerField('Количество', help_text='В базовых единицах')
+
+    class Meta:
+        unique_together = ('transfer', 'ingredient')
+        verbose_name = 'Позиция перемещения'
+        verbose_name_plural = 'Позиции перемещения'
+
+    def __str__(self):
+        return f'{self.ingredient.name}: {self.quantity_display}'
+
+    @property
+    def quantity_display(self):
+        return units.format_quantity(self.quantity, self.ingredient.unit)
+
+
+class StockAlert(models.Model):
+    """
+    Журнал пересечений точки заказа.
+
+    Записи только добавляются, поэтому дашборды читают новые оповещения
+    по курсору id (GET inventory:stock_alerts?after=<id>).
+    """
+    stock_item = models.ForeignKey(StockItem, on_delete=models.CASCADE, related_name='alerts',
+                                   verbose_name='Позиция на складе')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='stock_alerts',
+                                   verbose_name='Ресторан')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
+    quantity = models.BigIntegerField('Остаток')
+    reorder_point = models.BigIntegerField('Точка заказа')
+    created_at = models.DateTimeField('Время', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Оповещение о низком остатке'
+        verbose_name_plural = 'Оповещения о низких остатках'
+        ordering = ['-id']
+
+    def __str__(self):
+        return f'{self.ingredient.name} заканчивается в {self.restaurant.name}'
+
+    @property
+    def quantity_display(self):
+        return units.format_quantity(self.quantity, self.ingredient.unit)
+
+    @classmethod
+    def publish(cls, stock_items):
+        """Записать оповещения и разослать low_stock_detected после коммита"""
+        alerts = cls.objects.bulk_create([
+            cls(
+                stock_item_id=item.pk,
+                restaurant_id=item.restaurant_id,
+                ingredient_id=item.ingredient_id,
+                quantity=item.quantity,
+                reorder_point=item.reorder_point
+            )
+            for item in stock_items
+        ])
+        if alerts:
+            transaction.on_commit(lambda: low_stock_detected.send(sender=cls, alerts=alerts))
+        return alerts
+
+
+class PurchaseOrder(models.Model):
+    class Status(models.TextChoices):
+        DRAFT = 'DRAFT', 'Черновик'
+        SENT = 'SENT', 'Отправлен'
+        RECEIVED = 'RECEIVED', 'Получен'
+        CANCELLED = 'CANCELLED', 'Отменен'
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='purchase_orders',
+                                   verbose_name='Ресторан')
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='purchase_orders', verbose_name='Поставщик')
+    status = models.CharField('Статус', max_length=20, choices=Status.choices, default=Status.DRAFT)
+    horizon_days = models.PositiveIntegerField('Горизонт прогноза (дней)', default=7)
+    created_at = models.DateTimeField('Создан', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Заказ поставщику'
+        verbose_name_plural = 'Заказы поставщикам'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['restaurant', 'status']),
+        ]
+
+    def __str__(self):
+        return f'Заказ поставщику №{self.id} ({self.supplier or "без поставщика"})'
+
+
+class PurchaseOrderLine(models.Model):
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='lines',
+                                       verbose_name='Заказ поставщику')
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
+    quantity = models.BigIntegerField('Заказать', help_text='В базовых единицах')
+    forecast = models.BigIntegerField('Прогноз расхода', default=0, help_text='В базовых единицах')
+    on_hand = models.BigIntegerField('Остаток на момент прогноза', default=0, help_text='В базовых единицах')
+
+    class Meta:
+        unique_together = ('purchase_order', 'ingredient')
+        verbose_name = 'Позиция заказа поставщику'
+        verbose_name_plural = 'Позиции заказов поставщикам'
+
+    def __str__(self):
+        return f'{self.ingredient.name}: {self.quantity_display}'
+
+    @property
+    def quantity_display(self):
+        return units.format_quantity(self.quantity, self.ingredient.unit)
+
+    @property
+    def forecast_display(self):
+        return units.format_quantity(self.forecast, self.ingredient.unit)
+
+    @property
+    def on_hand_display(self):
+        return units.format_quantity(self.on_hand, self.ingredient.unit)
+
 
 class Recipe(models.Model):
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='recipe_items', verbose_name='Блюдо')
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
-    quantity = models.DecimalField('Количество', max_digits=10, decimal_places=3,
-                                   help_text='Сколько единиц ингредиента нужно на одну порцию')
+    quantity = models.BigIntegerField('Количество',
+                                      help_text='Сколько базовых единиц ингредиента нужно на одну порцию')
 
     class Meta:
         unique_together = ('menu_item', 'ingredient')
@@ -53,4 +406,13 @@ class Recipe(models.Model):
         verbose_name_plural = 'Рецепты'
 
     def __str__(self):
-        return f'{self.quantity} {self.ingredient.unit} для "{self.menu_item.name}"'
\ No newline at end of file
+        return f'{self.quantity_display} для "{self.menu_item.name}"'
+
+    @property
+    def amount(self):
+        """Количество на порцию в единицах ингредиента"""
+        return self.ingredient.from_base(self.quantity)
+
+    @property
+    def quantity_display(self):
+        return units.format_quantity(self.quantity, self.ingredient.unit)
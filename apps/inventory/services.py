@@ -0,0 +1,271 @@
+# apps/inventory/services.py
+"""
+Операции движения товара на складе.
+
+Все количества - целые базовые единицы (см. apps.inventory.units), поэтому
+списания выполняются одним UPDATE с целочисленной арифметикой в SQL, без
+загрузки и сохранения каждой позиции по отдельности.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When, BigIntegerField
+from django.db.models.functions import Greatest
+from django.db.models.lookups import LessThan
+from django.utils import timezone
+
+from .models import Ingredient, Recipe, StockItem, StockAlert, StockLot, StockMovement, StocktakeLine
+from .lots import add_lots, consume_lots, reconcile_lots
+from . import units
+
+
+def low_flag(new_quantity):
+    """
+    Значение is_low для UPDATE, где остаток меняется на new_quantity.
+
+    В SET все выражения видят старые значения строки, поэтому флаг
+    вычисляется от того же выражения, что и новый остаток.
+    """
+    return Case(
+        When(LessThan(new_quantity, F('reorder_point')), then=Value(True)),
+        default=Value(False)
+    )
+
+
+def recipe_requirements(order_items):
+    """
+    Потребность в ингредиентах для набора позиций заказа.
+
+    Возвращает {ingredient_id: базовые единицы}, посчитанный одним
+    сгруппированным запросом: рецепт × количество порций.
+    """
+    rows = Recipe.objects.filter(
+        menu_item__orderitem__in=order_items
+    ).values('ingredient_id').annotate(
+        needed=Sum(F('quantity') * F('menu_item__orderitem__quantity'))
+    )
+    return {row['ingredient_id']: row['needed'] for row in rows if row['needed']}
+
+
+def deduct_stock(restaurant_id, requirements):
+    """
+    Списание ингредиентов со склада ресторана.
+
+    requirements - {ingredient_id: базовые единицы}. Остаток не уходит в минус:
+    если товара не хватает, списывается все, что есть, а в ответ попадает
+    предупреждение. Позиции, впервые опустившиеся ниже точки заказа,
+    публикуются как StockAlert. Партии расходуются по FIFO (см. lots).
+    Возвращает список предупреждений.
+    """
+    if not requirements:
+        return []
+
+    with transaction.atomic():
+        # Просроченные партии не расходуются (consume_lots берет только
+        # годные), поэтому сначала списываются - иначе StockItem уменьшился
+        # бы на всю потребность, а партии только на годную часть
+        write_off_expired(restaurant_id, ingredient_ids=requirements)
+        warnings = _decrement_stock(restaurant_id, requirements)
+        consume_lots(restaurant_id, requirements)
+    return warnings
+
+
+def _decrement_stock(restaurant_id, requirements):
+    """Уменьшение остатков StockItem без расхода партий"""
+    warnings = []
+    with transaction.atomic():
+        stock = {
+            item.ingredient_id: item
+            for item in StockItem.objects.select_for_update().select_related('ingredient').filter(
+                restaurant_id=restaurant_id,
+                ingredient_id__in=requirements
+            )
+        }
+
+        missing = [ingredient_id for ingredient_id in requirements if ingredient_id not in stock]
+        for ingredient in Ingredient.objects.filter(id__in=missing).order_by('name'):
+            warnings.append(f"Ингредиент {ingredient.name} отсутствует на складе")
+
+        crossed = []
+        for ingredient_id, item in stock.items():
+            needed = requirements[ingredient_id]
+            new_quantity = max(item.quantity - needed, 0)
+            if not item.is_low and new_quantity < item.reorder_point:
+                crossed.append(item)
+            if item.quantity < needed:
+                unit = item.ingredient.unit
+                warnings.append(
+                    f"Недостаточно {item.ingredient.name}: "
+                    f"нужно {units.format_quantity(needed, unit)}, "
+                    f"доступно {units.format_quantity(item.quantity, unit)}"
+                )
+
+        if stock:
+            decrement = Case(
+                *[When(ingredient_id=ingredient_id, then=Value(requirements[ingredient_id]))
+                  for ingredient_id in stock],
+                default=Value(0),
+                output_field=BigIntegerField()
+            )
+            new_quantity = Greatest(F('quantity') - decrement, Value(0))
+            StockItem.objects.filter(
+                restaurant_id=restaurant_id,
+                ingredient_id__in=list(stock)
+            ).update(
+                quantity=new_quantity,
+                is_low=low_flag(new_quantity),
+                last_updated=timezone.now()
+            )
+
+        for item in crossed:
+            item.quantity = max(item.quantity - requirements[item.ingredient_id], 0)
+        StockAlert.publish(crossed)
+
+    return warnings
+
+
+def receive_stock(restaurant_id, increments, kind=StockMovement.Kind.RECEIPT, lots=None):
+    """
+    Поступление товара на склад ресторана.
+
+    increments - {ingredient_id: базовые единицы}. Недостающие позиции
+    создаются одним bulk INSERT (конфликты игнорируются), затем все остатки
+    увеличиваются одним UPDATE с F-выражением, поэтому параллельные
+    поступления не теряют друг друга. Поступление пишется в StockMovement
+    и заводится партиями (lots - см. lots.add_lots).
+    """
+    increments = {ingredient_id: amount for ingredient_id, amount in increments.items() if amount}
+    if not increments:
+        return 0
+
+    with transaction.atomic():
+        StockItem.objects.bulk_create(
+            [StockItem(restaurant_id=restaurant_id, ingredient_id=ingredient_id, quantity=0)
+             for ingredient_id in increments],
+            ignore_conflicts=True
+        )
+        increment = Case(
+            *[When(ingredient_id=ingredient_id, then=Value(amount))
+              for ingredient_id, amount in increments.items()],
+            default=Value(0),
+            output_field=BigIntegerField()
+        )
+        new_quantity = F('quantity') + increment
+        updated = StockItem.objects.filter(
+            restaurant_id=restaurant_id,
+            ingredient_id__in=list(increments)
+        ).update(
+            quantity=new_quantity,
+            is_low=low_flag(new_quantity),
+            last_updated=timezone.now()
+        )
+        StockMovement.objects.bulk_create([
+            StockMovement(restaurant_id=restaurant_id, ingredient_id=ingredient_id, kind=kind, quantity=amount)
+            for ingredient_id, amount in increments.items()
+        ])
+        add_lots(restaurant_id, increments, lots)
+        return updated
+
+
+def apply_stocktake(stocktake, counts):
+    """
+    Запись результатов инвентаризации.
+
+    counts - {ingredient_id: пересчитанные базовые единицы}. Строки
+    инвентаризации (вместе с учетным остатком) сохраняются одним bulk INSERT,
+    учетные остатки приводятся к факту одним UPDATE, партии - к новым остаткам.
+    """
+    with transaction.atomic():
+        stock = {
+            item.ingredient_id: item
+            for item in StockItem.objects.select_for_update().filter(
+                restaurant_id=stocktake.restaurant_id,
+                ingredient_id__in=counts
+            ).only('id', 'restaurant_id', 'ingredient_id', 'quantity', 'reorder_point', 'is_low')
+        }
+        expected = {ingredient_id: item.quantity for ingredient_id, item in stock.items()}
+
+        StocktakeLine.objects.bulk_create([
+            StocktakeLine(
+                stocktake=stocktake,
+                ingredient_id=ingredient_id,
+                counted=counted,
+                expected=expected.get(ingredient_id, 0)
+            )
+            for ingredient_id, counted in counts.items()
+        ])
+
+        missing = [ingredient_id for ingredient_id in counts if ingredient_id not in expected]
+        StockItem.objects.bulk_create([
+            StockItem(restaurant_id=stocktake.restaurant_id, ingredient_id=ingredient_id, quantity=0)
+            for ingredient_id in missing
+        ], ignore_conflicts=True)
+
+        new_quantity = Case(
+            *[When(ingredient_id=ingredient_id, then=Value(counted))
+              for ingredient_id, counted in counts.items()],
+            output_field=BigIntegerField()
+        )
+        StockItem.objects.filter(
+            restaurant_id=stocktake.restaurant_id,
+            ingredient_id__in=list(counts)
+        ).update(
+            quantity=new_quantity,
+            is_low=low_flag(new_quantity),
+            last_updated=timezone.now()
+        )
+
+        crossed = []
+        for ingredient_id, item in stock.items():
+            item.quantity = counts[ingredient_id]
+            if not item.is_low and item.quantity < item.reorder_point:
+                crossed.append(item)
+        StockAlert.publish(crossed)
+
+        reconcile_lots(stocktake.restaurant_id, {
+            ingredient_id: counted - expected.get(ingredient_id, 0)
+            for ingredient_id, counted in counts.items()
+        })
+
+
+def write_off_expired(restaurant_id=None, now=None, ingredient_ids=None):
+    """
+    Списание просроченных партий (всех или только ingredient_ids).
+
+    Остатки партий обнуляются, StockItem уменьшается на их сумму, списание
+    пишется в StockMovement. Возвращает число списанных партий.
+    """
+    now = now or timezone.now()
+    expired = StockLot.objects.filter(quantity__gt=0, expires_at__lte=now)
+    if restaurant_id:
+        expired = expired.filter(restaurant_id=restaurant_id)
+    if ingredient_ids is not None:
+        expired = expired.filter(ingredient_id__in=list(ingredient_ids))
+
+    with transaction.atomic():
+        pairs = set(expired.values_list('restaurant_id', 'ingredient_id'))
+        if not pairs:
+            return 0
+        # Сначала строки StockItem, затем партии - в том же порядке, что и
+        # deduct_stock, иначе встречные транзакции взаимоблокируются
+        list(StockItem.objects.select_for_update().filter(
+            Q(*[Q(restaurant_id=r, ingredient_id=i) for r, i in pairs], _connector=Q.OR)
+        ).order_by('id').values_list('id', flat=True))
+        lots = list(expired.select_for_update().values_list('id', 'restaurant_id', 'ingredient_id', 'quantity'))
+        if not lots:
+            return 0
+
+        totals = defaultdict(lambda: defaultdict(int))
+        for _, lot_restaurant_id, ingredient_id, quantity in lots:
+            totals[lot_restaurant_id][ingredient_id] += quantity
+
+        StockLot.objects.filter(id__in=[lot[0] for lot in lots]).update(quantity=0)
+        for lot_restaurant_id, amounts in totals.items():
+            _decrement_stock(lot_restaurant_id, amounts)
+        StockMovement.objects.bulk_create([
+            StockMovement(restaurant_id=lot_restaurant_id, ingredient_id=ingredient_id,
+                          kind=StockMovement.Kind.WRITE_OFF, quantity=-amount)
+            for lot_restaurant_id, amounts in totals.items()
+            for ingredient_id, amount in amounts.items()
+        ])
+    return len(lots)
@@ -0,0 +1,6 @@
+# apps/inventory/signals.py
+from django.dispatch import Signal
+
+# Позиции склада пересекли точку заказа сверху вниз.
+# Аргументы: alerts - список созданных StockAlert (после коммита транзакции)
+low_stock_detected = Signal()
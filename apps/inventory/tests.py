@@ -1,3 +1,44 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.restaurants.models import Restaurant
+from .models import Ingredient, StockAlert, StockItem, StockLot, StockTransfer, StockTransferLine
+from .transfers import apply_transfer
+
+
+class TransferAlertTests(TestCase):
+    """Перемещение публикует одно оповещение на одно пересечение точки заказа"""
+
+    def setUp(self):
+        self.source = Restaurant.objects.create(name='Отправитель', address='Адрес', phone_number='1')
+        self.destination = Restaurant.objects.create(name='Получатель', address='Адрес', phone_number='2')
+        self.ingredient = Ingredient.objects.create(name='Молоко', unit='л')
+        self.item = StockItem.objects.create(restaurant=self.source, ingredient=self.ingredient,
+                                             quantity=15000, reorder_point=12000)
+        now = timezone.now()
+        StockLot.objects.create(restaurant=self.source, ingredient=self.ingredient, quantity=10000,
+                                received_at=now - timedelta(days=1), expires_at=now + timedelta(days=5))
+
+    def transfer(self, quantity):
+        transfer = StockTransfer.objects.create(source=self.source, destination=self.destination)
+        StockTransferLine.objects.create(transfer=transfer, ingredient=self.ingredient, quantity=quantity)
+        return apply_transfer(transfer)
+
+    def test_crossing_on_transfer(self):
+        StockLot.objects.create(restaurant=self.source, ingredient=self.ingredient, quantity=5000,
+                                received_at=timezone.now())
+        self.transfer(5000)
+        self.assertEqual(StockAlert.objects.filter(stock_item=self.item).count(), 1)
+
+    def test_crossing_on_expired_write_off(self):
+        now = timezone.now()
+        StockLot.objects.create(restaurant=self.source, ingredient=self.ingredient, quantity=5000,
+                                received_at=now - timedelta(days=3), expires_at=now - timedelta(hours=1))
+        self.transfer(2000)
 
-# Create your tests here.
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 8000)
+        self.assertTrue(self.item.is_low)
+        self.assertEqual(StockAlert.objects.filter(stock_item=self.item).count(), 1)
@@ -0,0 +1,200 @@
+# apps/inventory/transfers.py
+"""
+Перемещения товара между филиалами.
+
+Перемещение проводится одной транзакцией: строки склада обоих филиалов
+блокируются в порядке id (встречные перемещения A→B и B→A берут блокировки
+в одинаковом порядке и не взаимоблокируются), наличие у отправителя
+проверяется по заблокированным строкам, затем остатки меняются двумя
+UPDATE - расход у отправителя и приход у получателя.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When, BigIntegerField
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.restaurants.models import Restaurant
+from .models import Ingredient, StockItem, StockAlert, StockMovement, StockTransfer
+from .lots import consume_lots
+from .services import low_flag, receive_stock, write_off_expired
+from . import units
+
+
+class TransferError(ValueError):
+    """Перемещение нельзя провести"""
+
+    def __init__(self, message, shortages=()):
+        super().__init__(message)
+        self.shortages = list(shortages)
+
+
+def apply_transfer(transfer):
+    """
+    Проведение черновика перемещения.
+
+    Если у отправителя не хватает хотя бы одной позиции, не меняется ничего
+    и выбрасывается TransferError со списком нехваток в shortages.
+    """
+    source_id, destination_id = transfer.source_id, transfer.destination_id
+    if source_id == destination_id:
+        raise TransferError('Филиал-отправитель и филиал-получатель совпадают')
+
+    with transaction.atomic():
+        locked = StockTransfer.objects.select_for_update().get(pk=transfer.pk)
+        if locked.status != StockTransfer.Status.DRAFT:
+            raise TransferError('Перемещение уже проведено')
+
+        lines = dict(transfer.lines.values_list('ingredient_id', 'quantity'))
+        if not lines:
+            raise TransferError('В перемещении нет позиций')
+
+        StockItem.objects.bulk_create(
+            [StockItem(restaurant_id=destination_id, ingredient_id=ingredient_id, quantity=0)
+             for ingredient_id in lines],
+            ignore_conflicts=True
+        )
+        stock = StockItem.objects.select_for_update().filter(
+            restaurant_id__in=[source_id, destination_id],
+            ingredient_id__in=list(lines)
+        ).order_by('id')
+        available = {
+            item.ingredient_id: item
+            for item in stock if item.restaurant_id == source_id
+        }
+
+        # Просроченные партии отправителя не перемещаются: они списываются
+        # до проверки наличия (под уже взятыми блокировками), иначе
+        # непокрытая годными партиями часть пришла бы получателю бессрочной
+        if write_off_expired(source_id, ingredient_ids=lines):
+            # is_low тоже перечитывается: за пересечение точки заказа при
+            # списании алерт уже опубликован
+            current = {
+                ingredient_id: (quantity, is_low)
+                for ingredient_id, quantity, is_low in StockItem.objects.filter(
+                    restaurant_id=source_id, ingredient_id__in=list(available)
+                ).values_list('ingredient_id', 'quantity', 'is_low')
+            }
+            for ingredient_id, item in available.items():
+                item.quantity, item.is_low = current[ingredient_id]
+
+        shortages = []
+        names = Ingredient.objects.in_bulk(list(lines))
+        for ingredient_id, quantity in lines.items():
+            item = available.get(ingredient_id)
+            on_hand = item.quantity if item else 0
+            if on_hand < quantity:
+                ingredient = names[ingredient_id]
+                shortages.append(
+                    f"{ingredient.name}: нужно {units.format_quantity(quantity, ingredient.unit)}, "
+                    f"доступно {units.format_quantity(on_hand, ingredient.unit)}"
+                )
+        if shortages:
+            raise TransferError('Недостаточно товара у отправителя', shortages)
+
+        decrement = Case(
+            *[When(ingredient_id=ingredient_id, then=Value(quantity))
+              for ingredient_id, quantity in lines.items()],
+            default=Value(0),
+            output_field=BigIntegerField()
+        )
+        new_quantity = Greatest(F('quantity') - decrement, Value(0))
+        StockItem.objects.filter(
+            restaurant_id=source_id,
+            ingredient_id__in=list(lines)
+        ).update(
+            quantity=new_quantity,
+            is_low=low_flag(new_quantity),
+            last_updated=timezone.now()
+        )
+        StockMovement.objects.bulk_create([
+            StockMovement(restaurant_id=source_id, ingredient_id=ingredient_id,
+                          kind=StockMovement.Kind.TRANSFER_OUT, quantity=-quantity)
+            for ingredient_id, quantity in lines.items()
+        ])
+
+        # Партии получателя сохраняют сроки годности партий отправителя
+        carried = consume_lots(source_id, lines)
+        untracked = dict(lines)
+        for ingredient_id, quantity, _ in carried:
+            untracked[ingredient_id] -= quantity
+        carried += [(ingredient_id, quantity, None) for ingredient_id, quantity in untracked.items() if quantity > 0]
+        receive_stock(destination_id, lines, kind=StockMovement.Kind.TRANSFER_IN, lots=carried)
+
+        crossed = []
+        for ingredient_id, item in available.items():
+            item.quantity -= lines[ingredient_id]
+            if not item.is_low and item.quantity < item.reorder_point:
+                crossed.append(item)
+        StockAlert.publish(crossed)
+
+        StockTransfer.objects.filter(pk=transfer.pk).update(
+            status=StockTransfer.Status.COMPLETED,
+            completed_at=timezone.now()
+        )
+    transfer.refresh_from_db(fields=['status', 'completed_at'])
+    return transfer
+
+
+def rebalance_suggestions():
+    """
+    Предложения перемещений по всем филиалам сразу.
+
+    Нехватка - позиции ниже точки заказа (частичный индекс по is_low),
+    сколько нужно до целевого запаса. Излишек - остаток сверх целевого
+    запаса (или точки заказа, если запас не задан) в других филиалах.
+    Для каждого ингредиента крупнейшие излишки жадно покрывают
+    крупнейшие нехватки. Возвращает список словарей:
+        ingredient, source, destination, quantity (базовые единицы), amount
+        (в единице ингредиента), quantity_display
+    """
+    target = Greatest(F('par_level'), F('reorder_point'))
+
+    deficits = defaultdict(list)
+    for restaurant_id, ingredient_id, need in StockItem.objects.filter(is_low=True).annotate(
+        need=target - F('quantity')
+    ).values_list('restaurant_id', 'ingredient_id', 'need').order_by('-need'):
+        deficits[ingredient_id].append([restaurant_id, need])
+    if not deficits:
+        return []
+
+    surpluses = defaultdict(list)
+    for restaurant_id, ingredient_id, spare in StockItem.objects.filter(
+        ingredient_id__in=list(deficits)
+    ).annotate(target=target).filter(
+        target__gt=0, quantity__gt=F('target')
+    ).annotate(
+        spare=F('quantity') - F('target')
+    ).values_list('restaurant_id', 'ingredient_id', 'spare').order_by('-spare'):
+        surpluses[ingredient_id].append([restaurant_id, spare])
+
+    moves = []
+    for ingredient_id, needs in deficits.items():
+        spares = surpluses.get(ingredient_id, [])
+        for destination in needs:
+            for source in spares:
+                if destination[1] <= 0:
+                    break
+                quantity = min(source[1], destination[1])
+                if quantity <= 0:
+                    continue
+                moves.append((ingredient_id, source[0], destination[0], quantity))
+                source[1] -= quantity
+                destination[1] -= quantity
+
+    ingredients = Ingredient.objects.in_bulk({move[0] for move in moves})
+    restaurants = Restaurant.objects.in_bulk({r for move in moves for r in move[1:3]})
+    suggestions = [
+        {
+            'ingredient': ingredients[ingredient_id],
+            'source': restaurants[source_id],
+            'destination': restaurants[destination_id],
+            'quantity': quantity,
+            'amount': units.from_base(quantity, ingredients[ingredient_id].unit),
+            'quantity_display': units.format_quantity(quantity, ingredients[ingredient_id].unit),
+        }
+        for ingredient_id, source_id, destination_id, quantity in moves
+    ]
+    suggestions.sort(key=lambda s: (s['ingredient'].name, s['destination'].name))
+    return suggestions
@@ -0,0 +1,106 @@
+# apps/inventory/units.py
+"""
+Единицы измерения склада.
+
+Количества на складе и в рецептах хранятся целыми числами в базовых
+единицах своего измерения: миллиграммы для массы, миллилитры для объема,
+тысячные доли штуки/упаковки для штучных товаров (чтобы в рецепте можно
+было указать, например, пол-лимона). Благодаря этому суммы, сравнения и
+списания выполняются целочисленной арифметикой прямо в SQL, а итоги по
+разным единицам одного измерения (кг + г) становятся осмысленными.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Q, Sum
+
+MASS = 'mass'
+VOLUME = 'volume'
+COUNT = 'count'
+PACK = 'pack'
+
+DIMENSION_LABELS = {
+    MASS: 'Масса',
+    VOLUME: 'Объем',
+    COUNT: 'Штучные',
+    PACK: 'Упаковки',
+}
+
+# Единица, в которой показываются итоги по измерению
+DIMENSION_DISPLAY_UNITS = {
+    MASS: 'кг',
+    VOLUME: 'л',
+    COUNT: 'шт',
+    PACK: 'уп',
+}
+
+# Единица -> (измерение, сколько базовых единиц в одной единице)
+UNIT_FACTORS = {
+    'кг': (MASS, 1_000_000),
+    'г': (MASS, 1_000),
+    'л': (VOLUME, 1_000),
+    'мл': (VOLUME, 1),
+    'шт': (COUNT, 1_000),
+    'уп': (PACK, 1_000),
+}
+
+# Наибольшее количество в базовых единицах (диапазон BigIntegerField)
+MAX_QUANTITY = 2 ** 63 - 1
+
+
+def dimension_of(unit):
+    """Измерение, к которому относится единица"""
+    return UNIT_FACTORS[unit][0]
+
+
+def factor_of(unit):
+    """Сколько базовых единиц содержится в одной единице"""
+    return UNIT_FACTORS[unit][1]
+
+
+def units_of(dimension):
+    """Все единицы заданного измерения"""
+    return [unit for unit, (dim, _) in UNIT_FACTORS.items() if dim == dimension]
+
+
+def to_base(amount, unit):
+    """Перевод количества из единицы ингредиента в целые базовые единицы"""
+    value = Decimal(str(amount)) * factor_of(unit)
+    return int(value.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_base(value, unit):
+    """Перевод целых базовых единиц в Decimal в единице ингредиента"""
+    amount = Decimal(value or 0) / factor_of(unit)
+    if amount == amount.to_integral_value():
+        return amount.quantize(Decimal('1'))
+    return amount.normalize()
+
+
+def format_quantity(value, unit):
+    """Человекочитаемое количество, например «1.5 кг»"""
+    return f'{from_base(value, unit)} {unit}'
+
+
+def dimension_aggregates(field='quantity', unit_field='ingredient__unit'):
+    """Аргументы для aggregate(): сумма базовых единиц по каждому измерению"""
+    return {
+        dimension: Sum(field, filter=Q(**{f'{unit_field}__in': units_of(dimension)}))
+        for dimension in DIMENSION_LABELS
+    }
+
+
+def dimension_totals(aggregated):
+    """Оформление результата dimension_aggregates() для шаблонов"""
+    totals = []
+    for dimension, label in DIMENSION_LABELS.items():
+        value = aggregated.get(dimension)
+        if not value:
+            continue
+        unit = DIMENSION_DISPLAY_UNITS[dimension]
+        totals.append({
+            'dimension': dimension,
+            'label': label,
+            'value': value,
+            'display': format_quantity(value, unit),
+        })
+    return totals
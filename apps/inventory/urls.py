@@ -15,6 +15,22 @@ urlpatterns = [
     path('stock/', views.StockListView.as_view(), name='stock'),
     path('stock/<int:pk>/update/', views.StockUpdateView.as_view(), name='stock_update'),
     path('stock/add/', views.AddStockItemView.as_view(), name='add_stock_item'),
+    path('stock/intake/', views.DeliveryIntakeView.as_view(), name='delivery_intake'),
+    path('stock/alerts/', views.StockAlertsView.as_view(), name='stock_alerts'),
+    path('stock/expiring/', views.ExpiringStockView.as_view(), name='expiring_stock'),
+
+    # Инвентаризация
+    path('stocktakes/', views.StocktakeListView.as_view(), name='stocktakes'),
+    path('stocktakes/create/', views.StocktakeCreateView.as_view(), name='stocktake_create'),
+    path('stocktakes/variance/', views.VarianceReportView.as_view(), name='variance_report'),
+    path('stocktakes/<int:pk>/variance/', views.VarianceReportView.as_view(), name='stocktake_variance'),
+
+    # Перемещения
+    path('transfers/', views.StockTransferListView.as_view(), name='transfers'),
+    path('transfers/create/', views.StockTransferCreateView.as_view(), name='transfer_create'),
+
+    # Закупки
+    path('purchase-orders/', views.PurchaseOrderListView.as_view(), name='purchase_orders'),
 
     # Рецепты
     path('recipes/', views.RecipeManagementView.as_view(), name='recipes'),
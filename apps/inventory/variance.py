@@ -0,0 +1,150 @@
+# apps/inventory/variance.py
+"""
+Сравнение теоретического и фактического расхода.
+
+Фактический расход за период между двумя инвентаризациями ресторана:
+    остаток на начало + поступления - остаток на конец.
+Теоретический расход: проданные блюда × рецепт за тот же период.
+Разница показывает потери, списания мимо учета и ошибки рецептов.
+
+Для любого числа ресторанов отчет строится фиксированным числом
+сгруппированных запросов, без обхода заказов в Python.
+"""
+from collections import defaultdict
+
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+
+from apps.orders.models import Order
+from .models import Ingredient, Recipe, StockMovement, Stocktake, StocktakeLine
+from . import units
+
+CONSUMING_STATUSES = [Order.Status.IN_PROGRESS, Order.Status.COMPLETED]
+
+
+def theoretical_usage(periods):
+    """
+    Расход по рецептам за периоды.
+
+    periods - {restaurant_id: (начало, конец)}; возвращает
+    {(restaurant_id, ingredient_id): базовые единицы}.
+    """
+    condition = Q()
+    for restaurant_id, (start, end) in periods.items():
+        condition |= Q(
+            menu_item__orderitem__order__restaurant_id=restaurant_id,
+            menu_item__orderitem__order__created_at__gte=start,
+            menu_item__orderitem__order__created_at__lt=end
+        )
+    if not condition:
+        return {}
+
+    rows = Recipe.objects.filter(
+        condition,
+        menu_item__orderitem__order__status__in=CONSUMING_STATUSES
+    ).values(
+        'menu_item__orderitem__order__restaurant_id', 'ingredient_id'
+    ).annotate(
+        used=Sum(F('quantity') * F('menu_item__orderitem__quantity'))
+    ).order_by()
+
+    return {
+        (row['menu_item__orderitem__order__restaurant_id'], row['ingredient_id']): row['used']
+        for row in rows
+    }
+
+
+def inflows(periods):
+    """Поступления и перемещения за периоды: {(restaurant_id, ingredient_id): базовые единицы}"""
+    condition = Q()
+    for restaurant_id, (start, end) in periods.items():
+        condition |= Q(restaurant_id=restaurant_id, created_at__gte=start, created_at__lt=end)
+    if not condition:
+        return {}
+
+    # Списание просроченного не вычитается: это потери, и они должны попасть в отклонение
+    rows = StockMovement.objects.filter(condition).exclude(kind=StockMovement.Kind.WRITE_OFF).values(
+        'restaurant_id', 'ingredient_id'
+    ).annotate(total=Sum('quantity')).order_by()
+    return {(row['restaurant_id'], row['ingredient_id']): row['total'] for row in rows}
+
+
+def variance_report(stocktakes):
+    """
+    Отчет по отклонениям для набора закрывающих инвентаризаций.
+
+    Для каждой инвентаризации период начинается с предыдущей инвентаризации
+    того же ресторана. Возвращает список словарей:
+        stocktake, previous, rows - строки по ингредиентам, отсортированные
+        по абсолютному отклонению, uncounted - ингредиенты, не пересчитанные
+        в предыдущей инвентаризации (отклонение по ним не считается).
+    """
+    closing = list(
+        Stocktake.objects.filter(id__in=[s.id for s in stocktakes]).select_related('restaurant').annotate(
+            previous_id=Subquery(
+                Stocktake.objects.filter(
+                    restaurant_id=OuterRef('restaurant_id'),
+                    counted_at__lt=OuterRef('counted_at')
+                ).order_by('-counted_at').values('id')[:1]
+            )
+        ).order_by('restaurant__name')
+    )
+    previous = Stocktake.objects.in_bulk([s.previous_id for s in closing if s.previous_id])
+
+    periods = {
+        s.restaurant_id: (previous[s.previous_id].counted_at, s.counted_at)
+        for s in closing if s.previous_id
+    }
+    used = theoretical_usage(periods)
+    received = inflows(periods)
+
+    counts = defaultdict(dict)
+    for stocktake_id, ingredient_id, counted in StocktakeLine.objects.filter(
+        stocktake_id__in=[s.id for s in closing] + list(previous)
+    ).values_list('stocktake_id', 'ingredient_id', 'counted'):
+        counts[stocktake_id][ingredient_id] = counted
+
+    ingredients = Ingredient.objects.in_bulk(
+        {ingredient_id for lines in counts.values() for ingredient_id in lines}
+    )
+
+    report = []
+    for stocktake in closing:
+        opening_stocktake = previous.get(stocktake.previous_id)
+        rows = []
+        uncounted = []
+        if opening_stocktake:
+            restaurant_id = stocktake.restaurant_id
+            opening_counts = counts[opening_stocktake.id]
+            for ingredient_id, closing_count in counts[stocktake.id].items():
+                # Инвентаризация может быть частичной: без пересчета на
+                # начало фактический расход неизвестен, а не равен поступлениям
+                if ingredient_id not in opening_counts:
+                    uncounted.append(ingredients[ingredient_id])
+                    continue
+                opening_count = opening_counts[ingredient_id]
+                inflow = received.get((restaurant_id, ingredient_id), 0)
+                actual = opening_count + inflow - closing_count
+                theoretical = used.get((restaurant_id, ingredient_id), 0)
+                variance = actual - theoretical
+                ingredient = ingredients[ingredient_id]
+                unit = ingredient.unit
+                rows.append({
+                    'ingredient': ingredient,
+                    'opening': units.format_quantity(opening_count, unit),
+                    'inflow': units.format_quantity(inflow, unit),
+                    'closing': units.format_quantity(closing_count, unit),
+                    'actual': units.format_quantity(actual, unit),
+                    'theoretical': units.format_quantity(theoretical, unit),
+                    'variance': variance,
+                    'variance_display': units.format_quantity(variance, unit),
+                    'variance_percent': round(variance / theoretical * 100, 1) if theoretical else None,
+                })
+            rows.sort(key=lambda row: abs(row['variance']), reverse=True)
+
+        report.append({
+            'stocktake': stocktake,
+            'previous': opening_stocktake,
+            'rows': rows,
+            'uncounted': sorted(uncounted, key=lambda ingredient: ingredient.name),
+        })
+    return report
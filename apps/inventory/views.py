@@ -1,13 +1,24 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, DetailView, CreateView, UpdateView
+from django.db import transaction
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, FormView, TemplateView
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.db.models import Q, Sum
+from django.db.models import Q, Max
 from django.http import JsonResponse
 from django.views import View
-from .models import Ingredient, StockItem, Recipe
-from .forms import StockItemForm, QuickIngredientForm, RecipeForm
+from django.utils import timezone
+from .models import Ingredient, StockItem, StockAlert, PurchaseOrder, Stocktake, StockTransfer, Recipe
+from .forms import (
+    StockItemForm, StockQuantityForm, QuickIngredientForm, RecipeForm, DeliveryIntakeForm, StocktakeForm,
+    StockTransferForm, StockTransferLineFormSet
+)
+from .intake import import_invoice, InvoiceFormatError
+from .services import receive_stock, apply_stocktake, write_off_expired
+from .lots import expiring_lots, reconcile_lots
+from .variance import variance_report
+from .transfers import apply_transfer, rebalance_suggestions, TransferError
+from . import units
 from apps.restaurants.models import Restaurant
 from apps.menu.models import MenuItem
 
@@ -25,9 +36,14 @@ class InventoryDashboardView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         context['total_ingredients'] = Ingredient.objects.count()
         context['restaurants'] = Restaurant.objects.all()
-        context['low_stock_items'] = StockItem.objects.filter(quantity__lt=10).select_related('ingredient',
-                                                                                              'restaurant')
-        context['total_stock_value'] = StockItem.objects.aggregate(total=Sum('quantity'))['total'] or 0
+        # Флаг is_low поддерживается при движении товара и покрыт частичным индексом
+        context['low_stock_items'] = StockItem.objects.filter(is_low=True).select_related('ingredient',
+                                                                                          'restaurant')
+        context['recent_alerts'] = StockAlert.objects.select_related('ingredient', 'restaurant')[:5]
+        # Итоги считаются отдельно по каждому измерению: кг и г складываются, кг и л - нет
+        context['stock_totals'] = units.dimension_totals(
+            StockItem.objects.aggregate(**units.dimension_aggregates())
+        )
         return context
 
 
@@ -41,26 +57,61 @@ class AddStockItemView(LoginRequiredMixin, CreateView):
         return reverse_lazy('inventory:dashboard')
 
     def form_valid(self, form):
-        # Проверяем, есть ли уже такой товар на складе этого ресторана
-        existing_item = StockItem.objects.filter(
-            ingredient=form.cleaned_data['ingredient'],
-            restaurant=form.cleaned_data['restaurant']
-        ).first()
-
-        if existing_item:
-            # Если есть, увеличиваем количество
-            existing_item.quantity += form.cleaned_data['quantity']
-            existing_item.save()
+        # Повторное поступление того же товара увеличивает остаток
+        ingredient = form.cleaned_data['ingredient']
+        restaurant = form.cleaned_data['restaurant']
+        added = form.cleaned_data['quantity']
+        receive_stock(restaurant.id, {ingredient.id: added})
+
+        stock_item = StockItem.objects.select_related('ingredient').get(
+            ingredient=ingredient,
+            restaurant=restaurant
+        )
+        messages.success(
+            self.request,
+            f'Количество {ingredient.name} увеличено на {units.format_quantity(added, ingredient.unit)}. '
+            f'Общее количество: {stock_item.quantity_display}'
+        )
+        return redirect(self.get_success_url())
+
+
+class DeliveryIntakeView(LoginRequiredMixin, FormView):
+    """Приемка поставки по накладной поставщика"""
+    form_class = DeliveryIntakeForm
+    template_name = 'inventory/delivery_intake.html'
+
+    def form_valid(self, form):
+        restaurant = form.cleaned_data['restaurant']
+        invoice = form.cleaned_data['invoice']
+        try:
+            report = import_invoice(restaurant, invoice, invoice.name)
+        except InvoiceFormatError as e:
+            form.add_error('invoice', str(e))
+            return self.form_invalid(form)
+
+        if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': True, 'report': report})
+
+        if report['applied']:
             messages.success(
                 self.request,
-                f'Количество {existing_item.ingredient.name} увеличено на {form.cleaned_data["quantity"]} {existing_item.ingredient.unit}. '
-                f'Общее количество: {existing_item.quantity} {existing_item.ingredient.unit}'
+                f'Накладная принята: пополнено позиций - {len(report["applied"])}'
             )
-            return redirect(self.get_success_url())
-        else:
-            # Если нет, создаем новый
-            messages.success(self.request, 'Товар успешно добавлен на склад!')
-            return super().form_valid(form)
+        if report['unknown'] or report['errors']:
+            messages.warning(
+                self.request,
+                f'Пропущено строк: {len(report["unknown"]) + len(report["errors"])}'
+            )
+        return self.render_to_response(self.get_context_data(
+            form=self.form_class(initial={'restaurant': restaurant}),
+            report=report,
+            restaurant=restaurant
+        ))
+
+    def form_invalid(self, form):
+        if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': False, 'errors': form.errors})
+        return super().form_invalid(form)
 
 
 class QuickAddIngredientView(LoginRequiredMixin, CreateView):
@@ -94,14 +145,282 @@ class QuickAddIngredientView(LoginRequiredMixin, CreateView):
 class StockUpdateView(LoginRequiredMixin, UpdateView):
     """Обновление количества на складе"""
     model = StockItem
+    form_class = StockQuantityForm
     template_name = 'inventory/stock_update.html'
-    fields = ['quantity']
+
+    def form_valid(self, form):
+        # Ручная правка остатка переносится на партии
+        with transaction.atomic():
+            previous = StockItem.objects.select_for_update().values_list(
+                'quantity', flat=True
+            ).get(pk=self.object.pk)
+            response = super().form_valid(form)
+            reconcile_lots(self.object.restaurant_id, {self.object.ingredient_id: self.object.quantity - previous})
+        return response
 
     def get_success_url(self):
         messages.success(self.request, 'Количество на складе обновлено!')
         return reverse_lazy('inventory:stock') + f'?restaurant={self.object.restaurant.id}'
 
 
+class ExpiringStockView(LoginRequiredMixin, ListView):
+    """Партии с истекающим сроком годности и списание просроченных"""
+    template_name = 'inventory/expiring.html'
+    context_object_name = 'lots'
+    paginate_by = 50
+
+    def get_days(self):
+        try:
+            return max(int(self.request.GET.get('days', 3)), 0)
+        except ValueError:
+            return 3
+
+    def get_queryset(self):
+        return expiring_lots(
+            days=self.get_days(),
+            restaurant_id=self.request.GET.get('restaurant') or None
+        ).select_related('ingredient', 'restaurant')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['restaurants'] = Restaurant.objects.all()
+        context['current_restaurant'] = self.request.GET.get('restaurant', '')
+        context['days'] = self.get_days()
+        context['now'] = timezone.now()
+        return context
+
+    def post(self, request):
+        restaurant_id = request.POST.get('restaurant') or None
+        written_off = write_off_expired(restaurant_id=restaurant_id)
+        if written_off:
+            messages.success(request, f'Списано просроченных партий: {written_off}')
+        else:
+            messages.info(request, 'Просроченных партий нет')
+        url = reverse_lazy('inventory:expiring_stock')
+        return redirect(f'{url}?restaurant={restaurant_id}' if restaurant_id else url)
+
+
+class StockAlertsView(LoginRequiredMixin, View):
+    """
+    Лента оповещений о низких остатках для дашбордов.
+
+    Клиент передает id последнего полученного оповещения (after) и
+    получает только новые записи.
+    """
+    limit = 50
+
+    def get(self, request):
+        try:
+            after = int(request.GET.get('after', 0))
+        except ValueError:
+            after = 0
+        try:
+            restaurant_id = int(request.GET.get('restaurant') or 0)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Некорректный ресторан'}, status=400)
+
+        feed = StockAlert.objects.all()
+        if restaurant_id:
+            feed = feed.filter(restaurant_id=restaurant_id)
+
+        alerts = feed.select_related('ingredient', 'restaurant').order_by('id')
+        if after:
+            alerts = alerts.filter(id__gt=after)
+        else:
+            # Первый запрос: последние оповещения (филиала), а не вся история
+            alerts = alerts.filter(id__in=feed.order_by('-id').values('id')[:self.limit])
+
+        data = [
+            {
+                'id': alert.id,
+                'restaurant': alert.restaurant.name,
+                'restaurant_id': alert.restaurant_id,
+                'ingredient': alert.ingredient.name,
+                'quantity': alert.quantity_display,
+                'reorder_point': units.format_quantity(alert.reorder_point, alert.ingredient.unit),
+                'created_at': alert.created_at.isoformat(),
+            }
+            for alert in alerts[:self.limit]
+        ]
+        return JsonResponse({
+            'alerts': data,
+            'last_id': data[-1]['id'] if data else after
+        })
+
+
+class PurchaseOrderListView(LoginRequiredMixin, ListView):
+    """Черновики заказов поставщикам, построенные по прогнозу расхода"""
+    model = PurchaseOrder
+    template_name = 'inventory/purchase_orders.html'
+    context_object_name = 'purchase_orders'
+
+    def get_queryset(self):
+        queryset = PurchaseOrder.objects.filter(
+            status=PurchaseOrder.Status.DRAFT
+        ).select_related('restaurant', 'supplier').prefetch_related('lines__ingredient').order_by(
+            'restaurant__name', 'supplier__name'
+        )
+        restaurant_id = self.request.GET.get('restaurant')
+        if restaurant_id:
+            queryset = queryset.filter(restaurant_id=restaurant_id)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['restaurants'] = Restaurant.objects.all()
+        context['current_restaurant'] = self.request.GET.get('restaurant', '')
+        return context
+
+
+class StocktakeListView(LoginRequiredMixin, ListView):
+    """История инвентаризаций"""
+    model = Stocktake
+    template_name = 'inventory/stocktakes.html'
+    context_object_name = 'stocktakes'
+    paginate_by = 20
+
+    def get_queryset(self):
+        queryset = Stocktake.objects.select_related('restaurant', 'created_by').order_by('-counted_at')
+        restaurant_id = self.request.GET.get('restaurant')
+        if restaurant_id:
+            queryset = queryset.filter(restaurant_id=restaurant_id)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['restaurants'] = Restaurant.objects.all()
+        context['current_restaurant'] = self.request.GET.get('restaurant', '')
+        return context
+
+
+class StocktakeCreateView(LoginRequiredMixin, View):
+    """Режим инвентаризации: ввод фактических остатков ресторана"""
+    template_name = 'inventory/stocktake_form.html'
+
+    def get_restaurant(self, request):
+        return get_object_or_404(Restaurant, pk=request.GET.get('restaurant') or request.POST.get('restaurant'))
+
+    def get_form(self, restaurant, data=None):
+        stock_items = StockItem.objects.filter(restaurant=restaurant).select_related(
+            'ingredient'
+        ).order_by('ingredient__name')
+        return StocktakeForm(data, stock_items=stock_items)
+
+    def get(self, request):
+        if not request.GET.get('restaurant'):
+            return render(request, self.template_name, {'restaurants': Restaurant.objects.all()})
+        restaurant = self.get_restaurant(request)
+        return render(request, self.template_name, {
+            'restaurant': restaurant,
+            'form': self.get_form(restaurant)
+        })
+
+    def post(self, request):
+        restaurant = self.get_restaurant(request)
+        form = self.get_form(restaurant, request.POST)
+        if not form.is_valid():
+            return render(request, self.template_name, {'restaurant': restaurant, 'form': form})
+
+        counts = form.counts()
+        # Инвентаризация без строк не должна остаться, если проведение упало
+        with transaction.atomic():
+            stocktake = Stocktake.objects.create(
+                restaurant=restaurant,
+                created_by=request.user,
+                note=form.cleaned_data['note']
+            )
+            apply_stocktake(stocktake, counts)
+        messages.success(request, f'Инвентаризация сохранена: пересчитано позиций - {len(counts)}')
+        return redirect('inventory:stocktake_variance', pk=stocktake.pk)
+
+
+class VarianceReportView(LoginRequiredMixin, TemplateView):
+    """
+    Отклонения фактического расхода от теоретического.
+
+    С pk - по одной инвентаризации, без pk - по последним инвентаризациям
+    всех филиалов.
+    """
+    template_name = 'inventory/stocktake_variance.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if 'pk' in self.kwargs:
+            stocktakes = [get_object_or_404(Stocktake, pk=self.kwargs['pk'])]
+        else:
+            latest = Stocktake.objects.values('restaurant_id').annotate(last=Max('counted_at'))
+            condition = Q()
+            for row in latest:
+                condition |= Q(restaurant_id=row['restaurant_id'], counted_at=row['last'])
+            stocktakes = list(Stocktake.objects.filter(condition)) if latest else []
+        context['reports'] = variance_report(stocktakes)
+        return context
+
+
+class StockTransferListView(LoginRequiredMixin, ListView):
+    """Перемещения между филиалами и предложения по перераспределению"""
+    model = StockTransfer
+    template_name = 'inventory/transfers.html'
+    context_object_name = 'transfers'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return StockTransfer.objects.select_related(
+            'source', 'destination', 'created_by'
+        ).prefetch_related('lines__ingredient').order_by('-created_at')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['suggestions'] = rebalance_suggestions()
+        return context
+
+
+class StockTransferCreateView(LoginRequiredMixin, View):
+    """
+    Создание и проведение перемещения.
+
+    Параметры GET source, destination, ingredient и amount заполняют форму
+    (так открываются предложения перераспределения).
+    """
+    template_name = 'inventory/transfer_form.html'
+
+    def get(self, request):
+        initial_lines = []
+        ingredient = Ingredient.objects.filter(pk=request.GET.get('ingredient') or None).first()
+        if ingredient:
+            initial_lines.append({'ingredient': ingredient, 'quantity': request.GET.get('amount')})
+        form = StockTransferForm(initial={
+            'source': request.GET.get('source'),
+            'destination': request.GET.get('destination')
+        })
+        formset = StockTransferLineFormSet(initial=initial_lines)
+        return render(request, self.template_name, {'form': form, 'formset': formset})
+
+    def post(self, request):
+        form = StockTransferForm(request.POST)
+        formset = StockTransferLineFormSet(request.POST)
+        if form.is_valid() and formset.is_valid():
+            try:
+                with transaction.atomic():
+                    transfer = form.save(commit=False)
+                    transfer.created_by = request.user
+                    transfer.save()
+                    formset.instance = transfer
+                    formset.save()
+                    apply_transfer(transfer)
+            except TransferError as error:
+                form.add_error(None, str(error))
+                for shortage in error.shortages:
+                    form.add_error(None, shortage)
+            else:
+                messages.success(
+                    request,
+                    f'Перемещение проведено: {transfer.source.name} → {transfer.destination.name}'
+                )
+                return redirect('inventory:transfers')
+        return render(request, self.template_name, {'form': form, 'formset': formset})
+
+
 class RecipeManagementView(LoginRequiredMixin, ListView):
     """Управление рецептами блюд"""
     model = Recipe
@@ -164,7 +483,7 @@ class IngredientCreateView(LoginRequiredMixin, CreateView):
     """Создание нового ингредиента"""
     model = Ingredient
     template_name = 'inventory/ingredient_form.html'
-    fields = ['name', 'unit']
+    fields = ['name', 'unit', 'shelf_life_days']
     success_url = reverse_lazy('inventory:ingredients')
 
     def form_valid(self, form):
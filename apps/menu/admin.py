@@ -1,12 +1,13 @@
 # apps/menu/admin.py
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, MenuItem, Ingredient, Recipe
+from .models import Category, MenuItem, Ingredient, Recipe, MenuSnapshot, PriceHistory, MenuItemOverride
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'get_dishes_count', 'sort_order', 'is_active', 'created_at')
+    list_display = ('name', 'get_dishes_count', 'dishes_count', 'dishes_with_image_count', 'sort_order',
+                    'is_active', 'created_at')
     list_filter = ('is_active', 'created_at')
     search_fields = ('name', 'description')
     list_editable = ('sort_order', 'is_active')
@@ -33,7 +34,7 @@ class CategoryAdmin(admin.ModelAdmin):
         )
 
     get_dishes_count.short_description = 'Количество блюд'
-    get_dishes_count.admin_order_field = 'menu_items__count'
+    get_dishes_count.admin_order_field = 'available_dishes_count'
 
 
 class RecipeInline(admin.TabularInline):
@@ -113,4 +114,34 @@ class RecipeAdmin(admin.ModelAdmin):
     ordering = ('dish__name', 'ingredient__name')
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('dish', 'ingredient')
\ No newline at end of file
+        return super().get_queryset(request).select_related('dish', 'ingredient')
+
+
+@admin.register(MenuSnapshot)
+class MenuSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('restaurant', 'version', 'is_stale', 'revision', 'built_at')
+    readonly_fields = ('restaurant', 'version', 'is_stale', 'revision', 'built_at')
+    exclude = ('payload',)
+
+
+@admin.register(PriceHistory)
+class PriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ('menu_item', 'price', 'valid_from', 'source', 'changed_by')
+    list_filter = ('source', 'valid_from')
+    search_fields = ('menu_item__name',)
+    date_hierarchy = 'valid_from'
+    readonly_fields = ('menu_item', 'price', 'valid_from', 'source', 'changed_by')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('menu_item', 'changed_by')
+
+
+@admin.register(MenuItemOverride)
+class MenuItemOverrideAdmin(admin.ModelAdmin):
+    list_display = ('menu_item', 'restaurant', 'price', 'is_available', 'updated_at')
+    list_filter = ('restaurant', 'is_available')
+    search_fields = ('menu_item__name',)
+    autocomplete_fields = ('menu_item',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('menu_item', 'restaurant')
@@ -0,0 +1,293 @@
+# apps/menu/bulk.py
+"""
+Массовое изменение меню: цены, доступность и порядок сортировки сотен
+блюд одной транзакцией - из редактора, через AJAX API или из файла
+CSV/XLSX.
+
+Изменения записываются одним bulk_update, поэтому MenuItem.save и
+сигналы не вызываются: история цен, счетчики категорий, снимки меню и
+индекс быстрого поиска обновляются здесь явно. Полнотекстовый индекс
+не затрагивается - цена и доступность в него не входят.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.inventory.intake import InvoiceFormatError, read_rows
+from .models import Category, MenuItem, MenuItemOverride, PriceHistory
+from .snapshot import invalidate_snapshots
+from . import typeahead
+
+FIELDS = ('price', 'is_available', 'sort_order')
+
+ID_HEADERS = {'id', 'код'}
+NAME_HEADERS = {'блюдо', 'название', 'наименование', 'name'}
+PRICE_HEADERS = {'цена', 'price'}
+AVAILABLE_HEADERS = {'доступно', 'в наличии', 'доступность', 'available', 'is_available'}
+SORT_HEADERS = {'порядок', 'сортировка', 'sort_order'}
+
+TRUE_VALUES = {'1', 'да', 'true', 'yes', '+', 'доступно', 'в наличии'}
+FALSE_VALUES = {'0', 'нет', 'false', 'no', '-', 'недоступно', 'нет в наличии'}
+
+# Поле sort_order - PositiveIntegerField
+MAX_INTEGER = 2147483647
+
+
+class MenuImportError(ValueError):
+    """Файл с изменениями меню не удалось разобрать"""
+
+
+def _normalize(value):
+    return ' '.join(str(value if value is not None else '').split()).casefold()
+
+
+def _blank(value):
+    return value is None or _normalize(value) == ''
+
+
+def parse_price(value):
+    if isinstance(value, (int, float, Decimal)):
+        price = Decimal(str(value))
+    else:
+        text = str(value).strip().replace('\xa0', '').replace(' ', '').replace(',', '.')
+        try:
+            price = Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f'Некорректная цена «{value}»')
+    # Поле цены - max_digits=10, decimal_places=2
+    if not price.is_finite() or price < 0 or price >= Decimal('1e8'):
+        raise ValueError(f'Некорректная цена «{value}»')
+    return price.quantize(Decimal('0.01'))
+
+
+def parse_available(value):
+    if isinstance(value, bool):
+        return value
+    text = _normalize(value)
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'Некорректная доступность «{value}» (ожидается да/нет)')
+
+
+def _parse_integer(value):
+    """Целое число из ячейки (в том числе «3.0» из XLSX) или ValueError"""
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(value)
+    # Infinity и 1e400 иначе дали бы OverflowError или число вне поля
+    if not number.is_finite() or number != number.to_integral_value() or abs(number) > MAX_INTEGER:
+        raise ValueError(value)
+    return int(number)
+
+
+def parse_sort_order(value):
+    try:
+        sort_order = _parse_integer(value)
+    except ValueError:
+        raise ValueError(f'Некорректный порядок сортировки «{value}»')
+    if sort_order < 0:
+        raise ValueError('Порядок сортировки не может быть отрицательным')
+    return sort_order
+
+
+PARSERS = {'price': parse_price, 'is_available': parse_available, 'sort_order': parse_sort_order}
+
+
+def parse_change(values):
+    """
+    Изменение одного блюда из сырых значений (строки формы, ячейки файла,
+    JSON): {'price': Decimal, 'is_available': bool, 'sort_order': int}.
+    Пустые значения пропускаются; при ошибке - ValueError с сообщением.
+    """
+    return {
+        field: PARSERS[field](value)
+        for field, value in values.items()
+        if field in PARSERS and not _blank(value)
+    }
+
+
+def _describe(field, old, new):
+    if field == 'price':
+        return f'цена {old} → {new}'
+    if field == 'is_available':
+        return 'доступно' if new else 'недоступно'
+    return f'порядок {old} → {new}'
+
+
+def apply_menu_changes(changes, user=None, source=PriceHistory.Source.BULK):
+    """
+    Применение изменений одной транзакцией.
+
+    changes - {id блюда: {'price', 'is_available', 'sort_order'}} (любое
+    подмножество полей, значения уже разобраны - см. parse_change).
+    Возвращает отчет:
+        applied   - [{'id', 'name', 'changes'}] по каждому измененному блюду
+        unchanged - количество блюд, значения которых совпали с текущими
+        prices    - количество изменений цены (записей истории цен)
+        unknown   - id блюд, которых нет в меню
+    """
+    report = {'applied': [], 'unchanged': 0, 'prices': 0, 'unknown': []}
+
+    with transaction.atomic():
+        items = MenuItem.objects.select_for_update().in_bulk(list(changes))
+        now = timezone.now()
+        changed, fields, history, categories = [], set(), [], set()
+
+        for item_id, values in changes.items():
+            item = items.get(item_id)
+            if item is None:
+                report['unknown'].append(item_id)
+                continue
+
+            diff = {
+                field: value for field, value in values.items()
+                if field in FIELDS and getattr(item, field) != value
+            }
+            if not diff:
+                report['unchanged'] += 1
+                continue
+
+            if 'price' in diff:
+                history.append(PriceHistory(menu_item=item, price=diff['price'], valid_from=now,
+                                            source=source, changed_by=user))
+            if 'is_available' in diff:
+                categories.add(item.category_id)
+            report['applied'].append({
+                'id': item.id,
+                'name': item.name,
+                'changes': '; '.join(_describe(field, getattr(item, field), value) for field, value in diff.items()),
+            })
+            for field, value in diff.items():
+                setattr(item, field, value)
+            item.updated_at = now
+            fields.update(diff)
+            changed.append(item)
+
+        if changed:
+            MenuItem.objects.bulk_update(changed, [*sorted(fields), 'updated_at'], batch_size=500)
+            PriceHistory.objects.bulk_create(history)
+            if categories:
+                Category.recount(categories)
+            transaction.on_commit(invalidate_snapshots)
+            transaction.on_commit(typeahead.reset)
+
+    report['prices'] = len(history)
+    report['applied'].sort(key=lambda line: line['name'])
+    return report
+
+
+def save_overrides(restaurant_id, overrides):
+    """
+    Замена настроек блюд филиала одной транзакцией.
+
+    overrides - {menu_item_id: (цена или None, доступность или None)};
+    блюда, у которых оба значения пустые, возвращаются к общим настройкам.
+    Возвращает количество блюд с собственными настройками.
+    """
+    keep = {item_id: values for item_id, values in overrides.items() if values != (None, None)}
+    with transaction.atomic():
+        MenuItemOverride.objects.filter(
+            restaurant_id=restaurant_id,
+            menu_item_id__in=[item_id for item_id in overrides if item_id not in keep]
+        ).delete()
+        MenuItemOverride.objects.bulk_create(
+            [MenuItemOverride(restaurant_id=restaurant_id, menu_item_id=item_id, price=price,
+                              is_available=is_available)
+             for item_id, (price, is_available) in keep.items()],
+            update_conflicts=True,
+            unique_fields=['restaurant', 'menu_item'],
+            update_fields=['price', 'is_available', 'updated_at'],
+            batch_size=500
+        )
+        transaction.on_commit(lambda: invalidate_snapshots([restaurant_id]))
+        transaction.on_commit(typeahead.reset)
+    return len(keep)
+
+
+def import_menu_changes(file, filename, user=None):
+    """
+    Импорт изменений меню из CSV или XLSX.
+
+    Первая непустая строка - заголовок: колонка id или название блюда и
+    хотя бы одна из колонок цена, доступно, порядок. Пустая ячейка
+    оставляет значение без изменений. Возвращает отчет apply_menu_changes,
+    дополненный полями:
+        lines   - количество строк с данными
+        errors  - [{'line', 'name', 'message'}] строки с ошибками
+    """
+    names = {}
+    for item_id, name in MenuItem.objects.values_list('id', 'name'):
+        names.setdefault(_normalize(name), []).append(item_id)
+
+    columns = None
+    changes = {}
+    lines = 0
+    errors = []
+
+    try:
+        for line_number, row in enumerate(read_rows(file, filename), start=1):
+            cells = [_normalize(cell) for cell in row]
+            if not any(cells):
+                continue
+
+            if columns is None:
+                def find(headers):
+                    return next((i for i, cell in enumerate(cells) if cell in headers), None)
+
+                columns = {
+                    'id': find(ID_HEADERS),
+                    'name': find(NAME_HEADERS),
+                    'price': find(PRICE_HEADERS),
+                    'is_available': find(AVAILABLE_HEADERS),
+                    'sort_order': find(SORT_HEADERS),
+                }
+                if columns['id'] is None and columns['name'] is None:
+                    raise MenuImportError('В заголовке нет колонки «id» или «Название»')
+                if all(columns[field] is None for field in FIELDS):
+                    raise MenuImportError('В заголовке нет колонок «Цена», «Доступно» или «Порядок»')
+                continue
+
+            lines += 1
+
+            def cell(field):
+                index = columns[field]
+                return row[index] if index is not None and index < len(row) else None
+
+            name = str(cell('name') or '').strip()
+            if not _blank(cell('id')):
+                try:
+                    item_id = _parse_integer(cell('id'))
+                except ValueError:
+                    errors.append({'line': line_number, 'name': name, 'message': f'Некорректный id «{cell("id")}»'})
+                    continue
+            else:
+                matches = names.get(_normalize(name), [])
+                if len(matches) != 1:
+                    errors.append({
+                        'line': line_number,
+                        'name': name,
+                        'message': 'Блюдо не найдено' if not matches else 'Несколько блюд с таким названием, укажите id'
+                    })
+                    continue
+                item_id = matches[0]
+
+            try:
+                change = parse_change({field: cell(field) for field in FIELDS})
+            except ValueError as e:
+                errors.append({'line': line_number, 'name': name, 'message': str(e)})
+                continue
+            if change:
+                changes.setdefault(item_id, {}).update(change)
+    except InvoiceFormatError as e:
+        raise MenuImportError(str(e)) from e
+
+    if columns is None:
+        raise MenuImportError('Файл пуст')
+
+    report = apply_menu_changes(changes, user=user, source=PriceHistory.Source.IMPORT)
+    report.update(lines=lines, errors=errors)
+    return report
@@ -176,4 +176,21 @@ class CategoryFilterForm(forms.Form):
         required=False,
         initial='name',
         widget=forms.Select(attrs={'class': 'form-select'})
-    )
\ No newline at end of file
+    )
+
+class MenuImportForm(forms.Form):
+    """Загрузка файла с изменениями цен, доступности и порядка блюд"""
+
+    file = forms.FileField(
+        label='Файл (CSV или XLSX)',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx'
+        })
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Поддерживаются только файлы CSV и XLSX')
+        return file
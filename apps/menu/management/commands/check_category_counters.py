@@ -0,0 +1,42 @@
+# apps/menu/management/commands/check_category_counters.py
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from apps.menu.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Проверка счетчиков блюд в категориях (с --repair - исправление расхождений)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Пересчитать расходящиеся счетчики')
+
+    def handle(self, *args, **options):
+        actual = Category.actual_counts()
+        mismatch = Q()
+        for field in Category.COUNTER_FIELDS:
+            mismatch |= ~Q(**{field: F(f'actual_{field}')})
+        broken = list(
+            Category.objects.annotate(**{f'actual_{field}': expression for field, expression in actual.items()})
+            .filter(mismatch)
+            .values('id', 'name', *Category.COUNTER_FIELDS, *[f'actual_{field}' for field in Category.COUNTER_FIELDS])
+        )
+
+        if not broken:
+            self.stdout.write(self.style.SUCCESS('Счетчики всех категорий верны'))
+            return
+
+        for row in broken:
+            details = ', '.join(
+                f"{field}: {row[field]} -> {row[f'actual_{field}']}"
+                for field in Category.COUNTER_FIELDS if row[field] != row[f'actual_{field}']
+            )
+            self.stdout.write(f"{row['name']} (id {row['id']}): {details}")
+
+        if options['repair']:
+            repaired = Category.recount([row['id'] for row in broken])
+            self.stdout.write(self.style.SUCCESS(f'Исправлено категорий: {repaired}'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Расхождений: {len(broken)}. Запустите с --repair для исправления'
+            ))
@@ -0,0 +1,15 @@
+# apps/menu/management/commands/rebuild_menu_search.py
+from django.core.management.base import BaseCommand
+
+from apps.menu.search import is_fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Полная пересборка полнотекстового индекса меню (SQLite FTS5)'
+
+    def handle(self, *args, **options):
+        if not is_fts_available():
+            self.stdout.write('Индекс FTS5 используется только с SQLite, пересборка не требуется')
+            return
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано блюд: {indexed}'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_ingredient_alter_category_options_and_more'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64, verbose_name='Версия')),
+                ('payload', models.BinaryField(verbose_name='Данные')),
+                ('is_stale', models.BooleanField(default=False, verbose_name='Устарел')),
+                ('revision', models.PositiveIntegerField(default=0, help_text='Увеличивается при каждой инвалидации', verbose_name='Ревизия')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Собран')),
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='menu_snapshot', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Снимок меню',
+                'verbose_name_plural': 'Снимки меню',
+            },
+        ),
+    ]
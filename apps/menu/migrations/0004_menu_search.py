@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from apps.menu.text import stems
+
+CREATE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS menu_search
+    USING fts5(name, category, description, tokenize = 'unicode61 remove_diacritics 0')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 есть только в SQLite; на PostgreSQL поиск строит tsvector на лету
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    rows = [
+        (item_id, stems(name), stems(category), stems(description))
+        for item_id, name, category, description in MenuItem.objects.values_list(
+            'id', 'name', 'category__name', 'description'
+        ).iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.executemany(
+            'INSERT INTO menu_search (rowid, name, category, description) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS menu_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menu_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Category = apps.get_model('menu', 'Category')
+    MenuItem = apps.get_model('menu', 'MenuItem')
+
+    def count(items):
+        return Coalesce(Subquery(
+            items.filter(category=OuterRef('pk')).order_by().values('category').annotate(
+                total=Count('id')
+            ).values('total')
+        ), Value(0))
+
+    items = MenuItem.objects.all()
+    Category.objects.update(
+        dishes_count=count(items),
+        available_dishes_count=count(items.filter(is_available=True)),
+        dishes_with_image_count=count(items.exclude(image='').exclude(image__isnull=True)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_menu_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='available_dishes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Доступных блюд'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='dishes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Всего блюд'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='dishes_with_image_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Блюд с изображением'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_price_history(apps, schema_editor):
+    # Текущая цена каждого блюда действует с момента его создания
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    PriceHistory = apps.get_model('menu', 'PriceHistory')
+    PriceHistory.objects.bulk_create(
+        (PriceHistory(menu_item_id=item_id, price=price, valid_from=created_at, source='MANUAL')
+         for item_id, price, created_at in MenuItem.objects.values_list('id', 'price', 'created_at').iterator()),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_category_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('valid_from', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Действует с')),
+                ('source', models.CharField(choices=[('MANUAL', 'Редактирование блюда'), ('BULK', 'Массовое редактирование'), ('IMPORT', 'Импорт файла')], default='MANUAL', max_length=10, verbose_name='Источник')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Изменил')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='menu.menuitem', verbose_name='Блюдо')),
+            ],
+            options={
+                'verbose_name': 'Цена блюда',
+                'verbose_name_plural': 'История цен',
+                'ordering': ['menu_item', '-valid_from'],
+                'indexes': [models.Index(fields=['menu_item', 'valid_from'], name='price_history_item_idx')],
+            },
+        ),
+        migrations.RunPython(seed_price_history, migrations.RunPython.noop),
+    ]
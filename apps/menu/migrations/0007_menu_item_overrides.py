@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_price_history'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Цена в филиале')),
+                ('is_available', models.BooleanField(blank=True, null=True, verbose_name='Доступно в филиале')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overrides', to='menu.menuitem', verbose_name='Блюдо')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_overrides', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Настройка блюда в филиале',
+                'verbose_name_plural': 'Настройки блюд в филиалах',
+                'unique_together': {('restaurant', 'menu_item')},
+            },
+        ),
+    ]
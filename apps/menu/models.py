@@ -1,6 +1,13 @@
 # apps/menu/models.py - ОБНОВЛЕННАЯ ВЕРСИЯ БЕЗ SLUG
-from django.db import models
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
+from apps.restaurants.models import Restaurant
 
 
 class Category(models.Model):
@@ -13,6 +20,14 @@ class Category(models.Model):
     created_at = models.DateTimeField('Создано', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлено', auto_now=True)
 
+    # Счетчики блюд поддерживаются MenuItem.save/delete (см. update_counters);
+    # проверка и исправление - manage.py check_category_counters
+    dishes_count = models.PositiveIntegerField('Всего блюд', default=0, editable=False)
+    available_dishes_count = models.PositiveIntegerField('Доступных блюд', default=0, editable=False)
+    dishes_with_image_count = models.PositiveIntegerField('Блюд с изображением', default=0, editable=False)
+
+    COUNTER_FIELDS = ('dishes_count', 'available_dishes_count', 'dishes_with_image_count')
+
     class Meta:
         verbose_name = 'Категория меню'
         verbose_name_plural = 'Категории меню'
@@ -21,12 +36,73 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Счетчики меняются только запросами update_counters/recount, иначе
+        # форма категории перезаписала бы их значениями на момент загрузки
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('menu:category_detail', kwargs={'pk': self.pk})
 
     def get_dishes_count(self):
         """Количество активных блюд в категории"""
-        return self.menu_items.filter(is_available=True).count()
+        return self.available_dishes_count
+
+    @classmethod
+    def update_counters(cls, old=None, new=None):
+        """
+        Изменение счетчиков при сохранении или удалении блюда.
+
+        old, new - состояния блюда до и после (category_id, is_available,
+        есть ли изображение); None - блюда не было или больше нет.
+        """
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            category_id, is_available, has_image = state
+            delta = deltas[category_id]
+            delta[0] += sign
+            delta[1] += sign * bool(is_available)
+            delta[2] += sign * bool(has_image)
+
+        for category_id, (total, available, with_image) in deltas.items():
+            if total or available or with_image:
+                cls.objects.filter(pk=category_id).update(
+                    dishes_count=F('dishes_count') + total,
+                    available_dishes_count=F('available_dishes_count') + available,
+                    dishes_with_image_count=F('dishes_with_image_count') + with_image,
+                )
+
+    @classmethod
+    def actual_counts(cls):
+        """Выражения для фактических счетчиков (подзапросы COUNT по блюдам)"""
+        def count(items):
+            return Coalesce(Subquery(
+                items.filter(category=OuterRef('pk')).order_by().values('category').annotate(
+                    total=Count('id')
+                ).values('total')
+            ), Value(0))
+
+        items = MenuItem.objects.all()
+        return {
+            'dishes_count': count(items),
+            'available_dishes_count': count(items.filter(is_available=True)),
+            'dishes_with_image_count': count(items.exclude(image='').exclude(image__isnull=True)),
+        }
+
+    @classmethod
+    def recount(cls, category_ids=None):
+        """Пересчет счетчиков одним UPDATE (после массовых изменений блюд)"""
+        categories = cls.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=list(category_ids))
+        return categories.update(**cls.actual_counts())
 
     def get_available_dishes(self):
         """Получить доступные блюда категории"""
@@ -65,6 +141,33 @@ class MenuItem(models.Model):
     def get_absolute_url(self):
         return reverse('menu:item_detail', kwargs={'pk': self.pk})
 
+    def _stored_state(self):
+        """
+        Состояние блюда в базе (строка блокируется): состояние для счетчиков
+        категории (category_id, is_available, есть ли изображение) и цена
+        """
+        state = MenuItem.objects.select_for_update().filter(pk=self.pk).values_list(
+            'category_id', 'is_available', 'image', 'price'
+        ).first()
+        if state is None:
+            return None, None
+        return (state[0], state[1], bool(state[2])), state[3]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old, old_price = self._stored_state() if self.pk else (None, None)
+            super().save(*args, **kwargs)
+            Category.update_counters(old, (self.category_id, self.is_available, bool(self.image)))
+            if old_price is None or old_price != self.price:
+                PriceHistory.objects.create(menu_item=self, price=self.price)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            old, _ = self._stored_state()
+            result = super().delete(*args, **kwargs)
+            Category.update_counters(old)
+        return result
+
     @property
     def profit_margin(self):
         """Маржа прибыли в процентах"""
@@ -80,6 +183,77 @@ class MenuItem(models.Model):
         return None
 
 
+class MenuItemOverride(models.Model):
+    """
+    Цена и доступность блюда в конкретном филиале (стоп-лист, местные
+    цены). Пустое поле - действует значение блюда; итоговое меню
+    филиала см. apps.menu.overrides.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_overrides',
+                                   verbose_name='Ресторан')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='overrides',
+                                  verbose_name='Блюдо')
+    price = models.DecimalField('Цена в филиале', max_digits=10, decimal_places=2, null=True, blank=True)
+    is_available = models.BooleanField('Доступно в филиале', null=True, blank=True)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Настройка блюда в филиале'
+        verbose_name_plural = 'Настройки блюд в филиалах'
+        # Уникальный индекс (restaurant, menu_item) обслуживает и выборку всех настроек филиала
+        unique_together = ['restaurant', 'menu_item']
+
+    def __str__(self):
+        return f'{self.menu_item.name} - {self.restaurant.name}'
+
+
+class PriceHistory(models.Model):
+    """
+    История цен блюда: цена действует с valid_from до valid_from следующей
+    записи того же блюда. Записи создаются при каждом изменении цены
+    (MenuItem.save, массовое редактирование, импорт).
+
+    Цена на момент времени - последняя запись с valid_from <= момента,
+    для отчетов см. price_at (индекс (menu_item, valid_from)).
+    """
+
+    class Source(models.TextChoices):
+        MANUAL = 'MANUAL', 'Редактирование блюда'
+        BULK = 'BULK', 'Массовое редактирование'
+        IMPORT = 'IMPORT', 'Импорт файла'
+
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='price_history',
+                                  verbose_name='Блюдо')
+    price = models.DecimalField('Цена', max_digits=10, decimal_places=2)
+    valid_from = models.DateTimeField('Действует с', default=timezone.now)
+    source = models.CharField('Источник', max_length=10, choices=Source.choices, default=Source.MANUAL)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+', verbose_name='Изменил')
+
+    class Meta:
+        verbose_name = 'Цена блюда'
+        verbose_name_plural = 'История цен'
+        ordering = ['menu_item', '-valid_from']
+        indexes = [
+            models.Index(fields=['menu_item', 'valid_from'], name='price_history_item_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.menu_item.name}: {self.price} с {self.valid_from:%d.%m.%Y %H:%M}'
+
+    @classmethod
+    def price_at(cls, menu_item, moment):
+        """
+        Подзапрос цены блюда на момент времени для annotate, например
+        OrderItem.objects.annotate(list_price=PriceHistory.price_at(
+            OuterRef('menu_item_id'), OuterRef('order__created_at')))
+        """
+        return Subquery(
+            cls.objects.filter(menu_item=menu_item, valid_from__lte=moment)
+            .order_by('-valid_from').values('price')[:1]
+        )
+
+
 # Новая модель для ингредиентов (для будущей интеграции со складом)
 class Ingredient(models.Model):
     name = models.CharField('Название ингредиента', max_length=100)
@@ -113,4 +287,29 @@ class Recipe(models.Model):
     @property
     def ingredient_cost(self):
         """Стоимость ингредиента для данного блюда"""
-        return self.quantity * self.ingredient.cost_per_unit
\ No newline at end of file
+        return self.quantity * self.ingredient.cost_per_unit
+
+
+class MenuSnapshot(models.Model):
+    """
+    Скомпилированное меню ресторана (см. apps.menu.snapshot).
+
+    payload - JSON меню, сжатый gzip; version - хеш несжатого JSON,
+    он же ETag. При изменении блюд и категорий снимки помечаются
+    устаревшими и пересобираются при следующем запросе.
+    """
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, related_name='menu_snapshot',
+                                      verbose_name='Ресторан')
+    version = models.CharField('Версия', max_length=64)
+    payload = models.BinaryField('Данные')
+    is_stale = models.BooleanField('Устарел', default=False)
+    revision = models.PositiveIntegerField('Ревизия', default=0,
+                                           help_text='Увеличивается при каждой инвалидации')
+    built_at = models.DateTimeField('Собран', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Снимок меню'
+        verbose_name_plural = 'Снимки меню'
+
+    def __str__(self):
+        return f'Меню {self.restaurant.name} ({self.version[:8]})'
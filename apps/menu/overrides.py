@@ -0,0 +1,52 @@
+# apps/menu/overrides.py
+"""
+Итоговое меню филиала с учетом MenuItemOverride.
+
+Настройки филиала присоединяются к блюдам одним LEFT JOIN по
+уникальному индексу (restaurant, menu_item), поэтому стоимость
+разрешения не зависит от числа филиалов - читаются только строки
+нужного филиала. Снимок меню (apps.menu.snapshot) строится из
+effective_items, так что касса и быстрый поиск получают цены и
+доступность филиала без дополнительных запросов.
+"""
+from django.db.models import F, FilteredRelation, Q
+from django.db.models.functions import Coalesce
+
+from .models import MenuItem, MenuItemOverride
+
+
+def effective_items(restaurant_id, queryset=None):
+    """
+    Блюда с аннотациями effective_price и effective_available для филиала
+    (одним запросом).
+    """
+    queryset = MenuItem.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        branch=FilteredRelation('overrides', condition=Q(overrides__restaurant_id=restaurant_id))
+    ).annotate(
+        effective_price=Coalesce(F('branch__price'), F('price')),
+        effective_available=Coalesce(F('branch__is_available'), F('is_available')),
+    )
+
+
+def override_map(restaurant_id):
+    """Настройки филиала: {menu_item_id: (цена или None, доступность или None)}"""
+    return {
+        item_id: (price, is_available)
+        for item_id, price, is_available in MenuItemOverride.objects.filter(
+            restaurant_id=restaurant_id
+        ).values_list('menu_item_id', 'price', 'is_available')
+    }
+
+
+def resolve(menu_item, restaurant_id):
+    """Цена и доступность блюда в филиале: (Decimal, bool)"""
+    override = MenuItemOverride.objects.filter(
+        restaurant_id=restaurant_id, menu_item_id=menu_item.pk
+    ).values_list('price', 'is_available').first()
+    price, is_available = override or (None, None)
+    return (
+        menu_item.price if price is None else price,
+        menu_item.is_available if is_available is None else is_available,
+    )
+
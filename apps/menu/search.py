@@ -0,0 +1,135 @@
+# apps/menu/search.py
+"""
+Полнотекстовый поиск по меню.
+
+SQLite: виртуальная таблица FTS5 menu_search (rowid = id блюда) с
+основами слов названия, категории и описания - стемминг и приведение
+регистра выполняются в Python (apps.menu.text), поэтому «Шашлыки» и
+«шашлык» совпадают, а LIKE с его ASCII-only регистронезависимостью не
+используется. Каждое слово запроса ищется по префиксу, результаты
+ранжируются bm25 с весами: название > категория > описание.
+
+PostgreSQL: tsvector с конфигурацией russian и префиксными запросами,
+ранжирование ts_rank. На прочих СУБД - прежний поиск через icontains.
+
+Индекс FTS5 обновляется сигналами (см. signals) и командой
+manage.py rebuild_menu_search.
+"""
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import MenuItem
+from .text import stem, stems, tokenize
+
+TABLE = 'menu_search'
+
+# Веса bm25 для колонок (name, category, description)
+WEIGHTS = (10.0, 3.0, 1.0)
+
+CREATE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE}
+    USING fts5(name, category, description, tokenize = 'unicode61 remove_diacritics 0')
+"""
+
+
+def is_fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def _rows(item_ids=None):
+    items = MenuItem.objects.all()
+    if item_ids is not None:
+        items = items.filter(id__in=item_ids)
+    for item_id, name, category, description in items.values_list(
+        'id', 'name', 'category__name', 'description'
+    ).iterator():
+        yield item_id, stems(name), stems(category), stems(description)
+
+
+def index_items(item_ids):
+    """Переиндексация блюд (новых, измененных или удаленных)"""
+    if not is_fts_available() or not item_ids:
+        return
+    item_ids = list(item_ids)
+    placeholders = ', '.join(['%s'] * len(item_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', item_ids)
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, name, category, description) VALUES (%s, %s, %s, %s)',
+            list(_rows(item_ids))
+        )
+
+
+def rebuild_index():
+    """Полная пересборка индекса; возвращает число проиндексированных блюд"""
+    if not is_fts_available():
+        return 0
+    rows = list(_rows())
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, name, category, description) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+    return len(rows)
+
+
+def _fts_query(tokens):
+    # Основы состоят только из букв и цифр, кавычки защищают от синтаксиса FTS5
+    return ' '.join(f'"{stem(token)}"*' for token in tokens)
+
+
+def search_ids(query, limit=200):
+    """id блюд, подходящих под запрос, в порядке релевантности (только SQLite)"""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'ORDER BY bm25({TABLE}, %s, %s, %s) LIMIT %s',
+            [_fts_query(tokens), *WEIGHTS, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_menu_items(query, queryset=None, limit=200):
+    """
+    Блюда, найденные по запросу, отсортированные по релевантности.
+
+    queryset - исходная выборка блюд (например, уже отфильтрованная по
+    категории); по умолчанию все блюда.
+    """
+    queryset = MenuItem.objects.all() if queryset is None else queryset
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+
+    if is_fts_available():
+        ids = search_ids(query, limit)
+        rank = Case(
+            *[When(pk=item_id, then=Value(position)) for position, item_id in enumerate(ids)],
+            output_field=IntegerField()
+        )
+        return queryset.filter(pk__in=ids).order_by(rank) if ids else queryset.none()
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = (
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector('category__name', weight='B', config='russian')
+            + SearchVector('description', weight='C', config='russian')
+        )
+        search_query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens), search_type='raw', config='russian'
+        )
+        return queryset.annotate(search=vector).filter(search=search_query).annotate(
+            rank=SearchRank(F('search'), search_query)
+        ).order_by('-rank')[:limit]
+
+    condition = Q()
+    for token in tokens:
+        condition &= Q(name__icontains=token) | Q(description__icontains=token)
+    return queryset.filter(condition)
@@ -0,0 +1,41 @@
+# apps/menu/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, MenuItem, MenuItemOverride
+from .search import index_items
+from .snapshot import invalidate_snapshots
+from . import typeahead
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=Category)
+def menu_changed(sender, **kwargs):
+    """Снимки меню и индексы быстрого поиска пересобираются после фиксации изменений"""
+    transaction.on_commit(invalidate_snapshots)
+    transaction.on_commit(typeahead.reset)
+
+
+@receiver([post_save, post_delete], sender=MenuItemOverride)
+def override_changed(sender, instance, **kwargs):
+    """Настройка блюда в филиале меняет только снимок этого филиала"""
+    restaurant_id = instance.restaurant_id
+    transaction.on_commit(lambda: invalidate_snapshots([restaurant_id]))
+    transaction.on_commit(typeahead.reset)
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+def reindex_menu_item(sender, instance, **kwargs):
+    """Поисковый индекс блюда (удаленное блюдо просто исчезает из индекса)"""
+    item_id = instance.pk
+    transaction.on_commit(lambda: index_items([item_id]))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, created, **kwargs):
+    """Название категории входит в индекс всех ее блюд"""
+    if created:
+        return
+    item_ids = list(instance.menu_items.values_list('id', flat=True))
+    transaction.on_commit(lambda: index_items(item_ids))
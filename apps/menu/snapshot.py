@@ -0,0 +1,133 @@
+# apps/menu/snapshot.py
+"""
+Снимки меню для касс и AJAX-запросов.
+
+Активное меню филиала (категории, блюда, цены и доступность с учетом
+настроек филиала, признаки, ссылки на изображения) компилируется в
+компактный JSON, сжимается и хранится в MenuSnapshot с версией - хешем
+содержимого. Пересборка происходит только после изменения
+MenuItem/Category (см. signals), а если изменение не затронуло меню
+(например, себестоимость), версия остается прежней и кассы продолжают
+получать 304.
+
+Каждый процесс держит в памяти сжатую копию последней версии: на запрос
+в базу уходит только проверка версии снимка.
+"""
+import gzip
+import hashlib
+import json
+from collections import namedtuple
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from apps.restaurants.models import Restaurant
+from .models import Category, MenuItem, MenuSnapshot
+from .overrides import effective_items
+
+Snapshot = namedtuple('Snapshot', ['version', 'payload'])
+
+# restaurant_id -> (Snapshot, разобранное меню или None)
+_memory = {}
+
+
+def _image_url(name):
+    return default_storage.url(name) if name else None
+
+
+def compile_menu(restaurant_id):
+    """Меню ресторана (с ценами и доступностью филиала) в виде словаря, готового к сериализации"""
+    categories = list(Category.objects.filter(is_active=True).order_by('sort_order', 'name').values(
+        'id', 'name', 'image'
+    ))
+    dishes = {category['id']: [] for category in categories}
+    items = effective_items(restaurant_id, MenuItem.objects.filter(category_id__in=list(dishes)))
+    for item in items.order_by('sort_order', 'name').values(
+        'id', 'category_id', 'name', 'description', 'effective_price', 'image', 'effective_available',
+        'is_spicy', 'is_vegetarian', 'is_popular', 'preparation_time', 'weight', 'calories'
+    ):
+        category_id = item.pop('category_id')
+        item['price'] = str(item.pop('effective_price'))
+        item['is_available'] = item.pop('effective_available')
+        item['image'] = _image_url(item['image'])
+        dishes[category_id].append(item)
+
+    return {
+        'restaurant': restaurant_id,
+        'categories': [
+            {
+                'id': category['id'],
+                'name': category['name'],
+                'image': _image_url(category['image']),
+                'dishes': dishes[category['id']],
+            }
+            for category in categories
+        ],
+    }
+
+
+def build_snapshot(restaurant_id):
+    """
+    Компиляция и сохранение снимка; возвращает Snapshot.
+
+    Если меню изменилось во время сборки (ревизия выросла), снимок
+    остается устаревшим и будет собран заново при следующем запросе.
+    """
+    restaurant = Restaurant.objects.get(pk=restaurant_id)
+    row, _ = MenuSnapshot.objects.get_or_create(
+        restaurant=restaurant,
+        defaults={'version': '', 'payload': b'', 'is_stale': True}
+    )
+
+    raw = json.dumps(compile_menu(restaurant_id), ensure_ascii=False, separators=(',', ':')).encode()
+    version = hashlib.sha256(raw).hexdigest()[:32]
+    payload = gzip.compress(raw, mtime=0)
+    MenuSnapshot.objects.filter(pk=row.pk, revision=row.revision).update(
+        version=version, payload=payload, is_stale=False, built_at=timezone.now()
+    )
+    return Snapshot(version, payload)
+
+
+def get_snapshot(restaurant_id):
+    """
+    Актуальный снимок меню ресторана.
+
+    Проверяет версию одним запросом; сжатые данные читаются из базы,
+    только если в памяти процесса другая версия. Для несуществующего
+    ресторана выбрасывает Restaurant.DoesNotExist.
+    """
+    row = MenuSnapshot.objects.filter(restaurant_id=restaurant_id).values_list('version', 'is_stale').first()
+    if row is None or row[1]:
+        snapshot = build_snapshot(restaurant_id)
+    else:
+        cached = _memory.get(restaurant_id)
+        if cached and cached[0].version == row[0]:
+            return cached[0]
+        snapshot = Snapshot(row[0], bytes(
+            MenuSnapshot.objects.values_list('payload', flat=True).get(restaurant_id=restaurant_id)
+        ))
+    _memory[restaurant_id] = (snapshot, None)
+    return snapshot
+
+
+def get_menu(restaurant_id):
+    """Разобранное меню ресторана (для серверных потребителей снимка)"""
+    snapshot = get_snapshot(restaurant_id)
+    cached = _memory.get(restaurant_id)
+    if cached and cached[0] is snapshot and cached[1] is not None:
+        return cached[1]
+    menu = json.loads(gzip.decompress(snapshot.payload))
+    _memory[restaurant_id] = (snapshot, menu)
+    return menu
+
+
+def invalidate_snapshots(restaurant_ids=None):
+    """
+    Пометить снимки устаревшими (вызывается после изменения меню);
+    restaurant_ids - только снимки этих филиалов (настройки филиала)
+    """
+    snapshots = MenuSnapshot.objects.all()
+    if restaurant_ids is not None:
+        snapshots = snapshots.filter(restaurant_id__in=list(restaurant_ids))
+    snapshots.update(is_stale=True, revision=F('revision') + 1)
@@ -0,0 +1,127 @@
+# apps/menu/text.py
+"""
+Нормализация текста для поиска по меню.
+
+Приведение регистра (casefold работает и для кириллицы, в отличие от
+LIKE в SQLite), замена ё на е, разбиение на слова и стемминг русских
+слов по алгоритму Snowball (Porter) - чтобы «шашлыки», «шашлыка» и
+«шашлык» находились одним запросом.
+"""
+import re
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-я]')
+
+VOWELS = set('аеиоуыэюя')
+
+PERFECTIVE_GERUND = (('в', 'вши', 'вшись'), ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+ADJECTIVE = ((), ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+                  'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'))
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+        ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен',
+         'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ((), ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой', 'ий',
+             'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю',
+             'ия', 'ья', 'я'))
+SUPERLATIVE = ((), ('ейше', 'ейш'))
+DERIVATIONAL = ((), ('ость', 'ост'))
+
+
+def normalize(text):
+    """Регистр и ё: «Ёжик» -> «ежик»"""
+    return (text or '').casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    """Слова нормализованного текста"""
+    return WORD_RE.findall(normalize(text))
+
+
+def _regions(word):
+    """Начала областей RV и R2 алгоритма Snowball"""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _ending(word, start, groups):
+    """
+    Самое длинное окончание из groups, целиком лежащее в области start.
+
+    groups - пара (окончания после «а»/«я», прочие окончания); буква
+    «а»/«я» перед окончанием первой группы тоже должна быть в области
+    и не удаляется.
+    """
+    after_a, other = groups
+    best = ''
+    for ending in after_a:
+        cut = len(word) - len(ending)
+        if len(ending) > len(best) and word.endswith(ending) and cut - 1 >= start and word[cut - 1] in 'ая':
+            best = ending
+    for ending in other:
+        if len(ending) > len(best) and word.endswith(ending) and len(word) - len(ending) >= start:
+            best = ending
+    return best
+
+
+def stem(word):
+    """Основа русского слова; слова не на кириллице возвращаются как есть"""
+    word = normalize(word)
+    if not CYRILLIC_RE.search(word):
+        return word
+    rv, r2 = _regions(word)
+
+    ending = _ending(word, rv, PERFECTIVE_GERUND)
+    if ending:
+        word = word[:-len(ending)]
+    else:
+        ending = _ending(word, rv, REFLEXIVE)
+        if ending:
+            word = word[:-len(ending)]
+        ending = _ending(word, rv, ADJECTIVE)
+        if ending:
+            word = word[:-len(ending)]
+            ending = _ending(word, rv, PARTICIPLE)
+            if ending:
+                word = word[:-len(ending)]
+        else:
+            ending = _ending(word, rv, VERB) or _ending(word, rv, NOUN)
+            if ending:
+                word = word[:-len(ending)]
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    ending = _ending(word, r2, DERIVATIONAL)
+    if ending:
+        word = word[:-len(ending)]
+
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    else:
+        ending = _ending(word, rv, SUPERLATIVE)
+        if ending:
+            word = word[:-len(ending)]
+            if word.endswith('нн'):
+                word = word[:-1]
+        elif word.endswith('ь') and len(word) - 1 >= rv:
+            word = word[:-1]
+    return word
+
+
+def stems(text):
+    """Основы всех слов текста через пробел (для индекса)"""
+    return ' '.join(stem(token) for token in tokenize(text))
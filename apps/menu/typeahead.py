@@ -0,0 +1,162 @@
+# apps/menu/typeahead.py
+"""
+Быстрый поиск блюд при наборе на кассе.
+
+Индекс строится в памяти процесса из снимка меню ресторана
+(apps.menu.snapshot) и не обращается к базе при поиске:
+    - префиксное дерево по словам названий: «шаш» -> «Шашлык из баранины»,
+      «цез» -> «Салат Цезарь»;
+    - триграммы названий: находят блюдо при опечатке («шашоык»);
+    - перевод раскладки: «ifiksr», набранное в латинской раскладке,
+      ищется как «шашлык» (и наоборот).
+
+Версия снимка проверяется не чаще раза в REFRESH_SECONDS; изменения меню
+в этом же процессе сбрасывают индекс сразу (см. signals).
+"""
+import time
+from collections import Counter
+
+from .snapshot import get_menu, get_snapshot
+from .text import normalize, tokenize
+
+REFRESH_SECONDS = 30
+MIN_TRIGRAM_SCORE = 0.45
+
+LATIN = "`qwertyuiop[]asdfghjkl;'zxcvbnm,."
+CYRILLIC = 'ёйцукенгшщзхъфывапролджэячсмитьбю'
+TO_CYRILLIC = str.maketrans(LATIN, CYRILLIC)
+TO_LATIN = str.maketrans(CYRILLIC, LATIN)
+
+
+def layout_variants(query):
+    """Запрос как есть и в другой раскладке клавиатуры"""
+    query = normalize(query)
+    variants = [query]
+    for table in (TO_CYRILLIC, TO_LATIN):
+        swapped = query.translate(table)
+        if swapped not in variants:
+            variants.append(swapped)
+    return variants
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class TypeaheadIndex:
+    """Индекс доступных блюд одного меню"""
+
+    def __init__(self, dishes):
+        self.dishes = {}
+        self.root = TrieNode()
+        self.trigrams = {}
+        for dish in dishes:
+            self.add(dish)
+
+    @classmethod
+    def from_menu(cls, menu):
+        return cls(
+            dict(dish, category=category['name'])
+            for category in menu['categories']
+            for dish in category['dishes'] if dish['is_available']
+        )
+
+    def add(self, dish):
+        dish_id = dish['id']
+        name = ' '.join(tokenize(dish['name']))
+        self.dishes[dish_id] = {
+            'id': dish_id,
+            'name': dish['name'],
+            'category': dish.get('category'),
+            'price': dish['price'],
+            'normalized': name,
+        }
+        for word in name.split():
+            node = self.root
+            for char in word:
+                node = node.children.setdefault(char, TrieNode())
+                node.ids.add(dish_id)
+        for trigram in trigrams(name):
+            self.trigrams.setdefault(trigram, set()).add(dish_id)
+
+    def _prefix(self, token):
+        node = self.root
+        for char in token:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.ids
+
+    def _prefix_matches(self, text):
+        tokens = tokenize(text)
+        if not tokens:
+            return set()
+        matches = set(self._prefix(tokens[0]))
+        for token in tokens[1:]:
+            matches &= self._prefix(token)
+        return matches
+
+    def _trigram_matches(self, text):
+        query = trigrams(' '.join(tokenize(text)))
+        counts = Counter()
+        for trigram in query:
+            counts.update(self.trigrams.get(trigram, ()))
+        return {dish_id: shared / len(query) for dish_id, shared in counts.items()
+                if shared / len(query) >= MIN_TRIGRAM_SCORE}
+
+    def search(self, query, limit=10):
+        """
+        Блюда по набранному тексту: сначала совпадения по префиксам слов
+        (выше - если название начинается с запроса), затем похожие по
+        триграммам. Возвращает список словарей id, name, category, price.
+        """
+        scores = {}
+        for variant in layout_variants(query):
+            text = ' '.join(tokenize(variant))
+            for dish_id in self._prefix_matches(variant):
+                starts = self.dishes[dish_id]['normalized'].startswith(text)
+                scores[dish_id] = max(scores.get(dish_id, 0), 3 if starts else 2)
+        if len(scores) < limit:
+            for variant in layout_variants(query):
+                for dish_id, score in self._trigram_matches(variant).items():
+                    scores[dish_id] = max(scores.get(dish_id, 0), score)
+
+        best = sorted(scores, key=lambda dish_id: (-scores[dish_id], self.dishes[dish_id]['name']))[:limit]
+        return [
+            {key: self.dishes[dish_id][key] for key in ('id', 'name', 'category', 'price')}
+            for dish_id in best
+        ]
+
+
+# restaurant_id -> (версия снимка, индекс, время проверки версии)
+_indexes = {}
+
+
+def get_index(restaurant_id):
+    """Индекс ресторана; версия снимка перепроверяется раз в REFRESH_SECONDS"""
+    now = time.monotonic()
+    cached = _indexes.get(restaurant_id)
+    if cached and now - cached[2] < REFRESH_SECONDS:
+        return cached[1]
+
+    snapshot = get_snapshot(restaurant_id)
+    if cached and cached[0] == snapshot.version:
+        index = cached[1]
+    else:
+        index = TypeaheadIndex.from_menu(get_menu(restaurant_id))
+    _indexes[restaurant_id] = (snapshot.version, index, now)
+    return index
+
+
+def reset():
+    """Сбросить индексы процесса после изменения меню"""
+    _indexes.clear()
@@ -13,13 +13,23 @@ urlpatterns = [
     path('item/<int:pk>/update/', views.MenuItemUpdateView.as_view(), name='item_update'),
     path('item/<int:pk>/delete/', views.MenuItemDeleteView.as_view(), name='item_delete'),
 
+    # Массовое редактирование и импорт цен
+    path('bulk/', views.BulkMenuEditView.as_view(), name='bulk_edit'),
+    path('bulk/import/', views.MenuImportView.as_view(), name='import'),
+    path('branch/', views.BranchMenuView.as_view(), name='branch_menu'),
+
     # CRUD для категорий
     path('categories/', views.CategoryListView.as_view(), name='category_list'),
     path('categories/create/', views.CategoryCreateView.as_view(), name='category_create'),
     path('categories/<int:pk>/update/', views.CategoryUpdateView.as_view(), name='category_update'),
     path('categories/<int:pk>/delete/', views.CategoryDeleteView.as_view(), name='category_delete'),
 
+    # Снимок меню для касс
+    path('snapshot/<int:restaurant_id>/', views.MenuSnapshotView.as_view(), name='snapshot'),
+
     # AJAX endpoints
     path('ajax/dish/<int:pk>/toggle-availability/', views.toggle_dish_availability, name='toggle_dish_availability'),
     path('ajax/category/<int:category_id>/dishes/', views.get_category_dishes, name='get_category_dishes'),
+    path('ajax/typeahead/', views.dish_typeahead, name='dish_typeahead'),
+    path('ajax/bulk-update/', views.bulk_update_menu, name='bulk_update'),
 ]
\ No newline at end of file
@@ -1,14 +1,25 @@
 # apps/menu/views.py
-from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
+import gzip
+import json
+
+from django.urls import reverse, reverse_lazy
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, FormView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.db.models import Q
-from django.shortcuts import redirect
-from django.http import JsonResponse
+from django.db.models import F
+from django.shortcuts import get_object_or_404, redirect, render
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, Http404
+from django.utils.http import parse_etags, quote_etag
+from django.views import View
 
+from apps.restaurants.models import Restaurant
 from .models import MenuItem, Category
-from .forms import CategoryForm, MenuItemForm, CategoryFilterForm
+from .forms import CategoryForm, MenuItemForm, CategoryFilterForm, MenuImportForm
+from .bulk import MenuImportError, apply_menu_changes, import_menu_changes, parse_change, parse_price, save_overrides
+from .overrides import effective_items
+from .snapshot import get_snapshot, get_menu
+from .search import search_menu_items
+from .typeahead import get_index
 
 
 class MenuListView(LoginRequiredMixin, ListView):
@@ -34,12 +45,6 @@ class MenuListView(LoginRequiredMixin, ListView):
         if search_query or category_filter or availability_filter:
             dishes_query = MenuItem.objects.all()
 
-            if search_query:
-                dishes_query = dishes_query.filter(
-                    Q(name__icontains=search_query) |
-                    Q(description__icontains=search_query)
-                )
-
             if category_filter:
                 dishes_query = dishes_query.filter(category_id=category_filter)
 
@@ -48,6 +53,10 @@ class MenuListView(LoginRequiredMixin, ListView):
             elif availability_filter == 'unavailable':
                 dishes_query = dishes_query.filter(is_available=False)
 
+            if search_query:
+                # Полнотекстовый поиск с учетом морфологии, по релевантности
+                dishes_query = search_menu_items(search_query, dishes_query)
+
             context['filtered_dishes'] = dishes_query
             context['is_filtered'] = True
         else:
@@ -122,6 +131,149 @@ class MenuItemDeleteView(LoginRequiredMixin, DeleteView):
         return redirect(success_url)
 
 
+class BulkMenuEditView(LoginRequiredMixin, View):
+    """
+    Массовое редактирование цен, доступности и порядка блюд одной формой
+    (изменения применяются одной транзакцией, см. apps.menu.bulk)
+    """
+    template_name = 'menu/bulk_edit.html'
+
+    def get_items(self):
+        items = MenuItem.objects.select_related('category').order_by(
+            'category__sort_order', 'category__name', 'sort_order', 'name'
+        )
+        category = self.request.GET.get('category')
+        if category:
+            items = items.filter(category_id=category)
+        return items
+
+    def get(self, request):
+        return render(request, self.template_name, {
+            'items': self.get_items(),
+            'all_categories': Category.objects.filter(is_active=True),
+            'category_filter': request.GET.get('category', ''),
+        })
+
+    def post(self, request):
+        changes = {}
+        errors = []
+        for item_id in request.POST.getlist('item'):
+            try:
+                changes[int(item_id)] = parse_change({
+                    'price': request.POST.get(f'price_{item_id}'),
+                    'is_available': f'available_{item_id}' in request.POST,
+                    'sort_order': request.POST.get(f'sort_{item_id}'),
+                })
+            except ValueError as e:
+                errors.append(str(e))
+
+        report = apply_menu_changes(changes, user=request.user)
+        if report['applied']:
+            messages.success(
+                request,
+                f'Изменено блюд: {len(report["applied"])}, цен: {report["prices"]}'
+            )
+        else:
+            messages.info(request, 'Изменений нет')
+        for error in errors:
+            messages.error(request, error)
+
+        url = reverse('menu:bulk_edit')
+        if request.GET.get('category'):
+            url += f'?category={request.GET["category"]}'
+        return redirect(url)
+
+
+class BranchMenuView(LoginRequiredMixin, View):
+    """
+    Цены и стоп-лист филиала: собственная цена и доступность блюда в
+    выбранном ресторане (пустое значение - как в общем меню)
+    """
+    template_name = 'menu/branch_menu.html'
+
+    def get_restaurant(self):
+        restaurant_id = self.request.GET.get('restaurant')
+        if not restaurant_id:
+            return None
+        return get_object_or_404(Restaurant, pk=restaurant_id)
+
+    def get(self, request):
+        restaurant = self.get_restaurant()
+        items = None
+        if restaurant:
+            items = effective_items(restaurant.id, MenuItem.objects.select_related('category')).annotate(
+                override_price=F('branch__price'),
+                override_available=F('branch__is_available'),
+            ).order_by('category__sort_order', 'category__name', 'sort_order', 'name')
+        return render(request, self.template_name, {
+            'restaurant': restaurant,
+            'restaurants': Restaurant.objects.all().order_by('name'),
+            'items': items,
+        })
+
+    def post(self, request):
+        restaurant = self.get_restaurant()
+        if restaurant is None:
+            return redirect('menu:branch_menu')
+
+        overrides = {}
+        errors = []
+        # id блюд из формы сверяются с меню: битый или чужой id - ошибка строки, а не 500
+        known = {str(pk): pk for pk in MenuItem.objects.values_list('pk', flat=True)}
+        for item_id in request.POST.getlist('item'):
+            if item_id not in known:
+                errors.append(f'Неизвестное блюдо «{item_id}»')
+                continue
+            raw_price = request.POST.get(f'price_{item_id}', '').strip()
+            available = request.POST.get(f'available_{item_id}', '')
+            try:
+                price = parse_price(raw_price) if raw_price else None
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            overrides[known[item_id]] = (price, {'1': True, '0': False}.get(available))
+
+        count = save_overrides(restaurant.id, overrides)
+        messages.success(request, f'Настройки филиала {restaurant.name} сохранены: блюд с особыми условиями - {count}')
+        for error in errors:
+            messages.error(request, error)
+        return redirect(f'{reverse("menu:branch_menu")}?restaurant={restaurant.id}')
+
+
+class MenuImportView(LoginRequiredMixin, FormView):
+    """Импорт цен, доступности и порядка блюд из CSV/XLSX"""
+    form_class = MenuImportForm
+    template_name = 'menu/import.html'
+
+    def form_valid(self, form):
+        file = form.cleaned_data['file']
+        try:
+            report = import_menu_changes(file, file.name, user=self.request.user)
+        except MenuImportError as e:
+            form.add_error('file', str(e))
+            return self.form_invalid(form)
+
+        if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': True, 'report': report})
+
+        if report['applied']:
+            messages.success(
+                self.request,
+                f'Импорт выполнен: изменено блюд - {len(report["applied"])}, цен - {report["prices"]}'
+            )
+        if report['errors'] or report['unknown']:
+            messages.warning(
+                self.request,
+                f'Пропущено строк: {len(report["errors"]) + len(report["unknown"])}'
+            )
+        return self.render_to_response(self.get_context_data(form=self.form_class(), report=report))
+
+    def form_invalid(self, form):
+        if self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'success': False, 'errors': form.errors})
+        return super().form_invalid(form)
+
+
 # НОВЫЕ VIEWS ДЛЯ УПРАВЛЕНИЯ КАТЕГОРИЯМИ
 class CategoryListView(LoginRequiredMixin, ListView):
     """
@@ -138,10 +290,10 @@ class CategoryListView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         categories = context['categories']
 
-        # Подсчитываем статистику
-        total_dishes = sum(cat.get_dishes_count() for cat in categories)
+        # Статистика по счетчикам категорий - без запросов к блюдам
+        total_dishes = sum(cat.available_dishes_count for cat in categories)
         categories_with_images = sum(1 for cat in categories if cat.image)
-        empty_categories = sum(1 for cat in categories if cat.get_dishes_count() == 0)
+        empty_categories = sum(1 for cat in categories if cat.available_dishes_count == 0)
 
         context.update({
             'total_dishes': total_dishes,
@@ -238,11 +390,56 @@ def toggle_dish_availability(request, pk):
     return JsonResponse({'success': False, 'message': 'Недопустимый запрос'})
 
 
+def bulk_update_menu(request):
+    """
+    AJAX массовое изменение блюд.
+
+    Тело запроса - JSON {"items": [{"id": 1, "price": "450", "is_available":
+    true, "sort_order": 3}, ...]}; любое поле, кроме id, можно опустить.
+    Все изменения применяются одной транзакцией или не применяются вовсе.
+    """
+    if request.method != 'POST' or not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'Недопустимый запрос'})
+
+    try:
+        items = json.loads(request.body)['items']
+        ids = [int(item['id']) for item in items]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'message': 'Некорректный формат запроса'})
+    try:
+        changes = {item_id: parse_change(item) for item_id, item in zip(ids, items)}
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)})
+
+    report = apply_menu_changes(changes, user=request.user)
+    return JsonResponse({'success': True, 'report': report})
+
+
 def get_category_dishes(request, category_id):
     """
     AJAX получение блюд категории
+
+    Если известен ресторан (параметр restaurant или филиал сотрудника),
+    блюда берутся из снимка меню без запросов к MenuItem.
     """
     if request.user.is_authenticated:
+        restaurant_id = request.GET.get('restaurant') or getattr(
+            getattr(request.user, 'employee', None), 'restaurant_id', None
+        )
+        if restaurant_id:
+            try:
+                menu = get_menu(int(restaurant_id))
+            except (ValueError, Restaurant.DoesNotExist):
+                return JsonResponse({'success': False, 'message': 'Ресторан не найден'})
+            category = next((c for c in menu['categories'] if c['id'] == category_id), None)
+            if category is None:
+                return JsonResponse({'success': False, 'message': 'Категория не найдена'})
+            return JsonResponse({
+                'success': True,
+                'dishes': category['dishes'],
+                'category_name': category['name']
+            })
+
         try:
             category = Category.objects.get(pk=category_id)
             dishes = category.menu_items.all().values(
@@ -256,4 +453,60 @@ def get_category_dishes(request, category_id):
         except Category.DoesNotExist:
             return JsonResponse({'success': False, 'message': 'Категория не найдена'})
 
-    return JsonResponse({'success': False, 'message': 'Не авторизован'})
\ No newline at end of file
+    return JsonResponse({'success': False, 'message': 'Не авторизован'})
+
+
+def dish_typeahead(request):
+    """
+    AJAX подсказки блюд для кассы по набранному тексту (?q=)
+
+    Ресторан - параметр restaurant или филиал сотрудника. Поиск идет по
+    индексу в памяти процесса, без запросов к базе.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'Не авторизован'})
+
+    restaurant_id = request.GET.get('restaurant') or getattr(
+        getattr(request.user, 'employee', None), 'restaurant_id', None
+    )
+    try:
+        index = get_index(int(restaurant_id))
+    except (TypeError, ValueError, Restaurant.DoesNotExist):
+        return JsonResponse({'success': False, 'message': 'Ресторан не найден'})
+
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        limit = 10
+    return JsonResponse({'success': True, 'results': index.search(request.GET.get('q', ''), limit)})
+
+
+class MenuSnapshotView(LoginRequiredMixin, View):
+    """
+    Снимок меню ресторана для касс.
+
+    Ответ помечен ETag = версия снимка; касса присылает If-None-Match и,
+    пока меню не менялось, получает 304 без тела. Клиентам с поддержкой
+    gzip отдаются хранимые сжатые данные как есть.
+    """
+
+    def get(self, request, restaurant_id):
+        try:
+            snapshot = get_snapshot(restaurant_id)
+        except Restaurant.DoesNotExist:
+            raise Http404('Ресторан не найден')
+
+        etag = quote_etag(snapshot.version)
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(snapshot.payload, content_type='application/json; charset=utf-8')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(snapshot.payload), content_type='application/json; charset=utf-8')
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Accept-Encoding'
+        return response
@@ -1,14 +1,37 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, Promotion
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     raw_id_fields = ['menu_item'] # Удобнее для поиска блюда
     extra = 1
+    readonly_fields = ['discount', 'promotion']
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'restaurant', 'status', 'created_at', 'total_price')
     list_filter = ('status', 'restaurant')
     date_hierarchy = 'created_at'
-    inlines = [OrderItemInline]
\ No newline at end of file
+    inlines = [OrderItemInline]
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'discount_type', 'value', 'restaurant', 'is_combo', 'min_quantity',
+                    'weekdays', 'start_time', 'end_time', 'is_active', 'priority')
+    list_filter = ('is_active', 'discount_type', 'is_combo', 'restaurant')
+    search_fields = ('name',)
+    list_editable = ('is_active', 'priority')
+    filter_horizontal = ('categories', 'menu_items')
+
+    fieldsets = (
+        ('Скидка', {
+            'fields': ('name', 'discount_type', 'value', 'is_active', 'priority')
+        }),
+        ('Условия', {
+            'fields': ('restaurant', 'categories', 'menu_items', 'is_combo', 'min_quantity')
+        }),
+        ('Время действия', {
+            'fields': ('weekdays', 'start_time', 'end_time', 'starts_on', 'ends_on')
+        }),
+    )
@@ -0,0 +1,119 @@
+# apps/orders/management/commands/benchmark_promotions.py
+import random
+import time
+from datetime import datetime, time as dtime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Promotion
+from apps.orders.promotions import PromotionEngine, Rule
+
+# Правил, относящихся к блюдам и филиалам заказов, в сценарии «фон»
+RELEVANT_RULES = 200
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер времени расчета скидок заказа в зависимости от числа активных акций '
+        '(синтетические правила, база не используется)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rules', type=int, nargs='+', default=[100, 1000, 10000, 30000],
+                            help='Число правил в каждом замере')
+        parser.add_argument('--lines', type=int, default=12, help='Позиций в заказе')
+        parser.add_argument('--repeat', type=int, default=1000, help='Расчетов на замер')
+        parser.add_argument('--items', type=int, default=500, help='Блюд в меню')
+        parser.add_argument('--categories', type=int, default=20, help='Категорий в меню')
+        parser.add_argument('--restaurants', type=int, default=10, help='Филиалов')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def _rule(self, rng, rule_id, items, categories, restaurants):
+        start = rng.randrange(0, 24)
+        kind = rng.random()
+        item_ids = category_ids = ()
+        if kind < 0.5:
+            item_ids = rng.sample(items, rng.randint(1, 3))
+        elif kind < 0.8:
+            category_ids = [rng.choice(categories)]
+        return Rule(
+            rule_id,
+            rng.choice([Promotion.DiscountType.PERCENT, Promotion.DiscountType.AMOUNT]),
+            Decimal(rng.randint(5, 30)),
+            restaurant_id=rng.choice([None, rng.choice(restaurants)]) if restaurants else None,
+            item_ids=item_ids,
+            category_ids=category_ids,
+            is_combo=len(item_ids) > 1 and rng.random() < 0.3,
+            min_quantity=rng.choice([1, 1, 1, 2, 3]),
+            weekdays=''.join(sorted(rng.sample('1234567', rng.randint(1, 7)))),
+            start_time=dtime(start),
+            end_time=dtime((start + rng.randint(1, 6)) % 24),
+            priority=rng.randrange(10),
+        )
+
+    def _measure(self, engine, orders, repeat):
+        discounted = 0
+        started = time.perf_counter()
+        for n in range(repeat):
+            restaurant_id, moment, lines = orders[n % len(orders)]
+            discounted += sum(1 for _, rule in engine.evaluate(restaurant_id, moment, lines) if rule)
+        return (time.perf_counter() - started) / repeat * 1e6, discounted / repeat
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        items = list(range(options['items']))
+        categories = list(range(options['categories']))
+        restaurants = list(range(options['restaurants']))
+        category_of = {item: item % options['categories'] for item in items}
+
+        # Заказы используют первую половину меню и филиалов - вторая половина
+        # остается «фоновым» акциям, не относящимся к заказам
+        order_items = items[:len(items) // 2]
+        order_restaurants = restaurants[:len(restaurants) // 2]
+        orders = [
+            (
+                rng.choice(order_restaurants),
+                datetime(2026, 1, 5 + rng.randrange(7), rng.randrange(24), rng.randrange(60)),
+                [
+                    (item, category_of[item], rng.randint(1, 4), Decimal(rng.randint(100, 900)))
+                    for item in rng.sample(order_items, options['lines'])
+                ],
+            )
+            for _ in range(200)
+        ]
+        relevant = [
+            self._rule(rng, rule_id, order_items, categories, order_restaurants)
+            for rule_id in range(RELEVANT_RULES)
+        ]
+
+        self.stdout.write(
+            'смесь - случайные акции по всему меню; '
+            f'фон - {RELEVANT_RULES} акций на блюда заказов и остальные на другие блюда и филиалы'
+        )
+        self.stdout.write(
+            f"{'правил':>8} {'сборка, мс':>12} {'смесь, мкс':>12} {'скидок':>8} {'фон, мкс':>10} {'скидок':>8}"
+        )
+        for count in options['rules']:
+            mixed = [self._rule(rng, rule_id, items, categories, restaurants) for rule_id in range(count)]
+            started = time.perf_counter()
+            engine = PromotionEngine(mixed)
+            build = (time.perf_counter() - started) * 1000
+            mixed_time, mixed_hits = self._measure(engine, orders, options['repeat'])
+
+            other_items = items[len(items) // 2:]
+            other_categories = [c + options['categories'] for c in categories]
+            other_restaurants = restaurants[len(restaurants) // 2:]
+            background = relevant + [
+                self._rule(rng, rule_id, other_items, other_categories, other_restaurants)
+                for rule_id in range(RELEVANT_RULES, max(count, RELEVANT_RULES))
+            ]
+            # Акции на все блюда без филиала относились бы ко всем заказам
+            background = [rule for rule in background if rule.id < RELEVANT_RULES or rule.restaurant_id is not None
+                          or rule.item_ids or rule.category_ids]
+            background_time, background_hits = self._measure(PromotionEngine(background), orders, options['repeat'])
+
+            self.stdout.write(
+                f'{count:>8} {build:>12.1f} {mixed_time:>12.1f} {mixed_hits:>8.2f} '
+                f'{background_time:>10.1f} {background_hits:>8.2f}'
+            )
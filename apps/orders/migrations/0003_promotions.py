@@ -0,0 +1,54 @@
+# Generated by Django 5.2.3 on 2026-10-19 12:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0007_menu_item_overrides'),
+        ('orders', '0002_order_ingredients_processed'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='discount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Скидка на всю позицию по акции', max_digits=10, verbose_name='Скидка'),
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активна')),
+                ('discount_type', models.CharField(choices=[('PERCENT', 'Процент'), ('AMOUNT', 'Сумма за единицу (за комбо)')], default='PERCENT', max_length=10, verbose_name='Тип скидки')),
+                ('value', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Размер скидки')),
+                ('is_combo', models.BooleanField(default=False, help_text='Скидка только если в заказе есть все выбранные блюда', verbose_name='Комбо')),
+                ('min_quantity', models.PositiveIntegerField(default=1, help_text='Минимальное количество блюда в позиции', verbose_name='От количества')),
+                ('weekdays', models.CharField(default='1234567', help_text='Номера дней: 1 - понедельник ... 7 - воскресенье', max_length=7, verbose_name='Дни недели')),
+                ('start_time', models.TimeField(blank=True, null=True, verbose_name='С')),
+                ('end_time', models.TimeField(blank=True, help_text='Окно может переходить через полночь (22:00-02:00)', null=True, verbose_name='До')),
+                ('starts_on', models.DateField(blank=True, null=True, verbose_name='Действует с')),
+                ('ends_on', models.DateField(blank=True, null=True, verbose_name='Действует по')),
+                ('priority', models.PositiveIntegerField(default=0, help_text='При равной скидке выбирается акция с большим приоритетом', verbose_name='Приоритет')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+                ('categories', models.ManyToManyField(blank=True, related_name='promotions', to='menu.category', verbose_name='Категории')),
+                ('menu_items', models.ManyToManyField(blank=True, related_name='promotions', to='menu.menuitem', verbose_name='Блюда')),
+                ('restaurant', models.ForeignKey(blank=True, help_text='Пусто - во всех филиалах', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='restaurants.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Акция',
+                'verbose_name_plural': 'Акции',
+                'ordering': ['-is_active', '-priority', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='orders.promotion', verbose_name='Акция'),
+        ),
+    ]
@@ -2,10 +2,12 @@ from django.db import models, transaction
 from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from decimal import Decimal
 from apps.restaurants.models import Restaurant
-from apps.menu.models import MenuItem
-from apps.inventory.models import StockItem
+from apps.menu.models import Category, MenuItem
+from apps.menu.overrides import resolve
+from apps.inventory.services import recipe_requirements, deduct_stock
 
 class Order(models.Model):
     class Status(models.TextChoices):
@@ -26,6 +28,7 @@ class Order(models.Model):
     status = models.CharField('Статус', max_length=20, choices=Status.choices, default=Status.PENDING)
     table_number = models.PositiveIntegerField('Номер стола', blank=True, null=True)
     ingredients_processed = models.BooleanField('Ингредиенты списаны', default=False)
+    completed_at = models.DateTimeField('Время завершения', null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'Заказ'
@@ -49,43 +52,12 @@ class Order(models.Model):
         if self.status not in [self.Status.IN_PROGRESS, self.Status.COMPLETED]:
             return {"success": False, "message": "Заказ должен быть в процессе или завершен"}
 
-        warnings = []
-
         try:
             with transaction.atomic():
-                for order_item in self.items.select_related('menu_item'):
-                    # Получаем рецепт блюда
-                    recipes = order_item.menu_item.recipe_items.select_related('ingredient')
-
-                    for recipe in recipes:
-                        # Находим запас на складе этого ресторана
-                        try:
-                            stock_item = StockItem.objects.get(
-                                ingredient=recipe.ingredient,
-                                restaurant=self.restaurant
-                            )
-
-                            # Рассчитываем нужное количество
-                            needed_amount = recipe.quantity * order_item.quantity
-
-                            if stock_item.quantity >= needed_amount:
-                                # Списываем со склада
-                                stock_item.quantity -= needed_amount
-                                stock_item.save()
-                            else:
-                                warnings.append(
-                                    f"Недостаточно {recipe.ingredient.name}: "
-                                    f"нужно {needed_amount} {recipe.ingredient.unit}, "
-                                    f"доступно {stock_item.quantity} {recipe.ingredient.unit}"
-                                )
-                                # Списываем все что есть
-                                stock_item.quantity = 0
-                                stock_item.save()
-
-                        except StockItem.DoesNotExist:
-                            warnings.append(
-                                f"Ингредиент {recipe.ingredient.name} отсутствует на складе"
-                            )
+                # Потребность по всем позициям заказа считается одним запросом,
+                # списание - одним UPDATE в базовых единицах
+                requirements = recipe_requirements(self.items.all())
+                warnings = deduct_stock(self.restaurant_id, requirements)
 
                 # Отмечаем что ингредиенты обработаны
                 self.ingredients_processed = True
@@ -104,8 +76,59 @@ class Order(models.Model):
         # Автоматический расчет суммы при сохранении
         if self.pk:  # Если заказ уже существует
             self.calculate_total()
+        # Время завершения - для распределения времени приготовления
+        if self.status == self.Status.COMPLETED and self.completed_at is None:
+            self.completed_at = timezone.now()
         super().save(*args, **kwargs)
 
+class Promotion(models.Model):
+    """
+    Акция: скидка на блюда по времени, дням недели, филиалу, категориям,
+    набору блюд (комбо) и количеству. Правила компилируются в индекс в
+    памяти и применяются ко всему заказу за один проход (см. promotions).
+    """
+
+    class DiscountType(models.TextChoices):
+        PERCENT = 'PERCENT', 'Процент'
+        AMOUNT = 'AMOUNT', 'Сумма за единицу (за комбо)'
+
+    name = models.CharField('Название', max_length=100)
+    is_active = models.BooleanField('Активна', default=True)
+    discount_type = models.CharField('Тип скидки', max_length=10, choices=DiscountType.choices,
+                                     default=DiscountType.PERCENT)
+    value = models.DecimalField('Размер скидки', max_digits=10, decimal_places=2)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='promotions', verbose_name='Ресторан',
+                                   help_text='Пусто - во всех филиалах')
+    categories = models.ManyToManyField(Category, blank=True, related_name='promotions',
+                                        verbose_name='Категории')
+    menu_items = models.ManyToManyField(MenuItem, blank=True, related_name='promotions',
+                                        verbose_name='Блюда')
+    is_combo = models.BooleanField('Комбо', default=False,
+                                   help_text='Скидка только если в заказе есть все выбранные блюда')
+    min_quantity = models.PositiveIntegerField('От количества', default=1,
+                                               help_text='Минимальное количество блюда в позиции')
+    weekdays = models.CharField('Дни недели', max_length=7, default='1234567',
+                                help_text='Номера дней: 1 - понедельник ... 7 - воскресенье')
+    start_time = models.TimeField('С', null=True, blank=True)
+    end_time = models.TimeField('До', null=True, blank=True,
+                                help_text='Окно может переходить через полночь (22:00-02:00)')
+    starts_on = models.DateField('Действует с', null=True, blank=True)
+    ends_on = models.DateField('Действует по', null=True, blank=True)
+    priority = models.PositiveIntegerField('Приоритет', default=0,
+                                           help_text='При равной скидке выбирается акция с большим приоритетом')
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    updated_at = models.DateTimeField('Обновлена', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Акция'
+        verbose_name_plural = 'Акции'
+        ordering = ['-is_active', '-priority', 'name']
+
+    def __str__(self):
+        return self.name
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE, verbose_name='Заказ')
     menu_item = models.ForeignKey(MenuItem, on_delete=models.PROTECT, verbose_name='Блюдо')
@@ -116,21 +139,25 @@ class OrderItem(models.Model):
         decimal_places=2,
         help_text='Цена за единицу на момент создания заказа'
     )
+    discount = models.DecimalField('Скидка', max_digits=10, decimal_places=2, default=0,
+                                   help_text='Скидка на всю позицию по акции')
+    promotion = models.ForeignKey(Promotion, on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='order_items', verbose_name='Акция')
 
     class Meta:
         verbose_name = 'Позиция заказа'
         verbose_name_plural = 'Позиции заказа'
 
     def get_cost(self):
-        return self.price_at_moment * self.quantity
+        return self.price_at_moment * self.quantity - self.discount
 
     def __str__(self):
         return f'{self.quantity} x {self.menu_item.name}'
 
     def save(self, *args, **kwargs):
-        # Автоматически сохраняем текущую цену при создании
+        # Автоматически сохраняем текущую цену филиала при создании
         if not self.price_at_moment:
-            self.price_at_moment = self.menu_item.price
+            self.price_at_moment, _ = resolve(self.menu_item, self.order.restaurant_id)
         super().save(*args, **kwargs)
 
         # Пересчитываем общую сумму заказа
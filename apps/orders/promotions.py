@@ -0,0 +1,280 @@
+# apps/orders/promotions.py
+"""
+Движок акций.
+
+Активные акции компилируются в словарь
+    (restaurant_id или None, час недели, цель) -> кортеж правил,
+где час недели - 0..167 (день * 24 + час), а цель - ('item', id блюда),
+('category', id), ('all',) или ('combo', наименьший id блюда набора).
+Для позиции заказа читаются только ключи ее блюда, категории и «всех
+блюд» в текущий час для филиала и для всей сети - число проверяемых
+правил не зависит от общего числа акций. Точные минуты, даты и
+количество проверяются только у этих кандидатов.
+
+На каждую позицию действует одна акция - самая выгодная (при равной
+скидке - с большим приоритетом). Комбо дает скидку на полные наборы
+блюд; скидка суммой за комбо делится между позициями пропорционально
+стоимости. Окно времени, переходящее через полночь (пятница 22:00-02:00),
+продолжается в ночь на следующий день.
+
+Скомпилированный индекс хранится в памяти процесса; изменения акций в
+этом процессе сбрасывают его сразу (см. signals), другие процессы
+перепроверяют версию не чаще раза в REFRESH_SECONDS.
+"""
+import time
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import OrderItem, Promotion
+
+REFRESH_SECONDS = 30
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+class Rule:
+    """Скомпилированное правило акции"""
+
+    __slots__ = ('id', 'percent', 'value', 'restaurant_id', 'item_ids', 'category_ids', 'is_combo',
+                 'min_quantity', 'intervals', 'starts_on', 'ends_on', 'priority')
+
+    def __init__(self, id, discount_type, value, restaurant_id=None, item_ids=(), category_ids=(),
+                 is_combo=False, min_quantity=1, weekdays='1234567', start_time=None, end_time=None,
+                 starts_on=None, ends_on=None, priority=0):
+        self.id = id
+        self.percent = discount_type == Promotion.DiscountType.PERCENT
+        self.value = Decimal(value)
+        self.restaurant_id = restaurant_id
+        self.item_ids = frozenset(item_ids)
+        self.category_ids = frozenset(category_ids)
+        self.is_combo = is_combo
+        self.min_quantity = max(min_quantity, 1)
+        self.starts_on = starts_on
+        self.ends_on = ends_on
+        self.priority = priority
+        self.intervals = self._intervals(weekdays, start_time, end_time)
+
+    @staticmethod
+    def _intervals(weekdays, start_time, end_time):
+        """Полуинтервалы [начало, конец) в минутах от начала недели (понедельник 00:00)"""
+        start = start_time.hour * 60 + start_time.minute if start_time else 0
+        end = end_time.hour * 60 + end_time.minute if end_time else DAY_MINUTES
+        if end <= start:
+            end += DAY_MINUTES  # через полночь или start == end - круглые сутки
+        intervals = []
+        for day in sorted({int(d) for d in weekdays if d in '1234567'}):
+            begin, finish = (day - 1) * DAY_MINUTES + start, (day - 1) * DAY_MINUTES + end
+            if finish > WEEK_MINUTES:
+                intervals += [(begin, WEEK_MINUTES), (0, finish - WEEK_MINUTES)]
+            else:
+                intervals.append((begin, finish))
+        return tuple(intervals)
+
+    def hours(self):
+        """Часы недели, пересекающиеся с окнами правила"""
+        return {
+            hour
+            for begin, finish in self.intervals
+            for hour in range(begin // 60, (finish - 1) // 60 + 1)
+        }
+
+    def is_active(self, today, week_minute):
+        if self.starts_on and today < self.starts_on or self.ends_on and today > self.ends_on:
+            return False
+        return any(begin <= week_minute < finish for begin, finish in self.intervals)
+
+    def discount(self, unit_price, quantity):
+        """Скидка на позицию (цена * количество)"""
+        line = unit_price * quantity
+        if self.percent:
+            amount = line * self.value / 100
+        else:
+            amount = self.value * quantity
+        return min(amount, line).quantize(CENT, ROUND_HALF_UP)
+
+
+class PromotionEngine:
+    """
+    Индекс правил по (филиал, час недели, цель).
+
+    Правила позиций в каждом ключе разделены на процентные и «суммой» и
+    отсортированы по убыванию скидки: первое подходящее правило в каждой
+    группе - лучшее в ней, остальные не проверяются.
+    """
+
+    def __init__(self, rules):
+        index = defaultdict(lambda: ([], []))
+        combos = defaultdict(list)
+        self.size = 0
+        for rule in rules:
+            if rule.is_combo:
+                if not rule.item_ids:
+                    continue
+                self.size += 1
+                for hour in rule.hours():
+                    combos[(rule.restaurant_id, hour, min(rule.item_ids))].append(rule)
+                continue
+
+            targets = [('item', item_id) for item_id in rule.item_ids]
+            targets += [('category', category_id) for category_id in rule.category_ids]
+            self.size += 1
+            for hour in rule.hours():
+                for target in targets or [('all',)]:
+                    index[(rule.restaurant_id, hour, target)][0 if rule.percent else 1].append(rule)
+
+        def ordered(group):
+            return tuple(sorted(group, key=lambda rule: (-rule.value, -rule.priority)))
+
+        self.index = {key: (ordered(percent), ordered(amount)) for key, (percent, amount) in index.items()}
+        self.combos = {key: tuple(rules) for key, rules in combos.items()}
+
+    def evaluate(self, restaurant_id, moment, lines):
+        """
+        Скидки по всем позициям заказа за один проход.
+
+        lines - список (menu_item_id, category_id, quantity, unit_price).
+        Возвращает список (скидка на позицию, Rule или None) в порядке lines.
+        """
+        week_minute = moment.weekday() * DAY_MINUTES + moment.hour * 60 + moment.minute
+        hour = week_minute // 60
+        today = moment.date()
+        best = [(ZERO, None)] * len(lines)
+
+        def offer(position, amount, rule):
+            current, current_rule = best[position]
+            if amount > current or (amount == current and amount > 0 and rule.priority > current_rule.priority):
+                best[position] = (amount, rule)
+
+        positions = {}
+        combos = {}
+        for position, (item_id, category_id, quantity, unit_price) in enumerate(lines):
+            positions.setdefault(item_id, position)
+            for target in (('item', item_id), ('category', category_id), ('all',)):
+                for branch in (restaurant_id, None):
+                    for group in self.index.get((branch, hour, target), ()):
+                        for rule in group:
+                            if quantity >= rule.min_quantity and rule.is_active(today, week_minute):
+                                offer(position, rule.discount(unit_price, quantity), rule)
+                                break
+            for branch in (restaurant_id, None):
+                for rule in self.combos.get((branch, hour, item_id), ()):
+                    if rule.is_active(today, week_minute):
+                        combos[rule.id] = rule
+
+        for rule in combos.values():
+            if not rule.item_ids.issubset(positions):
+                continue
+            members = [positions[item_id] for item_id in sorted(rule.item_ids)]
+            sets = min(lines[position][2] for position in members)
+            if sets < rule.min_quantity:
+                continue
+            values = [lines[position][3] * sets for position in members]
+            if rule.percent:
+                shares = [(value * rule.value / 100).quantize(CENT, ROUND_HALF_UP) for value in values]
+            else:
+                total = min(rule.value * sets, sum(values))
+                shares = [(total * value / sum(values)).quantize(CENT, ROUND_HALF_UP) for value in values[:-1]]
+                shares.append(total - sum(shares))
+            for position, share in zip(members, shares):
+                offer(position, share, rule)
+
+        return best
+
+
+def load_rules():
+    """Правила из активных акций (три запроса)"""
+    promotions = list(Promotion.objects.filter(is_active=True).exclude(ends_on__lt=timezone.localdate()))
+    ids = [promotion.id for promotion in promotions]
+    items, categories = defaultdict(set), defaultdict(set)
+    for promotion_id, item_id in Promotion.menu_items.through.objects.filter(
+        promotion_id__in=ids
+    ).values_list('promotion_id', 'menuitem_id'):
+        items[promotion_id].add(item_id)
+    for promotion_id, category_id in Promotion.categories.through.objects.filter(
+        promotion_id__in=ids
+    ).values_list('promotion_id', 'category_id'):
+        categories[promotion_id].add(category_id)
+
+    return [
+        Rule(
+            promotion.id, promotion.discount_type, promotion.value,
+            restaurant_id=promotion.restaurant_id,
+            item_ids=items[promotion.id],
+            category_ids=categories[promotion.id],
+            is_combo=promotion.is_combo,
+            min_quantity=promotion.min_quantity,
+            weekdays=promotion.weekdays,
+            start_time=promotion.start_time,
+            end_time=promotion.end_time,
+            starts_on=promotion.starts_on,
+            ends_on=promotion.ends_on,
+            priority=promotion.priority,
+        )
+        for promotion in promotions
+    ]
+
+
+# (версия, движок, время проверки версии)
+_engine = None
+
+
+def _version():
+    state = Promotion.objects.aggregate(count=Count('id'), changed=Max('updated_at'))
+    return state['count'], state['changed'], timezone.localdate()
+
+
+def get_engine():
+    """Движок акций процесса; версия акций перепроверяется раз в REFRESH_SECONDS"""
+    global _engine
+    now = time.monotonic()
+    if _engine and now - _engine[2] < REFRESH_SECONDS:
+        return _engine[1]
+
+    version = _version()
+    if _engine and _engine[0] == version:
+        engine = _engine[1]
+    else:
+        engine = PromotionEngine(load_rules())
+    _engine = (version, engine, now)
+    return engine
+
+
+def reset():
+    """Сбросить движок процесса после изменения акций"""
+    global _engine
+    _engine = None
+
+
+def apply_promotions(order, moment=None):
+    """
+    Пересчет скидок по всем позициям заказа; возвращает сумму скидки.
+    Позиции обновляются одним bulk_update, затем пересчитывается итог.
+    """
+    moment = timezone.localtime(moment)
+    items = list(order.items.select_related('menu_item'))
+    results = get_engine().evaluate(order.restaurant_id, moment, [
+        (item.menu_item_id, item.menu_item.category_id, item.quantity, item.price_at_moment)
+        for item in items
+    ])
+
+    changed = []
+    for item, (discount, rule) in zip(items, results):
+        promotion_id = rule.id if rule else None
+        if item.discount != discount or item.promotion_id != promotion_id:
+            item.discount, item.promotion_id = discount, promotion_id
+            changed.append(item)
+
+    with transaction.atomic():
+        OrderItem.objects.bulk_update(changed, ['discount', 'promotion'])
+        # Итог - по только что обновленным позициям: позиции, загруженные
+        # prefetch_related вместе с заказом, хранят старые скидки
+        if hasattr(order, '_prefetched_objects_cache'):
+            order._prefetched_objects_cache['items'] = items
+        order.save()
+    return sum((discount for discount, _ in results), ZERO)
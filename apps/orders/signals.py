@@ -0,0 +1,26 @@
+# apps/orders/signals.py
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Promotion
+from . import promotions
+
+
+@receiver([post_save, post_delete], sender=Promotion)
+def promotion_changed(sender, **kwargs):
+    """Движок акций процесса пересобирается после фиксации изменений"""
+    transaction.on_commit(promotions.reset)
+
+
+@receiver(m2m_changed, sender=Promotion.menu_items.through)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+def promotion_targets_changed(sender, instance, action, pk_set, **kwargs):
+    """Смена блюд и категорий акции тоже меняет версию акций для других процессов"""
+    if not action.startswith('post_'):
+        return
+    # С обратной стороны (menu_item.promotions.add(...)) pk_set - id акций
+    ids = [instance.pk] if isinstance(instance, Promotion) else list(pk_set or ())
+    Promotion.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+    transaction.on_commit(promotions.reset)
@@ -1,3 +1,47 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.accounts.models import CustomUser
+from apps.menu.models import Category, MenuItem
+from apps.restaurants.models import Restaurant
+from .models import Order, OrderItem, Promotion
+from .promotions import reset
+
+
+class CompleteOrderPromotionsTests(TestCase):
+    """Завершение заказа применяет акции и сохраняет итог со скидкой"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='cashier', email='cashier@example.com', password='x')
+        self.client.force_login(self.user)
+        restaurant = Restaurant.objects.create(name='Филиал', address='Адрес', phone_number='1')
+        dish = MenuItem.objects.create(name='Плов', category=Category.objects.create(name='Горячее'),
+                                       price=Decimal('100'))
+        promotion = Promotion.objects.create(name='Скидка 50', discount_type=Promotion.DiscountType.AMOUNT,
+                                             value=Decimal('50'))
+        promotion.menu_items.add(dish)
+        reset()
+
+        self.order = Order.objects.create(restaurant=restaurant, created_by=self.user)
+        OrderItem.objects.create(order=self.order, menu_item=dish, quantity=2, price_at_moment=Decimal('100'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('200'))
+
+    def assertDiscounted(self):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.Status.COMPLETED)
+        self.assertEqual(self.order.items.get().discount, Decimal('100'))
+        self.assertEqual(self.order.total_price, Decimal('100'))
+
+    def test_detail_view_completes_prefetched_order(self):
+        self.client.post(reverse('orders:detail', kwargs={'pk': self.order.pk}),
+                         {'action': 'update_status', 'status': Order.Status.COMPLETED})
+        self.assertDiscounted()
 
-# Create your tests here.
+    def test_update_view_applies_promotions(self):
+        self.client.post(reverse('orders:update', kwargs={'pk': self.order.pk}), {
+            'restaurant': self.order.restaurant_id, 'table_number': '', 'status': Order.Status.COMPLETED,
+        })
+        self.assertDiscounted()
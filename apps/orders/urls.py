@@ -9,5 +9,6 @@ urlpatterns = [
     path('<int:pk>/receipt/', views.OrderReceiptView.as_view(), name='receipt'),
     path('create/', views.OrderCreateView.as_view(), name='create'),
     path('<int:pk>/update/', views.OrderUpdateView.as_view(), name='update'),
+    path('<int:order_id>/add-item/', views.AddItemToOrderView.as_view(), name='add_item'),
     path('<int:pk>/process-ingredients/', views.ProcessIngredientsView.as_view(), name='process_ingredients'),
 ]
\ No newline at end of file
@@ -10,7 +10,9 @@ from django.http import JsonResponse
 from .models import Order, OrderItem
 from apps.restaurants.models import Restaurant
 from apps.menu.models import MenuItem, Category
+from apps.menu.overrides import resolve
 from .forms import OrderForm
+from .promotions import apply_promotions
 
 
 class OrderListView(LoginRequiredMixin, ListView):
@@ -57,6 +59,10 @@ class AddItemToOrderView(LoginRequiredMixin, View):
         quantity = int(request.POST.get('quantity', 1))
 
         menu_item = get_object_or_404(MenuItem, pk=menu_item_id)
+        price, is_available = resolve(menu_item, order.restaurant_id)
+        if not is_available:
+            messages.error(request, f'Блюдо "{menu_item.name}" недоступно в филиале {order.restaurant.name}')
+            return redirect('orders:detail', pk=order_id)
 
         with transaction.atomic():
             # Проверяем, есть ли уже такая позиция в заказе
@@ -65,7 +71,7 @@ class AddItemToOrderView(LoginRequiredMixin, View):
                 menu_item=menu_item,
                 defaults={
                     'quantity': quantity,
-                    'price_at_moment': menu_item.price
+                    'price_at_moment': price
                 }
             )
 
@@ -74,16 +80,26 @@ class AddItemToOrderView(LoginRequiredMixin, View):
                 order_item.quantity += quantity
                 order_item.save()
 
-            # Пересчитываем общую стоимость заказа
-            total = sum(item.get_cost() for item in order.items.all())
-            order.total_price = total
-            order.save()
+            # Скидки по акциям пересчитываются для всего заказа, затем итог
+            apply_promotions(order)
 
         messages.success(request, f'Добавлено: {menu_item.name} x{quantity}')
         return redirect('orders:detail', pk=order_id)
 
 
-class OrderUpdateView(LoginRequiredMixin, UpdateView):
+class CompleteOrderMixin:
+    """
+    Перевод заказа в «Завершен» через форму: акции применяются по времени
+    закрытия заказа, как на странице заказа
+    """
+
+    def form_valid(self, form):
+        if 'status' in form.changed_data and form.instance.status == Order.Status.COMPLETED:
+            apply_promotions(form.instance)
+        return super().form_valid(form)
+
+
+class OrderUpdateView(LoginRequiredMixin, CompleteOrderMixin, UpdateView):
     """Редактирование заказа"""
     model = Order
     template_name = 'orders/update.html'
@@ -93,7 +109,7 @@ class OrderUpdateView(LoginRequiredMixin, UpdateView):
         messages.success(self.request, 'Заказ успешно обновлен!')
         return reverse_lazy('orders:detail', kwargs={'pk': self.object.pk})
 
-class UpdateOrderStatusView(LoginRequiredMixin, UpdateView):
+class UpdateOrderStatusView(LoginRequiredMixin, CompleteOrderMixin, UpdateView):
     """
     Обновление статуса заказа
     """
@@ -114,7 +130,7 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
 
     def get_object(self):
         return get_object_or_404(
-            Order.objects.select_related('restaurant', 'created_by').prefetch_related('items__menu_item'),
+            Order.objects.select_related('restaurant', 'created_by').prefetch_related('items__menu_item', 'items__promotion'),
             pk=self.kwargs['pk']
         )
 
@@ -138,7 +154,12 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
             if new_status in dict(Order.Status.choices):
                 old_status = order.status
                 order.status = new_status
-                order.save()
+                if new_status == Order.Status.COMPLETED:
+                    # Расчет: акции применяются по времени закрытия заказа
+                    # (заказ сохраняется вместе с пересчитанным итогом)
+                    apply_promotions(order)
+                else:
+                    order.save()
                 messages.success(request,
                                  f'Статус заказа изменен с "{order.get_status_display()}" на "{dict(Order.Status.choices)[new_status]}"')
 
@@ -163,7 +184,7 @@ class OrderReceiptView(LoginRequiredMixin, DetailView):
 
     def get_object(self):
         return get_object_or_404(
-            Order.objects.select_related('restaurant', 'created_by').prefetch_related('items__menu_item'),
+            Order.objects.select_related('restaurant', 'created_by').prefetch_related('items__menu_item', 'items__promotion'),
             pk=self.kwargs['pk']
         )
 
@@ -5,11 +5,17 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
 
 from .models import Employee
 from apps.accounts.models import CustomUser
+from apps.analytics.staff import employee_stats
 from apps.restaurants.models import Restaurant
 
+# За сколько последних дней показывается статистика сотрудника
+STATS_DAYS = 30
+
 
 class StaffListView(LoginRequiredMixin, ListView):
     """
@@ -62,6 +68,15 @@ class StaffDetailView(LoginRequiredMixin, DetailView):
             pk=self.kwargs['pk']
         )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Заказы, выручка и средний чек - из свода StaffDailySales
+        context['stats_days'] = STATS_DAYS
+        context['stats'] = employee_stats(
+            self.object.user_id, timezone.localdate() - timedelta(days=STATS_DAYS - 1)
+        )
+        return context
+
 
 class StaffCreateView(LoginRequiredMixin, CreateView):
     """
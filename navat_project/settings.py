@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'apps.inventory',
     'apps.staff',
     'apps.analytics',
+    'apps.images',
     # Я НАСТОЯТЕЛЬНО рекомендую добавить это приложение:
     'apps.orders',
 ]
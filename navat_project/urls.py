@@ -17,12 +17,14 @@ Including another URLconf
 # navat_project/urls.py
 # navat_project/urls.py
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
 
+from apps.images.views import serve_derivative
+
 
 @login_required
 def redirect_to_dashboard(request):
@@ -43,4 +45,7 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    urlpatterns += [
+        re_path(r'^%sderivatives/(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_derivative),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file